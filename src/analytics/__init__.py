@@ -0,0 +1,3 @@
+"""
+本地分析模块：Parquet增量导出和DuckDB聚合查询
+"""
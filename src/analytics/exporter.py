@@ -0,0 +1,260 @@
+"""
+Parquet增量导出模块
+
+按文档_id的高水位线把新写入的文章追加到按 source / date 分区的Parquet文件，
+供 src/analytics/queries.py 在本地用DuckDB做聚合分析，不再扫描线上数据库。
+
+目录结构（Hive分区）：
+    ANALYTICS_DIR/articles/source=x.com/date=2025-01-01/part-<批次首个_id>.parquet
+"""
+
+import os
+import re
+import json
+import datetime
+from collections import defaultdict
+from typing import List, Dict, Any, Optional, Tuple
+
+from src.db.backend import get_database
+from src.utils.log_handler import get_logger
+from src.utils.paths import ANALYTICS_DIR
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - 可选依赖
+    pa = None
+    pq = None
+
+# 创建日志记录器
+logger = get_logger("analytics_exporter")
+
+# 每批导出的文章数
+EXPORT_BATCH_SIZE = int(os.getenv('ANALYTICS_EXPORT_BATCH_SIZE', '5000'))
+
+# 数据集目录和导出状态文件
+DATASET_DIR = os.path.join(ANALYTICS_DIR, 'articles')
+STATE_PATH = os.path.join(ANALYTICS_DIR, 'export_state.json')
+
+# 融资金额单位换算
+_AMOUNT_UNITS = {
+    'k': 1e3, 'thousand': 1e3, '千': 1e3,
+    'm': 1e6, 'mn': 1e6, 'million': 1e6, '百万': 1e6,
+    'b': 1e9, 'bn': 1e9, 'billion': 1e9, '十亿': 1e9,
+    '万': 1e4, '亿': 1e8,
+}
+_CURRENCIES = [
+    ('USD', ('$', 'us$', 'usd', '美元')),
+    ('EUR', ('€', 'eur', '欧元')),
+    ('GBP', ('£', 'gbp', '英镑')),
+    ('CNY', ('¥', 'rmb', 'cny', '人民币', '元')),
+]
+_AMOUNT_PATTERN = re.compile(r'(\d+(?:[.,]\d+)*)\s*(thousand|million|billion|mn|bn|百万|十亿|千|万|亿|[kmb](?![a-z]))?', re.IGNORECASE)
+
+
+def _schema():
+    """导出文件的列定义"""
+    return pa.schema([
+        ('_id', pa.string()),
+        ('source', pa.string()),
+        ('source_url', pa.string()),
+        ('date_time', pa.string()),
+        ('title', pa.string()),
+        ('author', pa.string()),
+        ('likes', pa.int64()),
+        ('retweets', pa.int64()),
+        ('followers', pa.int64()),
+        ('company', pa.string()),
+        ('funding_round', pa.string()),
+        ('funding_amount', pa.string()),
+        ('funding_value', pa.float64()),
+        ('funding_currency', pa.string()),
+        ('investors', pa.string()),
+        ('content_length', pa.int64()),
+        ('processed_at', pa.string()),
+    ])
+
+
+def parse_funding_amount(text: Any) -> Tuple[Optional[float], Optional[str]]:
+    """从融资金额文本中解析数值和币种
+
+    支持 "$10M"、"1000 万美元"、"2.5 亿人民币"、"USD 3 billion" 等写法。
+
+    Args:
+        text: 融资金额文本
+
+    Returns:
+        (金额, 币种)，无法解析时返回 (None, None)
+    """
+    if not isinstance(text, str) or not text.strip():
+        return None, None
+    match = _AMOUNT_PATTERN.search(text.replace('，', ','))
+    if not match:
+        return None, None
+    try:
+        value = float(match.group(1).replace(',', ''))
+    except ValueError:
+        return None, None
+    unit = (match.group(2) or '').lower()
+    value *= _AMOUNT_UNITS.get(unit, 1)
+
+    lowered = text.lower()
+    currency = None
+    for code, markers in _CURRENCIES:
+        if any(marker in lowered for marker in markers):
+            currency = code
+            break
+    return value, currency
+
+
+def _to_str(value: Any) -> Optional[str]:
+    if value is None:
+        return None
+    if isinstance(value, datetime.datetime):
+        return value.strftime('%Y-%m-%d %H:%M:%S')
+    if isinstance(value, (list, tuple)):
+        return ', '.join(str(v) for v in value)
+    return str(value)
+
+
+def _to_int(value: Any) -> Optional[int]:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def to_record(article: Dict[str, Any]) -> Dict[str, Any]:
+    """将文章转换为导出记录"""
+    funding_value, funding_currency = parse_funding_amount(article.get('funding_amount'))
+    return {
+        '_id': _to_str(article.get('_id')),
+        'source': _to_str(article.get('source')) or 'unknown',
+        'source_url': _to_str(article.get('source_url')),
+        'date_time': _to_str(article.get('date_time')),
+        'title': _to_str(article.get('title')),
+        'author': _to_str(article.get('author')),
+        'likes': _to_int(article.get('likes')),
+        'retweets': _to_int(article.get('retweets')),
+        'followers': _to_int(article.get('followers')),
+        'company': _to_str(article.get('company')),
+        'funding_round': _to_str(article.get('funding_round')),
+        'funding_amount': _to_str(article.get('funding_amount')),
+        'funding_value': funding_value,
+        'funding_currency': funding_currency,
+        'investors': _to_str(article.get('investors')),
+        'content_length': len(article.get('content') or ''),
+        'processed_at': _to_str(article.get('processed_at')),
+    }
+
+
+def _partition_date(date_time: Optional[str]) -> str:
+    """取date_time的日期部分作为分区键"""
+    if date_time and re.match(r'^\d{4}-\d{2}-\d{2}', date_time):
+        return date_time[:10]
+    return 'unknown'
+
+
+class ParquetExporter:
+    """Parquet增量导出器"""
+
+    def __init__(self, db=None, dataset_dir: str = DATASET_DIR, state_path: str = STATE_PATH, batch_size: int = EXPORT_BATCH_SIZE):
+        """初始化导出器
+
+        Args:
+            db: 数据库实例，需提供iter_articles_after方法，为空时使用共享存储后端
+            dataset_dir: 数据集目录
+            state_path: 高水位线状态文件
+            batch_size: 每批写出的文章数
+        """
+        if pa is None:
+            raise RuntimeError("Parquet导出需要安装pyarrow: pip install pyarrow")
+        self._db = db
+        self.dataset_dir = dataset_dir
+        self.state_path = state_path
+        self.batch_size = max(1, batch_size)
+
+    @property
+    def db(self):
+        if self._db is None:
+            self._db = get_database()
+        return self._db
+
+    def load_state(self) -> Dict[str, Any]:
+        """读取导出状态"""
+        try:
+            if os.path.exists(self.state_path):
+                with open(self.state_path, 'r', encoding='utf-8') as f:
+                    return json.load(f)
+        except Exception as e:
+            logger.error(f"读取导出状态失败: {e}")
+        return {'last_id': None, 'exported': 0}
+
+    def save_state(self, state: Dict[str, Any]):
+        """写入导出状态（先写临时文件再原子替换）"""
+        os.makedirs(os.path.dirname(self.state_path), exist_ok=True)
+        tmp_path = f"{self.state_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(state, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.state_path)
+
+    def _write_batch(self, records: List[Dict[str, Any]]) -> int:
+        """按分区写出一批记录
+
+        文件名只由批次首个_id决定：每批都从已保存的高水位线开始切分，中断后重跑时
+        同一起点的批次（包括最后一个不满的批次）包含之前写出的全部行，覆盖同名文件而不会重复追加。
+        """
+        partitions = defaultdict(list)
+        for record in records:
+            partitions[(record['source'], _partition_date(record['date_time']))].append(record)
+
+        schema = _schema()
+        first_id = records[0]['_id']
+        for (source, date), rows in partitions.items():
+            directory = os.path.join(self.dataset_dir, f"source={source}", f"date={date}")
+            os.makedirs(directory, exist_ok=True)
+            path = os.path.join(directory, f"part-{first_id}.parquet")
+            tmp_path = f"{path}.tmp"
+            table = pa.Table.from_pylist(rows, schema=schema)
+            pq.write_table(table, tmp_path, compression='zstd')
+            os.replace(tmp_path, path)
+        return len(partitions)
+
+    def export(self) -> Dict[str, Any]:
+        """导出高水位线之后的新文章
+
+        Returns:
+            导出结果统计
+        """
+        state = self.load_state()
+        exported = 0
+        files = 0
+        batch = []
+        for article in self.db.iter_articles_after(state.get('last_id')):
+            batch.append(to_record(article))
+            if len(batch) >= self.batch_size:
+                files += self._write_batch(batch)
+                exported += len(batch)
+                state['last_id'] = batch[-1]['_id']
+                state['exported'] = state.get('exported', 0) + len(batch)
+                self.save_state(state)
+                batch = []
+        if batch:
+            files += self._write_batch(batch)
+            exported += len(batch)
+            state['last_id'] = batch[-1]['_id']
+            state['exported'] = state.get('exported', 0) + len(batch)
+
+        state['last_run'] = datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        self.save_state(state)
+        logger.info(f"Parquet导出完成: 新增 {exported} 篇文章，写出 {files} 个文件，高水位线 {state.get('last_id')}")
+        return {'exported': exported, 'files': files, 'last_id': state.get('last_id'), 'total_exported': state.get('exported', 0)}
+
+
+def start_exporter() -> Dict[str, Any]:
+    """执行一次增量导出，供调度器调用"""
+    return ParquetExporter().export()
+
+
+if __name__ == "__main__":
+    print(start_exporter())
@@ -0,0 +1,182 @@
+"""
+本地分析查询模块
+
+基于 src/analytics/exporter.py 导出的Parquet数据集，用DuckDB在本地完成
+按天、按作者和融资维度的聚合，分析查询不访问线上数据库。
+"""
+
+import os
+import threading
+from typing import List, Dict, Any, Optional
+
+from src.analytics.exporter import DATASET_DIR
+from src.utils.log_handler import get_logger
+
+try:
+    import duckdb
+except ImportError:  # pragma: no cover - 可选依赖
+    duckdb = None
+
+# 创建日志记录器
+logger = get_logger("analytics_queries")
+
+
+class AnalyticsStore:
+    """Parquet数据集上的DuckDB查询"""
+
+    def __init__(self, dataset_dir: str = DATASET_DIR):
+        """初始化查询器
+
+        Args:
+            dataset_dir: Parquet数据集目录
+        """
+        if duckdb is None:
+            raise RuntimeError("本地分析需要安装duckdb: pip install duckdb")
+        self.dataset_dir = dataset_dir
+        self._conn = duckdb.connect(database=':memory:')
+        # DuckDB连接不能被多个线程同时使用
+        self._lock = threading.Lock()
+
+    def _source(self) -> str:
+        """数据集的表表达式，每次查询都会重新发现新写入的文件"""
+        pattern = os.path.join(self.dataset_dir, '**', '*.parquet').replace("'", "''")
+        return f"read_parquet('{pattern}', hive_partitioning = true, union_by_name = true)"
+
+    def _has_data(self) -> bool:
+        for _, _, files in os.walk(self.dataset_dir):
+            if any(name.endswith('.parquet') for name in files):
+                return True
+        return False
+
+    def _query(self, sql: str, params: List[Any] = None) -> List[Dict[str, Any]]:
+        """执行查询，返回字典列表"""
+        if not self._has_data():
+            return []
+        sql = sql.replace('{articles}', self._source())
+        with self._lock:
+            cursor = self._conn.execute(sql, params or [])
+            columns = [column[0] for column in cursor.description]
+            return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+    @staticmethod
+    def _where(source: Optional[str], start_date: Optional[str], end_date: Optional[str], params: List[Any]) -> str:
+        """公共过滤条件，date为分区列，可直接裁剪文件
+        
+        没有可解析日期的文章在 date=unknown 分区，按字符串比较时会落入任意起始日期之后，
+        指定日期范围时排除。
+        """
+        clauses = []
+        if source:
+            clauses.append("source = ?")
+            params.append(source)
+        if start_date or end_date:
+            clauses.append("CAST(date AS VARCHAR) <> 'unknown'")
+        if start_date:
+            clauses.append("date >= ?")
+            params.append(start_date)
+        if end_date:
+            clauses.append("date <= ?")
+            params.append(end_date)
+        return ('WHERE ' + ' AND '.join(clauses)) if clauses else ''
+
+    def daily_counts(self, source: str = None, start_date: str = None, end_date: str = None) -> List[Dict[str, Any]]:
+        """按天统计文章数量和互动数据
+
+        Args:
+            source: 数据源，如 x.com / crunchbase.com
+            start_date: 起始日期 YYYY-MM-DD
+            end_date: 结束日期 YYYY-MM-DD
+
+        Returns:
+            每天一行的统计结果
+        """
+        params: List[Any] = []
+        where = self._where(source, start_date, end_date, params)
+        return self._query(f"""
+            SELECT CAST(date AS VARCHAR) AS date, source, count(*) AS articles,
+                   coalesce(sum(likes), 0) AS likes, coalesce(sum(retweets), 0) AS retweets,
+                   count(DISTINCT author) AS authors
+            FROM {{articles}} {where}
+            GROUP BY ALL
+            ORDER BY date DESC, source
+        """, params)
+
+    def top_authors(self, source: str = None, start_date: str = None, end_date: str = None, limit: int = 20) -> List[Dict[str, Any]]:
+        """按文章数统计最活跃的作者
+
+        Args:
+            source: 数据源
+            start_date: 起始日期 YYYY-MM-DD
+            end_date: 结束日期 YYYY-MM-DD
+            limit: 返回的作者数
+
+        Returns:
+            作者统计列表
+        """
+        params: List[Any] = []
+        where = self._where(source, start_date, end_date, params)
+        where += (' AND ' if where else 'WHERE ') + "author IS NOT NULL AND author NOT IN ('', '未提供')"
+        params.append(limit)
+        return self._query(f"""
+            SELECT author, count(*) AS articles, coalesce(sum(likes), 0) AS likes,
+                   coalesce(max(followers), 0) AS followers,
+                   CAST(min(date) AS VARCHAR) AS first_date, CAST(max(date) AS VARCHAR) AS last_date
+            FROM {{articles}} {where}
+            GROUP BY author
+            ORDER BY articles DESC, likes DESC
+            LIMIT ?
+        """, params)
+
+    def funding_summary(self, start_date: str = None, end_date: str = None, group_by: str = 'round') -> List[Dict[str, Any]]:
+        """融资数据聚合
+
+        Args:
+            start_date: 起始日期 YYYY-MM-DD
+            end_date: 结束日期 YYYY-MM-DD
+            group_by: 分组方式 round（轮次）/ month（月份）/ currency（币种）
+
+        Returns:
+            融资统计列表
+        """
+        group_expr = {
+            'round': "coalesce(nullif(funding_round, '未提供'), 'unknown')",
+            'month': "substr(CAST(date AS VARCHAR), 1, 7)",
+            'currency': "coalesce(funding_currency, 'unknown')",
+        }.get(group_by)
+        if group_expr is None:
+            raise ValueError(f"不支持的分组方式: {group_by}")
+
+        params: List[Any] = []
+        where = self._where(None, start_date, end_date, params)
+        where += (' AND ' if where else 'WHERE ') + "funding_amount IS NOT NULL AND funding_amount NOT IN ('', '未提供')"
+        return self._query(f"""
+            SELECT {group_expr} AS "group", count(*) AS deals,
+                   count(funding_value) AS priced_deals,
+                   sum(funding_value) FILTER (WHERE funding_currency = 'USD') AS total_usd,
+                   median(funding_value) FILTER (WHERE funding_currency = 'USD') AS median_usd,
+                   max(funding_value) FILTER (WHERE funding_currency = 'USD') AS max_usd
+            FROM {{articles}} {where}
+            GROUP BY 1
+            ORDER BY deals DESC
+        """, params)
+
+
+# 进程内共享实例
+_store: Optional[AnalyticsStore] = None
+_store_lock = threading.Lock()
+
+
+def get_analytics() -> AnalyticsStore:
+    """获取进程内共享的分析查询器"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = AnalyticsStore()
+        return _store
+
+
+if __name__ == "__main__":
+    store = get_analytics()
+    print(store.daily_counts()[:10])
+    print(store.top_authors(limit=10))
+    print(store.funding_summary())
@@ -10,7 +10,7 @@ from flask import Flask, jsonify, request, Response
 from flask_cors import CORS  # 导入 CORS
 import json
 import logging
-from src.db.mongodb import MongoDB
+from src.db.backend import get_database
 from bson import ObjectId # bson.json_util 已被移除，因为它在 db/mongodb.py 中处理了序列化
 import datetime
 import pytz # 新增导入
@@ -46,12 +46,12 @@ app.logger.disabled = True
 log = logging.getLogger('werkzeug')
 log.disabled = True
 
-# 初始化MongoDB连接 (包装在 try-except 中)
+# 初始化数据库连接 (包装在 try-except 中)，存储后端由 STORAGE_BACKEND 环境变量决定
 try:
-    db = MongoDB()
-    logger.info("MongoDB 连接初始化成功")
+    db = get_database()
+    logger.info(f"数据库连接初始化成功: {type(db).__name__}")
 except Exception as e:
-    logger.error(f"初始化 MongoDB 连接失败: {e}")
+    logger.error(f"初始化数据库连接失败: {e}")
     logger.error(traceback.format_exc())
     db = None  # 设置为 None，以便后续检查
 
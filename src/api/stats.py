@@ -7,9 +7,10 @@
 
 import json
 import traceback
+from typing import Optional
 from fastapi import APIRouter, Request, HTTPException
 from src.utils.log_handler import get_logger
-from src.db.mongodb import MongoDB
+from src.db.backend import StorageBackend, get_database
 
 # 创建路由器
 router = APIRouter(prefix="/stats", tags=["statistics"])
@@ -17,6 +18,16 @@ router = APIRouter(prefix="/stats", tags=["statistics"])
 # 创建日志记录器
 logger = get_logger("api.stats")
 
+# 进程内复用的数据库实例，底层连接由连接注册表共享
+_db = None
+
+def get_db() -> StorageBackend:
+    """获取进程内复用的数据库实例"""
+    global _db
+    if _db is None:
+        _db = get_database()
+    return _db
+
 @router.get("/")
 async def get_stats(request: Request):
     """
@@ -25,8 +36,8 @@ async def get_stats(request: Request):
     logger.info(f"统计信息API访问: {request.client.host}")
     
     try:
-        # 初始化数据库连接
-        db = MongoDB()
+        # 复用数据库连接
+        db = get_db()
         
         # 获取总文章数
         total_articles = db.get_article_count()
@@ -60,4 +71,112 @@ async def get_stats(request: Request):
                 'message': '获取统计信息失败，请稍后再试',
                 'error': str(e)
             }
-        ) 
\ No newline at end of file
+        ) 
+
+@router.get("/pool")
+async def get_pool_stats(request: Request):
+    """
+    获取MongoDB连接池指标
+    """
+    logger.info(f"连接池指标API访问: {request.client.host}")
+    
+    try:
+        return {
+            'status': 'success',
+            'data': get_db().get_pool_stats()
+        }
+    except Exception as e:
+        logger.error(f"获取连接池指标失败: {str(e)}")
+        raise HTTPException(
+            status_code=500, 
+            detail={
+                'status': 'error',
+                'message': '获取连接池指标失败，请稍后再试',
+                'error': str(e)
+            }
+        )
+
+def _analytics_response(name: str, func, **kwargs):
+    """执行本地分析查询并包装响应，分析查询只读取Parquet数据集"""
+    try:
+        from src.analytics.queries import get_analytics
+        return {
+            'status': 'success',
+            'data': getattr(get_analytics(), func)(**kwargs)
+        }
+    except (RuntimeError, ValueError) as e:
+        logger.error(f"{name}查询失败: {str(e)}")
+        raise HTTPException(
+            status_code=503 if isinstance(e, RuntimeError) else 400,
+            detail={
+                'status': 'error',
+                'message': f'{name}查询失败',
+                'error': str(e)
+            }
+        )
+    except Exception as e:
+        logger.error(f"{name}查询失败: {str(e)}")
+        logger.error(traceback.format_exc())
+        raise HTTPException(
+            status_code=500,
+            detail={
+                'status': 'error',
+                'message': f'{name}查询失败，请稍后再试',
+                'error': str(e)
+            }
+        )
+
+@router.get("/daily")
+async def get_daily_stats(request: Request, source: Optional[str] = None, start_date: Optional[str] = None, end_date: Optional[str] = None):
+    """
+    按天统计文章数量（读取本地Parquet快照）
+    """
+    logger.info(f"每日统计API访问: {request.client.host}")
+    return _analytics_response("每日统计", "daily_counts", source=source, start_date=start_date, end_date=end_date)
+
+@router.get("/authors")
+async def get_author_stats(request: Request, source: Optional[str] = None, start_date: Optional[str] = None, end_date: Optional[str] = None, limit: int = 20):
+    """
+    统计最活跃的作者（读取本地Parquet快照）
+    """
+    logger.info(f"作者统计API访问: {request.client.host}")
+    return _analytics_response("作者统计", "top_authors", source=source, start_date=start_date, end_date=end_date, limit=min(max(limit, 1), 200))
+
+@router.get("/funding")
+async def get_funding_stats(request: Request, start_date: Optional[str] = None, end_date: Optional[str] = None, group_by: str = 'round'):
+    """
+    融资数据聚合（读取本地Parquet快照）
+    """
+    logger.info(f"融资统计API访问: {request.client.host}")
+    return _analytics_response("融资统计", "funding_summary", start_date=start_date, end_date=end_date, group_by=group_by)
+
+@router.get("/profile")
+async def get_profile_report(request: Request, explain: bool = False):
+    """
+    获取MongoDB查询分析报告（需设置 MONGODB_PROFILE=1）
+    """
+    logger.info(f"查询分析报告API访问: {request.client.host}")
+    from src.db import profiler
+    if not profiler.is_enabled():
+        raise HTTPException(
+            status_code=404,
+            detail={
+                'status': 'error',
+                'message': '查询分析未开启，请设置 MONGODB_PROFILE=1'
+            }
+        )
+    try:
+        return {
+            'status': 'success',
+            'data': profiler.report(get_db(), run_explain=explain)
+        }
+    except Exception as e:
+        logger.error(f"生成查询分析报告失败: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail={
+                'status': 'error',
+                'message': '生成查询分析报告失败',
+                'error': str(e)
+            }
+        )
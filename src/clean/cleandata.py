@@ -17,13 +17,21 @@ import hashlib
 import traceback
 import signal
 import random
-from typing import Dict, List, Any, Optional, Union, Tuple
+from typing import Dict, List, Any, Optional, Union, Tuple, Iterator, Callable
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 import threading
-from openai import OpenAI
 
 from src.utils.paths import X_TEMP_DATA_PATH, CRU_TEMP_DATA_PATH, LOGS_DIR, DATA_DIR
 from src.utils.log_handler import get_logger
+from src.utils.rate_limiter import get_rate_limiter
+from src.utils.llm_router import LLMRouter, get_llm_router
+from src.utils.hedging import get_hedger, LLM_HEDGE_SECONDARY
+from src.utils.llm_cache import get_llm_cache, make_key
+from src.clean.stream_parser import StreamParser, STOP_IRRELEVANT, STOP_LENGTH
+from src.clean import text_normalizer
+from src.clean.json_output import Field, JSONOutputError, loads as loads_json, validate as validate_json
+from src.clean.storage import iter_json_items, iter_chunks
 
 # 创建日志记录器
 logger = get_logger("cleandata")
@@ -36,29 +44,79 @@ API_KEY = 'p9mtsT4ioDYm1'
 API_BASE_URL = 'https://ai.liaobots.work/v1'
 MODEL_NAME = 'deepseek-v3-0324'
 
+# 提示词版本，修改提示词或解析逻辑后递增，使旧的AI响应缓存失效
+PROMPT_VERSION = '2'
+
 # 更详细的API配置
 API_REQUEST_TIMEOUT = 60  # 秒
 API_MAX_TOKENS = 4000
 
+# 流式接收AI输出：输出以 "{}" 开头或超过长度上限时提前终止生成
+LLM_STREAM = os.getenv('LLM_STREAM', '1').lower() not in ('0', 'false', 'no')
+LLM_STREAM_MAX_CHARS = int(os.getenv('LLM_STREAM_MAX_CHARS', '12000'))
+
+# 结构化提取请求使用JSON模式（response_format=json_object），接口不支持时在 LLM_PROVIDERS 中设置 "json_mode": false
+LLM_JSON_MODE = os.getenv('LLM_JSON_MODE', '1').lower() not in ('0', 'false', 'no')
+
 # 控制API请求频率的参数
 BATCH_SIZE = 8  # 每批处理的数据量，从3改为8
-BATCH_INTERVAL = 10  # 批处理间隔（秒），从30减少到10
+CLEANER_MAX_WORKERS = int(os.getenv('CLEANER_MAX_WORKERS', '4'))  # 同时进行的AI清洗请求数
+
+# X推文批量清洗：多条推文装入一次请求，输入内容的估算token数不超过预算；X_BATCH_MAX_ITEMS=1 时逐条处理
+X_BATCH_MAX_ITEMS = int(os.getenv('X_BATCH_MAX_ITEMS', '8'))
+X_BATCH_TOKEN_BUDGET = int(os.getenv('X_BATCH_TOKEN_BUDGET', '2000'))
+
+# Crunchbase长文：正文估算token数超过上限时，先分块并发摘要（map），再对摘要做结构化提取（reduce）
+CRUNCHBASE_MAX_INPUT_TOKENS = int(os.getenv('CRUNCHBASE_MAX_INPUT_TOKENS', '3000'))
+CRUNCHBASE_CHUNK_TOKENS = int(os.getenv('CRUNCHBASE_CHUNK_TOKENS', '1500'))
+CRUNCHBASE_MAP_WORKERS = int(os.getenv('CRUNCHBASE_MAP_WORKERS', '4'))
+
+# Crunchbase页面中与正文无关的段落：订阅推广、配图说明、相关阅读、版权声明等
+BOILERPLATE_PATTERN = re.compile(
+    r'^(?:illustration|photo|image|source)\s*:|stay up to date with|crunchbase daily|search less\. close more|'
+    r'^related (?:reading|crunchbase)|sign up (?:for|to)|subscribe (?:to|now)|all rights reserved|^copyright\b|©|'
+    r'click here|cookie|privacy policy|terms of (?:service|use)|^share (?:this|on)\b|^(?:read|see) (?:more|also)\b',
+    re.IGNORECASE
+)
+# 超过该长度的段落即使包含以上字样也视为正文
+BOILERPLATE_MAX_LENGTH = 300
 
 # 内容验证常量
+# AI输出的记录字段，别名为提示词中使用的中文键名
+X_RECORD_FIELDS = (
+    Field('title', str, ('标题',), required=True),
+    Field('content', str, ('正文',), required=True),
+    Field('author', str, ('作者',)),
+    Field('followers', int, ('粉丝数',)),
+    Field('likes', int, ('点赞数',)),
+    Field('retweets', int, ('转发数',)),
+    Field('date_time', str, ('日期',)),
+)
+CRUNCHBASE_RECORD_FIELDS = (
+    Field('title', str, ('标题',), required=True),
+    Field('content', str, ('正文',), required=True),
+    Field('author', str, ('作者',)),
+    Field('company', str, ('公司',)),
+    Field('funding_round', str, ('融资轮次',)),
+    Field('funding_amount', str, ('融资金额',)),
+    Field('investors', str, ('投资方',)),
+    Field('date_time', str, ('日期',)),
+)
+
+# 单条数据的清洗结果，由 last_outcome 读取
+CLEAN_OK = 'ok'                        # 清洗成功
+CLEAN_IRRELEVANT = 'irrelevant'        # AI判定内容不相关（返回 {} 或批量结果中只有序号）
+CLEAN_FORMAT_FAILED = 'format_failed'  # AI输出无法解析或不符合字段要求，需要重试
+CLEAN_API_FAILED = 'api_failed'        # AI API调用在重试后仍然失败，需要重试
+CLEAN_INVALID = 'invalid'              # 原始数据格式不正确或处理出错，没有AI判定
+
 MIN_CLEAN_TITLE_LENGTH = 8  # 标题最小长度
 MAX_EMOJI_RATIO = 0.1  # 表情符号最大比例
 
-# 初始化 OpenAI 客户端
-try:
-    client = OpenAI(
-        api_key=API_KEY,
-        base_url=API_BASE_URL,
-        timeout=API_REQUEST_TIMEOUT
-    )
-    logger.info(f"OpenAI 客户端初始化成功，使用模型: {MODEL_NAME}, 基础URL: {API_BASE_URL}")
-except Exception as e:
-    logger.error(f"OpenAI 客户端初始化失败: {str(e)}")
-    client = None
+# 初始化AI客户端：按 LLM_PROVIDERS 在多个OpenAI兼容接口间路由并自动故障转移，
+# 未配置时只使用 API_BASE_URL（见 src/utils/llm_router.py）
+client = get_llm_router(API_BASE_URL, API_KEY, API_REQUEST_TIMEOUT)
+logger.info(f"AI客户端初始化成功，使用模型: {MODEL_NAME}, 接口: {[provider.name for provider in client.providers]}")
 
 # 工具函数
 def generate_id(text: str) -> str:
@@ -108,6 +166,19 @@ class SystemPrompts:
 7. 必须处理并保留原文中的媒体链接，对于图片链接使用"——图片链接："开头，对于视频链接使用"——视频链接："开头，对于普通链接使用"——链接："开头
 8. 最终内容必须只返回JSON格式，不要有其他额外文本"""
     
+    @staticmethod
+    def get_x_batch_prompt() -> str:
+        """获取批量处理X.com数据的系统提示词，一次请求处理多条推文"""
+        return SystemPrompts.get_x_prompt() + """
+
+批量处理要求（优先于以上关于返回格式的要求）：
+1. 输入包含多条推文，每条以"[#序号]"开头
+2. 必须返回一个JSON对象 {"results": [...]}，results 数组中每条推文对应一个元素，元素中用 "index" 字段给出推文序号
+3. 与AI相关的推文，元素为上述JSON对象并加上 "index" 字段
+4. 非AI相关的推文，元素只包含序号，例如 {"index": 2}
+5. 每条推文独立处理，不要合并或混用不同推文的内容
+6. 最终内容必须只返回这个JSON对象，不要有其他额外文本"""
+    
     @staticmethod
     def get_crunchbase_prompt() -> str:
         """获取处理Crunchbase数据的系统提示词"""
@@ -147,6 +218,17 @@ class SystemPrompts:
 8. 务必从输入文本的"发布时间"字段提取日期，不要填写"未提供"除非原文确实没有日期
 9. 最终内容必须只返回JSON格式，不要有其他额外文本"""
     
+    @staticmethod
+    def get_crunchbase_chunk_prompt() -> str:
+        """获取长篇Crunchbase文章分块摘要的系统提示词"""
+        return """你是一位专业的投资资讯编辑，下面是一篇较长的融资或投资文章中的一部分。
+
+请用原文语言写出这一部分的要点摘要：
+1. 必须保留所有事实信息：公司名称、产品、融资金额、轮次、投资方、估值、日期、人物和关键数字
+2. 保留公司背景、产品描述和市场分析中的关键细节
+3. 删除重复内容、广告和与文章主题无关的内容
+4. 摘要不超过 300 词，只返回纯文本，不要使用JSON或其他格式"""
+    
     @staticmethod
     def get_default_prompt() -> str:
         """获取默认的系统提示词，用于未知数据源"""
@@ -174,110 +256,71 @@ class TextUtils:
     @staticmethod
     def standardize_punctuation(content: str) -> str:
         """标准化内容中的标点符号，确保以句号结尾，但保留内容中的换行符"""
-        if not content:
-            return ""
-        
-        # 处理段落间的空行，确保段落有统一的间距
-        content = re.sub(r'\n{3,}', '\n\n', content)
-        
-        # 修复中文标点使用错误，例如逗号后缺少空格
-        content = re.sub(r'([，。！？；：])([^\s])', r'\1 \2', content)
-        
-        # 确保内容以句号结尾
-        content = content.rstrip()
-        if content and not content[-1] in '。！？.!?':
-            content += '。'
-            
-        return content
+        return text_normalizer.standardize_punctuation(content)
     
     @staticmethod
     def ensure_space_around_english_and_numbers(text: str) -> str:
-        """确保英文单词和数字前后有空格"""
-        if not text:
+        """确保英文单词和数字前后有空格（URL中的数字不合并），见 src/clean/text_normalizer.py"""
+        return text_normalizer.space_text(text)
+    
+    @staticmethod
+    def trim_boilerplate(content: str) -> str:
+        """删除与正文无关的短段落（订阅推广、配图说明、版权声明等）和重复段落"""
+        if not content:
             return ""
-        
-        # 匹配英文单词或数字
-        # 1. 中文后面跟英文/数字，需要加空格
-        text = re.sub(r'([\u4e00-\u9fa5])([a-zA-Z0-9])', r'\1 \2', text)
-        
-        # 2. 英文/数字后面跟中文，需要加空格
-        text = re.sub(r'([a-zA-Z0-9])([\u4e00-\u9fa5])', r'\1 \2', text)
-        
-        # 不处理URL或链接中的空格
-        # 先标记URL
-        urls = re.findall(r'https?://[^\s]+', text)
-        for i, url in enumerate(urls):
-            placeholder = f"__URL_PLACEHOLDER_{i}__"
-            text = text.replace(url, placeholder)
-        
-        # 处理连续数字间的空格异常（例如：100 000 -> 100000）
-        text = re.sub(r'(\d+)\s+(\d+)', lambda m: m.group(1) + m.group(2) if len(m.group(1)) + len(m.group(2)) <= 10 else m.group(0), text)
-        
-        # 恢复URL
-        for i, url in enumerate(urls):
-            placeholder = f"__URL_PLACEHOLDER_{i}__"
-            text = text.replace(placeholder, url)
-        
-        return text
+        paragraphs = []
+        seen = set()
+        for para in content.split('\n'):
+            para = para.strip()
+            if not para or para in seen:
+                continue
+            if len(para) <= BOILERPLATE_MAX_LENGTH and BOILERPLATE_PATTERN.search(para):
+                continue
+            seen.add(para)
+            paragraphs.append(para)
+        return '\n'.join(paragraphs)
+    
+    @staticmethod
+    def split_by_tokens(content: str, max_tokens: int) -> List[str]:
+        """按段落顺序把正文切成估算token数不超过max_tokens的块，超长段落按句子切分"""
+        chunks = []
+        current: List[str] = []
+        used = 0
+        for para in content.split('\n'):
+            para = para.strip()
+            if not para:
+                continue
+            pieces = [para]
+            if TextUtils.estimate_tokens(para) > max_tokens:
+                pieces = re.split(r'(?<=[.!?。！？])\s+', para)
+            for piece in pieces:
+                size = TextUtils.estimate_tokens(piece)
+                if current and used + size > max_tokens:
+                    chunks.append('\n'.join(current))
+                    current, used = [], 0
+                current.append(piece)
+                used += size
+        if current:
+            chunks.append('\n'.join(current))
+        return chunks
     
     @staticmethod
     def format_crunchbase_content(content: str) -> str:
         """格式化Crunchbase内容，为具体链接添加标签等处理"""
-        if not content:
-            return ""
-            
-        # 处理链接格式，规范为统一形式
-        content = re.sub(r'http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\(\\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+', 
-                         lambda m: f"[链接]({m.group(0)})", content)
-        
-        # 确保段落之间有适当的空行
-        content = re.sub(r'(?<!\n)\n(?!\n)', "\n\n", content)
-        
-        # 限制段落长度，超过300字符的段落适当分段
-        paragraphs = content.split("\n\n")
-        formatted_paragraphs = []
-        for para in paragraphs:
-            if len(para) > 300:
-                sentences = re.split(r'([。！？.!?])', para)
-                new_para = ""
-                char_count = 0
-                for i in range(0, len(sentences), 2):
-                    if i+1 < len(sentences):
-                        sentence = sentences[i] + sentences[i+1]
-                    else:
-                        sentence = sentences[i]
-                    if char_count + len(sentence) > 300:
-                        new_para += "\n\n" + sentence
-                        char_count = len(sentence)
-                    else:
-                        new_para += sentence
-                        char_count += len(sentence)
-                formatted_paragraphs.append(new_para)
-            else:
-                formatted_paragraphs.append(para)
-        
-        return "\n\n".join(formatted_paragraphs)
+        return text_normalizer.format_crunchbase(content)
+    
+    @staticmethod
+    def estimate_tokens(text: str) -> int:
+        """粗略估算文本的token数：中日韩字符约每字1个token，其余字符约每4个字符1个token"""
+        if not text:
+            return 0
+        cjk_count = len(text_normalizer.CJK_TOKEN_CHARS.findall(text))
+        return cjk_count + (len(text) - cjk_count + 3) // 4
     
     @staticmethod
     def count_emoji(text: str) -> int:
         """统计文本中表情符号的数量"""
-        # Unicode表情符号范围
-        emoji_pattern = re.compile(
-            "["
-            "\U0001F600-\U0001F64F"  # 表情符号
-            "\U0001F300-\U0001F5FF"  # 符号和象形文字
-            "\U0001F680-\U0001F6FF"  # 交通和地图符号
-            "\U0001F700-\U0001F77F"  # 字母符号
-            "\U0001F780-\U0001F7FF"  # 几何符号
-            "\U0001F800-\U0001F8FF"  # 补充箭头
-            "\U0001F900-\U0001F9FF"  # 补充符号和象形文字
-            "\U0001FA00-\U0001FA6F"  # 国际象棋符号
-            "\U0001FA70-\U0001FAFF"  # 符号和象形文字扩展
-            "\U00002702-\U000027B0"  # Dingbats
-            "\U000024C2-\U0001F251" 
-            "]+"
-        )
-        return len(emoji_pattern.findall(text))
+        return text_normalizer.count_emoji(text)
     
     @staticmethod
     def validate_cleaned_content(title: str, content: str) -> bool:
@@ -313,80 +356,307 @@ class DataProcessor:
         # 导入DataStorage类
         from src.clean.storage import DataStorage
         
-        # 使用全局客户端
+        # 使用全局客户端（共享的接口路由器）
         self.client = client
-        if self.client is None:
-            logger.error("无法初始化数据处理器，OpenAI客户端不可用")
-            # 尝试重新初始化客户端
-            try:
-                self.client = OpenAI(
-                    api_key=API_KEY,
-                    base_url=API_BASE_URL,
-                    timeout=API_REQUEST_TIMEOUT
-                )
-                logger.info("成功重新初始化OpenAI客户端")
-            except Exception as e:
-                logger.error(f"重新初始化OpenAI客户端失败: {str(e)}")
         
         self.model = MODEL_NAME
         self.storage = DataStorage()
+        # 记录当前线程最近一次API调用是否最终失败，用于区分"内容不相关"和"调用失败"
+        self._api_state = threading.local()
+        # 按模式（single 逐条 / batch 批量）统计token用量
+        self._token_lock = threading.Lock()
+        self._token_usage: Dict[str, Dict[str, int]] = {}
+        # 流式接收的提前终止统计
+        self._stream_metrics = {'streamed': 0, 'stopped_irrelevant': 0, 'stopped_length': 0, 'received_chars': 0}
+        # AI输出解析结果统计：直接解析成功 / 修复后成功 / 失败
+        self._parse_metrics = {'parsed': 0, 'repaired': 0, 'failed': 0}
+    
+    def last_call_failed(self) -> bool:
+        """当前线程最近一次AI API调用是否在重试后仍然失败"""
+        return getattr(self._api_state, 'failed', False)
+    
+    def last_outcome(self) -> str:
+        """当前线程最近一条数据的清洗结果（CLEAN_*）"""
+        return getattr(self._api_state, 'outcome', CLEAN_INVALID)
+    
+    def _set_outcome(self, outcome: str):
+        self._api_state.outcome = outcome
+    
+    def _record_tokens(self, mode: str, items: int, single_estimate: int = 0):
+        """记录当前线程最近一次API调用的token用量，命中缓存或调用失败的请求不计入
+        
+        Args:
+            mode: single / batch
+            items: 本次请求包含的数据条数
+            single_estimate: 这些数据逐条请求时估算的输入token数
+        """
+        usage = getattr(self._api_state, 'usage', None)
+        if usage is None:
+            return
+        with self._token_lock:
+            stats = self._token_usage.setdefault(mode, {
+                'calls': 0, 'items': 0, 'prompt_tokens': 0, 'completion_tokens': 0, 'single_estimate_tokens': 0})
+            stats['calls'] += 1
+            stats['items'] += items
+            stats['prompt_tokens'] += usage[0]
+            stats['completion_tokens'] += usage[1]
+            stats['single_estimate_tokens'] += single_estimate
+    
+    def token_report(self) -> Dict[str, Dict[str, Any]]:
+        """各模式的token用量和平均每条数据的token数"""
+        with self._token_lock:
+            report = {}
+            for mode, stats in self._token_usage.items():
+                report[mode] = dict(stats)
+                if stats['items']:
+                    report[mode]['tokens_per_item'] = round((stats['prompt_tokens'] + stats['completion_tokens']) / stats['items'], 1)
+                    report[mode]['prompt_tokens_per_item'] = round(stats['prompt_tokens'] / stats['items'], 1)
+                    if mode == 'batch':
+                        # 同样的数据逐条请求时，每条估算的输入token数，用于对比批量的节省
+                        report[mode]['single_prompt_tokens_per_item_estimate'] = round(stats['single_estimate_tokens'] / stats['items'], 1)
+            return report
+    
+    def stream_stats(self) -> Dict[str, int]:
+        """流式接收的调用次数、提前终止次数和接收的字符数"""
+        with self._token_lock:
+            return dict(self._stream_metrics)
+    
+    def parse_stats(self) -> Dict[str, Any]:
+        """AI输出的解析次数、修复次数和失败率"""
+        with self._token_lock:
+            stats = dict(self._parse_metrics)
+        total = sum(stats.values())
+        stats['failure_rate'] = round(stats['failed'] / total, 4) if total else 0.0
+        return stats
+    
+    def _count_parse(self, outcome: str, count: int = 1):
+        with self._token_lock:
+            self._parse_metrics[outcome] += count
+    
+    def _validate_record(self, obj: Any, fields, label: str, repaired: bool = False) -> Optional[Dict[str, Any]]:
+        """把解析后的对象校验为记录，校验失败时计入解析失败并返回None"""
+        try:
+            record = validate_json(obj, fields)
+        except JSONOutputError as e:
+            logger.warning(f"{label}结果不符合字段要求: {e}")
+            self._count_parse('failed')
+            return None
+        self._count_parse('repaired' if repaired else 'parsed')
+        return record
+    
+    def _parse_record(self, result: str, fields, label: str) -> Optional[Dict[str, Any]]:
+        """严格解析AI输出的JSON对象（必要时修复一次），并按字段定义校验
+        
+        Args:
+            result: AI返回的文本
+            fields: 字段定义
+            label: 日志中的数据源名称
+        
+        Returns:
+            记录；AI返回空对象（内容不相关）时返回空字典；解析或校验失败时返回None
+        """
+        logger.debug(f"API原始响应({label}): {result}")
+        try:
+            obj, repaired = loads_json(result)
+        except JSONOutputError as e:
+            logger.warning(f"{label}结果JSON解析失败: {e}，响应开头: {result[:200]}")
+            self._count_parse('failed')
+            return None
+        if obj == {}:
+            self._count_parse('parsed')
+            return {}
+        if repaired:
+            logger.info(f"{label}结果经过JSON修复")
+        return self._validate_record(obj, fields, label, repaired)
+    
+    def _map_concurrently(self, func, items: List[Dict[str, Any]]) -> Iterator[Optional[Dict[str, Any]]]:
+        """在有界线程池中并发处理一批数据，按完成顺序返回结果，单条异常不影响其他数据"""
+        with ThreadPoolExecutor(max_workers=max(1, CLEANER_MAX_WORKERS)) as executor:
+            futures = [executor.submit(func, item) for item in items]
+            for future in as_completed(futures):
+                try:
+                    yield future.result()
+                except Exception as e:
+                    logger.error(f"并发处理数据出错: {e}")
+                    yield None
     
     def process(self) -> int:
         """处理数据的主方法，子类必须实现此方法"""
         raise NotImplementedError("子类必须实现process方法")
     
-    def _call_ai_api(self, system_message: str, prompt: str) -> str:
-        """调用AI API进行处理"""
+    def _call_ai_api(self, system_message: str, prompt: str, on_partial: Callable[[str, Any], None] = None,
+                     json_mode: bool = False) -> str:
+        """调用AI API进行处理
+        
+        限速、并发控制和重试统一由共享的自适应限流器负责（src/utils/rate_limiter.py）。
+        相同输入的响应从AI响应缓存读取（src/utils/llm_cache.py），不再重复调用。
+        json_mode 的响应在解析校验通过后才由 _settle_cache 写入缓存，其余响应直接写入。
+        LLM_STREAM 开启时流式接收输出，见 _stream_completion。
+        LLM_HEDGE 开启时对慢请求发出对冲请求（src/utils/hedging.py）。
+        
+        Args:
+            system_message: 系统提示词
+            prompt: 用户输入
+            on_partial: 流式接收时，字段完整接收后的回调 on_partial(字段名, 值)
+            json_mode: 是否要求接口只输出JSON对象（LLM_JSON_MODE 关闭时忽略）
+        """
         logger.info(f"准备调用AI API，系统提示词长度: {len(system_message)}，用户提示词长度: {len(prompt)}")
+        self._api_state.failed = False
+        self._api_state.usage = None
+        self._api_state.cache_entry = None
         
-        max_retries = 5
-        initial_retry_delay = 3.0
-        max_retry_delay = 30.0
+        cache = get_llm_cache()
+        cache_key = make_key(self.model, PROMPT_VERSION, system_message, prompt)
+        cached = cache.get(cache_key)
+        if cached is not None:
+            logger.info(f"命中AI响应缓存，结果长度: {len(cached)}")
+            if json_mode:
+                self._api_state.cache_entry = (cache_key, None)
+            return cached
         
-        for attempt in range(1, max_retries + 1):
-            try:
-                logger.info(f"第 {attempt}/{max_retries} 次尝试调用AI API")
-                start_time = time.time()
-                
-                response = self.client.chat.completions.create(
-                    model=self.model,
-                    messages=[
-                        {"role": "system", "content": system_message},
-                        {"role": "user", "content": prompt}
-                    ],
-                    temperature=0.1,
-                    timeout=30  # 增加超时时间到30秒
-                )
-                
-                elapsed_time = time.time() - start_time
-                logger.info(f"API调用成功，耗时: {elapsed_time:.2f} 秒")
-                
-                if response.choices and len(response.choices) > 0:
-                    result_text = response.choices[0].message.content
-                    logger.info(f"API返回结果长度: {len(result_text)}")
-                    return result_text
-                else:
-                    logger.warning("API返回结果为空或格式不正确")
-                    return ""
-                
-            except Exception as e:
-                retry_delay = min(initial_retry_delay * (2 ** (attempt - 1)), max_retry_delay)
-                
-                if attempt < max_retries:
-                    if "Connection" in str(e) or "Timeout" in str(e):
-                        logger.warning(f"API连接错误 (尝试 {attempt}/{max_retries}): {str(e)}")
-                    elif "rate limit" in str(e).lower():
-                        logger.warning(f"API速率限制 (尝试 {attempt}/{max_retries}): {str(e)}")
-                    else:
-                        logger.warning(f"API调用失败 (尝试 {attempt}/{max_retries}): {str(e)}")
-                    # 增加错误重试延迟
-                    logger.info(f"等待 {retry_delay:.1f} 秒后重试...")
-                    time.sleep(retry_delay)
-                else:
-                    logger.error(f"API调用最终失败: {str(e)}")
+        messages = [
+            {"role": "system", "content": system_message},
+            {"role": "user", "content": prompt}
+        ]
+        options = {'response_format': {'type': 'json_object'}} if json_mode and LLM_JSON_MODE else {}
+        limiter = get_rate_limiter()
+        try:
+            start_time = time.time()
+            # 发出后超过滚动p90延迟仍未返回时发出对冲请求（LLM_HEDGE），对冲请求不触发流式字段回调；
+            # 限流器暂停或名额已满时不对冲
+            result_text, usage = get_hedger().run(
+                lambda cancel, started: limiter.call(self._complete, messages, on_partial, cancel, False, options, started),
+                lambda cancel, started: limiter.call(self._complete, messages, None, cancel, True, options, started),
+                blocked=limiter.saturated,
+            )
+            elapsed_time = time.time() - start_time
+            logger.info(f"API调用成功，耗时: {elapsed_time:.2f} 秒")
+        except Exception as e:
+            logger.error(f"API调用最终失败: {str(e)}")
+            self._api_state.failed = True
+            return ""
+        
+        logger.info(f"API返回结果长度: {len(result_text)}")
+        # 记录token用量，接口没有返回usage时（包括流式接收）按估算值记录
+        self._api_state.usage = (
+            getattr(usage, 'prompt_tokens', None) or TextUtils.estimate_tokens(system_message) + TextUtils.estimate_tokens(prompt),
+            getattr(usage, 'completion_tokens', None) or TextUtils.estimate_tokens(result_text),
+        )
+        if json_mode:
+            self._api_state.cache_entry = (cache_key, result_text)
+        else:
+            cache.put(cache_key, result_text, model=self.model)
+        return result_text
+    
+    def _settle_cache(self, valid: bool):
+        """当前线程最近一次 json_mode 调用的响应解析完成后调用
+        
+        校验通过的新响应写入缓存；无法解析或不符合字段要求的响应不写入，
+        来自缓存的则删除，避免每次重试都重放同一个错误输出。
+        """
+        entry = getattr(self._api_state, 'cache_entry', None)
+        self._api_state.cache_entry = None
+        if entry is None:
+            return
+        cache_key, result_text = entry
+        if valid and result_text is not None:
+            get_llm_cache().put(cache_key, result_text, model=self.model)
+        elif not valid and result_text is None:
+            logger.warning("缓存中的AI响应无法解析，已删除")
+            get_llm_cache().delete(cache_key)
+    
+    def _complete(self, messages: List[Dict[str, str]], on_partial: Callable[[str, Any], None] = None,
+                  cancel: threading.Event = None, hedge: bool = False, options: Dict[str, Any] = None,
+                  started: threading.Event = None) -> Tuple[str, Any]:
+        """执行一次AI调用，在限流器中取得名额后调用，完成的调用把延迟记录到对冲器
+        
+        Args:
+            messages: 对话消息
+            on_partial: 流式接收时的字段回调
+            cancel: 取消事件，对冲中另一个请求先返回时被设置
+            hedge: 是否为对冲请求，LLM_HEDGE_SECONDARY 开启时发往路由器排序中的下一个接口
+            options: 额外的请求参数，例如 response_format
+            started: 开始事件，请求真正发出时设置，对冲等待时间从这时开始计算
+        
+        Returns:
+            (输出文本, 接口返回的usage)，流式接收时usage为None
+        """
+        if started is not None:
+            started.set()
+        if cancel is not None and cancel.is_set():
+            return "", None
+        start_time = time.monotonic()
+        result = self._request(messages, on_partial, cancel, hedge, options)
+        # 被取消的请求提前断开，延迟不具代表性
+        if cancel is None or not cancel.is_set():
+            get_hedger().record(time.monotonic() - start_time)
+        return result
+    
+    def _request(self, messages: List[Dict[str, str]], on_partial: Callable[[str, Any], None] = None,
+                 cancel: threading.Event = None, hedge: bool = False, options: Dict[str, Any] = None) -> Tuple[str, Any]:
+        """发出一次AI请求，参数见 _complete"""
+        extra = dict(options or {})
+        if hedge and LLM_HEDGE_SECONDARY and isinstance(self.client, LLMRouter):
+            extra['provider_offset'] = 1
+        if LLM_STREAM:
+            return self._stream_completion(messages, on_partial, cancel, **extra), None
+        response = self.client.chat.completions.create(
+            model=self.model,
+            messages=messages,
+            temperature=0.1,
+            timeout=30,  # 增加超时时间到30秒
+            **extra
+        )
+        if not response.choices:
+            logger.warning("API返回结果为空或格式不正确")
+            return "", None
+        return response.choices[0].message.content or "", getattr(response, 'usage', None)
+    
+    def _stream_completion(self, messages: List[Dict[str, str]], on_partial: Callable[[str, Any], None] = None,
+                           cancel: threading.Event = None, **extra) -> str:
+        """流式接收一次AI输出，接收中途出错时由限流器整体重试
+        
+        输出以 "{}" 开头说明内容不相关，立即断开连接并返回 "{}"；
+        输出超过 LLM_STREAM_MAX_CHARS 时断开连接并返回空字符串（按格式错误处理）；
+        cancel 被设置（对冲中另一个请求已返回）时断开连接，返回值不再使用。
+        """
+        stream = self.client.chat.completions.create(
+            model=self.model,
+            messages=messages,
+            temperature=0.1,
+            timeout=30,
+            stream=True,
+            **extra
+        )
+        parser = StreamParser(LLM_STREAM_MAX_CHARS, on_partial)
+        try:
+            for chunk in stream:
+                if cancel is not None and cancel.is_set():
+                    logger.info("对冲中的另一个请求已返回，停止接收")
                     return ""
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if delta and parser.feed(delta):
+                    break
+        finally:
+            # 提前退出时关闭连接，服务端随之停止生成
+            close = getattr(stream, 'close', None) or getattr(getattr(stream, 'response', None), 'close', None)
+            if close is not None:
+                close()
         
-        return ""
+        with self._token_lock:
+            self._stream_metrics['streamed'] += 1
+            self._stream_metrics['received_chars'] += len(parser.text)
+            if parser.stop_reason:
+                self._stream_metrics[f"stopped_{parser.stop_reason}"] += 1
+        if parser.stop_reason == STOP_IRRELEVANT:
+            logger.info("输出以空对象开头，内容不相关，提前终止生成")
+            return "{}"
+        if parser.stop_reason == STOP_LENGTH:
+            logger.warning(f"输出超过 {LLM_STREAM_MAX_CHARS} 字符，提前终止生成")
+            return ""
+        return parser.text
 
 
 class XDataProcessor(DataProcessor):
@@ -401,39 +671,31 @@ class XDataProcessor(DataProcessor):
             logger.info("未找到X平台临时数据文件")
             return 0
         
-        # 读取临时数据
+        # 按批流式读取临时数据，不把整个文件加载到内存
         try:
-            with open(X_TEMP_DATA_PATH, 'r', encoding='utf-8') as f:
-                temp_data = json.load(f)
-            
-            if not temp_data:
-                logger.info("X平台临时数据为空")
-                return 0
-            
-            logger.info(f"读取到 {len(temp_data)} 条X平台原始数据")
-            
             # 批量处理数据，每批处理 BATCH_SIZE 条
             processed_count = 0
             stored_count = 0
             
-            # 添加批处理和间隔逻辑
-            for i in range(0, len(temp_data), BATCH_SIZE):
-                batch = temp_data[i:i+BATCH_SIZE]
-                logger.info(f"处理批次 {i//BATCH_SIZE + 1}/{(len(temp_data)-1)//BATCH_SIZE + 1}，共 {len(batch)} 条数据")
+            batch_count = 0
+            for batch in iter_chunks(iter_json_items(X_TEMP_DATA_PATH), BATCH_SIZE):
+                batch_count += 1
+                logger.info(f"处理批次 {batch_count}，共 {len(batch)} 条数据")
                 
-                # 处理当前批次
-                for item in batch:
-                    processed_item = self._process_x_item(item)
+                # 并发处理当前批次
+                for processed_item in self._map_concurrently(self._process_x_item, batch):
                     if processed_item:
                         # 存储处理后的数据
                         if self.storage.store(processed_item):
                             stored_count += 1
                         processed_count += 1
-                
-                # 如果不是最后一批，等待一段时间再处理下一批
-                if i + BATCH_SIZE < len(temp_data):
-                    logger.info(f"批处理完成，等待 {BATCH_INTERVAL} 秒后处理下一批...")
-                    time.sleep(BATCH_INTERVAL)
+            
+            if batch_count == 0:
+                logger.info("X平台临时数据为空")
+                return 0
+            
+            # 等待写入缓冲区落库后再清空临时文件
+            self.storage.flush()
             
             # 处理完成后清空临时文件
             if processed_count > 0:
@@ -454,68 +716,69 @@ class XDataProcessor(DataProcessor):
             logger.error(traceback.format_exc())
             return 0
     
+    def _build_x_input(self, item: Dict[str, Any]) -> Optional[str]:
+        """构建单条推文的AI输入文本，数据格式不正确时返回None"""
+        # 确保raw是一个字典
+        if 'raw' not in item or not isinstance(item['raw'], dict):
+            logger.error(f"X数据缺少raw字段或raw不是字典类型: {item.get('source_url', 'unknown')}")
+            return None
+        
+        # 准备输入文本
+        raw_data = item.get('raw', {})
+        author_name = raw_data.get('name', '')
+        author_username = raw_data.get('username', '')
+        
+        # 处理媒体URL
+        media_urls_text = ""
+        if 'media_urls' in raw_data and raw_data['media_urls']:
+            media_urls = raw_data['media_urls']
+            media_urls_text = "\n\n媒体链接:\n"
+            for i, url in enumerate(media_urls):
+                media_type = "图片" if any(ext in url.lower() for ext in ['.jpg', '.jpeg', '.png', '.gif']) else "视频" if any(ext in url.lower() for ext in ['.mp4', '.mov', '.avi']) else "链接"
+                media_urls_text += f"{i+1}. {media_type}链接: {url}\n"
+        
+        # 构建输入文本，确保所有必要信息都包含
+        input_text = (
+            f"推文内容: {item.get('text', '')}\n\n"
+            f"作者: {author_name} (@{author_username})\n"
+            f"粉丝数: {raw_data.get('followers_count', 0)}\n"
+            f"点赞数: {raw_data.get('favorite_count', 0)}\n"
+            f"转发数: {raw_data.get('retweet_count', 0)}\n"
+            f"发布时间: {item.get('date_time', '')}"
+        )
+        
+        # 添加媒体URL信息
+        if media_urls_text:
+            input_text += f"\n{media_urls_text}"
+        return input_text
+    
     def _process_x_item(self, item: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         """处理单条X平台数据"""
+        self._set_outcome(CLEAN_INVALID)
         try:
-            # 确保raw是一个字典
-            if 'raw' not in item or not isinstance(item['raw'], dict):
-                logger.error(f"X数据缺少raw字段或raw不是字典类型: {item.get('source_url', 'unknown')}")
+            input_text = self._build_x_input(item)
+            if input_text is None:
                 return None
             
-            # 准备输入文本
-            raw_data = item.get('raw', {})
-            author_name = raw_data.get('name', '')
-            author_username = raw_data.get('username', '')
-            
             # 日志记录更详细的数据
-            logger.info(f"处理X数据: 作者={author_name}, 粉丝={raw_data.get('followers_count', 0)}, URL={item.get('source_url', '')}")
-            
-            # 处理媒体URL
-            media_urls_text = ""
-            if 'media_urls' in raw_data and raw_data['media_urls']:
-                media_urls = raw_data['media_urls']
-                media_urls_text = "\n\n媒体链接:\n"
-                for i, url in enumerate(media_urls):
-                    media_type = "图片" if any(ext in url.lower() for ext in ['.jpg', '.jpeg', '.png', '.gif']) else "视频" if any(ext in url.lower() for ext in ['.mp4', '.mov', '.avi']) else "链接"
-                    media_urls_text += f"{i+1}. {media_type}链接: {url}\n"
-            
-            # 构建输入文本，确保所有必要信息都包含
-            input_text = (
-                f"推文内容: {item.get('text', '')}\n\n"
-                f"作者: {author_name} (@{author_username})\n"
-                f"粉丝数: {raw_data.get('followers_count', 0)}\n"
-                f"点赞数: {raw_data.get('favorite_count', 0)}\n"
-                f"转发数: {raw_data.get('retweet_count', 0)}\n"
-                f"发布时间: {item.get('date_time', '')}"
-            )
-            
-            # 添加媒体URL信息
-            if media_urls_text:
-                input_text += f"\n{media_urls_text}"
+            raw_data = item['raw']
+            logger.info(f"处理X数据: 作者={raw_data.get('name', '')}, 粉丝={raw_data.get('followers_count', 0)}, URL={item.get('source_url', '')}")
             
             # 获取系统提示词
             system_prompt = SystemPrompts.get_for_source("x.com")
             
-            # 调用AI处理，增加重试
-            max_retries = 3
-            for retry in range(max_retries):
-                try:
-                    result = self._call_ai_api(system_prompt, input_text)
-                    break
-                except Exception as e:
-                    if retry < max_retries - 1:
-                        logger.warning(f"API调用失败，重试 ({retry+1}/{max_retries}): {str(e)}")
-                        time.sleep(5)
-                    else:
-                        logger.error(f"API调用最终失败: {str(e)}")
-                        return None
-            
-            # 如果结果为空，可能是非AI相关内容，跳过
-            if not result or len(result.strip()) < 10:
-                logger.info("内容可能不相关或处理结果为空，跳过")
+            # 调用AI处理（重试由限流器负责），流式接收时标题生成后即可在日志中看到
+            source_url = item.get('source_url', '')
+            def on_partial(name, value):
+                if name in ('title', '标题'):
+                    logger.info(f"已接收标题: {value}，URL={source_url}")
+            result = self._call_ai_api(system_prompt, input_text, on_partial, json_mode=True)
+            self._record_tokens('single', 1)
+            if self.last_call_failed():
+                self._set_outcome(CLEAN_API_FAILED)
                 return None
             
-            # 解析处理结果
+            # 解析处理结果，不相关或解析失败时返回None，结果见 last_outcome
             return self._parse_x_result(result, item)
             
         except Exception as e:
@@ -523,146 +786,168 @@ class XDataProcessor(DataProcessor):
             logger.error(traceback.format_exc())
             return None
     
-    def _parse_x_result(self, result: str, original_item: Dict[str, Any]) -> Optional[Dict[str, Any]]:
-        """解析AI处理后的X平台结果"""
+    def pack_x_batches(self, items: List[Dict[str, Any]], token_budget: int = X_BATCH_TOKEN_BUDGET,
+                       max_items: int = X_BATCH_MAX_ITEMS) -> List[List[int]]:
+        """按估算token数把推文装箱（首次适应递减），每箱的输入token数不超过预算
+        
+        每条推文的输出长度与输入大致成正比，限制输入也就限制了一次请求的输出长度。
+        单条超过预算的推文单独成箱。
+        
+        Args:
+            items: 推文列表
+            token_budget: 每次请求的输入token预算（不含系统提示词）
+            max_items: 每次请求最多包含的推文数
+        
+        Returns:
+            每箱包含的推文下标列表
+        """
+        sizes = [TextUtils.estimate_tokens(self._build_x_input(item) or '') for item in items]
+        bins: List[Tuple[List[int], int]] = []
+        for index in sorted(range(len(items)), key=lambda i: sizes[i], reverse=True):
+            for i, (members, used) in enumerate(bins):
+                if len(members) < max_items and used + sizes[index] <= token_budget:
+                    bins[i] = (members + [index], used + sizes[index])
+                    break
+            else:
+                bins.append(([index], sizes[index]))
+        return [sorted(members) for members, _ in bins]
+    
+    def process_x_batch(self, items: List[Dict[str, Any]]) -> List[Tuple[Optional[Dict[str, Any]], str]]:
+        """用一次AI请求处理多条推文，解析失败的推文再逐条重试
+        
+        Args:
+            items: 推文列表，通常来自 pack_x_batches 的一箱
+        
+        Returns:
+            与items一一对应的 (清洗结果, 清洗结果类型 CLEAN_*)
+        """
+        if len(items) == 1:
+            result = self._process_x_item(items[0])
+            return [(result, self.last_outcome())]
+        
+        outcomes: List[Tuple[Optional[Dict[str, Any]], str]] = [(None, CLEAN_INVALID)] * len(items)
+        inputs = [self._build_x_input(item) for item in items]
+        pending = [i for i, text in enumerate(inputs) if text is not None]
+        if not pending:
+            return outcomes
+        
+        logger.info(f"批量处理 {len(pending)} 条X数据: {[items[i].get('source_url', '') for i in pending]}")
+        prompt = "\n\n".join(f"[#{number}]\n{inputs[i]}" for number, i in enumerate(pending, 1))
+        result = self._call_ai_api(SystemPrompts.get_x_batch_prompt(), prompt, json_mode=True)
+        if self.last_call_failed():
+            # 限流器已经重试过，整批交给队列按退避策略重新排队
+            return [(None, CLEAN_API_FAILED) if i in pending else outcome for i, outcome in enumerate(outcomes)]
+        single_prompt_tokens = TextUtils.estimate_tokens(SystemPrompts.get_x_prompt())
+        self._record_tokens('batch', len(pending), sum(single_prompt_tokens + TextUtils.estimate_tokens(inputs[i]) for i in pending))
+        
+        elements, repaired = self._parse_x_batch_result(result, len(pending))
+        retry = []
+        for number, i in enumerate(pending, 1):
+            element = elements.get(number)
+            if element is None:
+                retry.append(i)
+                continue
+            fields = {key: value for key, value in element.items() if key != 'index'}
+            if not fields:
+                # 只有序号：内容与AI无关
+                outcomes[i] = (None, CLEAN_IRRELEVANT)
+                continue
+            record = self._validate_record(fields, X_RECORD_FIELDS, 'X批量', repaired)
+            if record is None:
+                retry.append(i)
+                continue
+            outcomes[i] = (self._build_x_record(record, items[i]), CLEAN_OK)
+        
+        # 所有元素都有效时才缓存批量响应，逐条重试的结果各自缓存
+        self._settle_cache(not retry)
+        if retry:
+            logger.warning(f"批量结果中 {len(retry)} 条缺失或格式不正确，逐条重试")
+            for i in retry:
+                outcomes[i] = (self._process_x_item(items[i]), self.last_outcome())
+        return outcomes
+    
+    def _parse_x_batch_result(self, result: str, count: int) -> Tuple[Dict[int, Dict[str, Any]], bool]:
+        """解析批量请求返回的 {"results": [...]}（也接受直接返回的JSON数组）
+        
+        Args:
+            result: AI返回的文本
+            count: 请求中的推文条数
+        
+        Returns:
+            ({推文序号: 结果对象}, 是否经过JSON修复)，无法解析的元素不包含在内
+        """
+        logger.debug(f"API原始响应(X批量): {result}")
         try:
-            # 记录原始API响应以进行调试
-            logger.info(f"API原始响应: {result}")
-            
-            # 首先尝试将结果解析为JSON
-            try:
-                # 检查是否包含JSON字符串（可能被额外文本包围）
-                json_start = result.find('{')
-                json_end = result.rfind('}')
-                
-                if json_start >= 0 and json_end > json_start:
-                    json_str = result[json_start:json_end+1]
-                    logger.info(f"尝试解析JSON: {json_str}")
-                    parsed_json = json.loads(json_str)
-                    
-                    # 如果成功解析为JSON，从中提取我们需要的字段
-                    if isinstance(parsed_json, dict):
-                        # 应用空格处理函数
-                        title = parsed_json.get('标题', parsed_json.get('title', ''))
-                        content = parsed_json.get('正文', parsed_json.get('content', ''))
-                        title = TextUtils.ensure_space_around_english_and_numbers(title)
-                        content = TextUtils.ensure_space_around_english_and_numbers(content)
-                        
-                        return {
-                            'title': title,
-                            'content': content,
-                            'author': parsed_json.get('作者', parsed_json.get('author', '')),
-                            'date_time': parsed_json.get('日期', parsed_json.get('date_time', original_item.get('date_time', ''))),
-                            'source': 'x.com',
-                            'source_url': original_item.get('source_url', original_item.get('raw', {}).get('url', '')),
-                            'likes': parsed_json.get('点赞数', parsed_json.get('likes', original_item.get('raw', {}).get('favorite_count', 0))),
-                            'retweets': parsed_json.get('转发数', parsed_json.get('retweets', original_item.get('raw', {}).get('retweet_count', 0))),
-                            'followers': parsed_json.get('粉丝数', parsed_json.get('followers', original_item.get('raw', {}).get('followers_count', 0))),
-                            'processed_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-                            'id': generate_id(f"x.com_{original_item.get('source_url', '')}")
-                        }
-            except Exception as e:
-                logger.warning(f"JSON解析失败，回退到文本解析: {e}")
-            
-            # 如果JSON解析失败，回退到文本解析
-            lines = result.split('\n')
-            parsed = {}
-            
-            # 提取字段
-            current_field = None
-            content_lines = []
-            
-            for line in lines:
-                line = line.strip()
-                if not line:
+            parsed, repaired = loads_json(result)
+        except JSONOutputError as e:
+            logger.warning(f"批量结果JSON解析失败: {e}，响应开头: {result[:200] if result else ''}")
+            self._count_parse('failed')
+            return {}, False
+        array = parsed.get('results') if isinstance(parsed, dict) else parsed
+        if not isinstance(array, list):
+            logger.warning(f"批量结果中没有results数组: {result[:200]}")
+            self._count_parse('failed')
+            return {}, False
+        
+        elements = {}
+        has_index = all(isinstance(element, dict) and 'index' in element for element in array)
+        for position, element in enumerate(array, 1):
+            if not isinstance(element, dict):
+                continue
+            if has_index:
+                try:
+                    number = int(element['index'])
+                except (TypeError, ValueError):
                     continue
-                
-                if ':' in line and not line.startswith('http') and not line.startswith('——'):
-                    # 如果有新字段开始，先保存之前收集的正文内容
-                    if current_field == 'content' and content_lines:
-                        parsed['content'] = '\n'.join(content_lines)
-                        content_lines = []
-                    
-                    key, value = line.split(':', 1)
-                    key = key.strip()
-                    value = value.strip()
-                    current_field = None
-                    
-                    if key == '标题':
-                        parsed['title'] = value
-                        current_field = 'title'
-                    elif key == '正文':
-                        # 开始收集正文内容，而不是直接赋值
-                        content_lines = [value] if value else []
-                        current_field = 'content'
-                    elif key == '作者':
-                        parsed['author'] = value
-                        current_field = 'author'
-                    elif key == '粉丝数':
-                        try:
-                            parsed['followers'] = int(value.replace(',', ''))
-                        except (ValueError, TypeError):
-                            parsed['followers'] = original_item.get('raw', {}).get('followers_count', 0)
-                    elif key == '点赞数':
-                        try:
-                            parsed['likes'] = int(value.replace(',', ''))
-                        except (ValueError, TypeError):
-                            parsed['likes'] = original_item.get('raw', {}).get('favorite_count', 0)
-                    elif key == '转发数':
-                        try:
-                            parsed['retweets'] = int(value.replace(',', ''))
-                        except (ValueError, TypeError):
-                            parsed['retweets'] = original_item.get('raw', {}).get('retweet_count', 0)
-                    elif key == '日期':
-                        parsed['date_time'] = value
-                        current_field = 'date_time'
-                else:
-                    # 继续收集当前字段的内容
-                    if current_field == 'content':
-                        content_lines.append(line)
-            
-            # 保存最后收集的正文内容
-            if current_field == 'content' and content_lines:
-                parsed['content'] = '\n'.join(content_lines)
-            
-            # 验证必要字段 - 如果缺少标题或内容，则返回None
-            if not parsed.get('title') or not parsed.get('content'):
-                logger.warning("解析结果缺少标题或正文字段，跳过处理")
-                return None
-            
-            # 准备作者信息
-            author_name = original_item.get('raw', {}).get('name', '')
-            author_username = original_item.get('raw', {}).get('username', '')
-            author_display = f"{author_name} (@{author_username})" if author_name and author_username else author_name or author_username
-            
-            # 应用空格处理函数
-            title = TextUtils.ensure_space_around_english_and_numbers(parsed.get('title', ''))
-            content = TextUtils.ensure_space_around_english_and_numbers(parsed.get('content', ''))
-            
-            # 构建最终结构化数据
-            structured_data = {
-                'title': title,
-                'content': content,
-                'author': parsed.get('author', author_display),
-                'date_time': parsed.get('date_time', original_item.get('date_time', '')),
-                'source': 'x.com',
-                'source_url': original_item.get('source_url', original_item.get('raw', {}).get('url', '')),
-                'likes': parsed.get('likes', original_item.get('raw', {}).get('favorite_count', 0)),
-                'retweets': parsed.get('retweets', original_item.get('raw', {}).get('retweet_count', 0)),
-                'followers': parsed.get('followers', original_item.get('raw', {}).get('followers_count', 0)),
-                'processed_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-            }
-            
-            # 生成唯一ID
-            id_text = f"{structured_data['source']}_{structured_data['source_url']}"
-            structured_data['id'] = generate_id(id_text)
-            
-            return structured_data
-            
-        except Exception as e:
-            logger.error(f"解析X处理结果出错: {e}")
-            logger.error(traceback.format_exc())
+            elif len(array) == count:
+                # 没有给出序号时，只有条数一致才按位置对应
+                number = position
+            else:
+                continue
+            if 1 <= number <= count and number not in elements:
+                elements[number] = element
+        return elements, repaired
+    
+    def _parse_x_result(self, result: str, original_item: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """解析AI处理后的X平台结果，内容不相关或解析失败时返回None，并记录清洗结果类型"""
+        record = self._parse_record(result, X_RECORD_FIELDS, 'X')
+        self._settle_cache(record is not None)
+        if not record:
+            self._set_outcome(CLEAN_FORMAT_FAILED if record is None else CLEAN_IRRELEVANT)
+            if record is not None:
+                logger.info("内容不相关，跳过")
             return None
+        self._set_outcome(CLEAN_OK)
+        return self._build_x_record(record, original_item)
+    
+    def _build_x_record(self, record: Dict[str, Any], original_item: Dict[str, Any]) -> Dict[str, Any]:
+        """用校验后的记录和原始推文构建入库数据，AI没有给出的字段使用原始数据"""
+        raw = original_item.get('raw', {})
+        
+        # 准备作者信息
+        author_name = raw.get('name', '')
+        author_username = raw.get('username', '')
+        author_display = f"{author_name} (@{author_username})" if author_name and author_username else author_name or author_username
+        
+        # 构建最终结构化数据
+        structured_data = {
+            'title': TextUtils.ensure_space_around_english_and_numbers(record['title']),
+            'content': TextUtils.ensure_space_around_english_and_numbers(record['content']),
+            'author': record.get('author', author_display),
+            'date_time': record.get('date_time', original_item.get('date_time', '')),
+            'source': 'x.com',
+            'source_url': original_item.get('source_url', raw.get('url', '')),
+            'likes': record.get('likes', raw.get('favorite_count', 0)),
+            'retweets': record.get('retweets', raw.get('retweet_count', 0)),
+            'followers': record.get('followers', raw.get('followers_count', 0)),
+            'processed_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        }
+        
+        # 生成唯一ID
+        id_text = f"{structured_data['source']}_{structured_data['source_url']}"
+        structured_data['id'] = generate_id(id_text)
+        
+        return structured_data
 
 
 class CrunchbaseDataProcessor(DataProcessor):
@@ -677,39 +962,31 @@ class CrunchbaseDataProcessor(DataProcessor):
             logger.info("未找到Crunchbase临时数据文件")
             return 0
         
-        # 读取临时数据
+        # 按批流式读取临时数据，不把整个文件加载到内存
         try:
-            with open(CRU_TEMP_DATA_PATH, 'r', encoding='utf-8') as f:
-                temp_data = json.load(f)
-            
-            if not temp_data:
-                logger.info("Crunchbase临时数据为空")
-                return 0
-            
-            logger.info(f"读取到 {len(temp_data)} 条Crunchbase原始数据")
-            
             # 批量处理数据
             processed_count = 0
             stored_count = 0
             
-            # 添加批处理和间隔逻辑
-            for i in range(0, len(temp_data), BATCH_SIZE):
-                batch = temp_data[i:i+BATCH_SIZE]
-                logger.info(f"处理批次 {i//BATCH_SIZE + 1}/{(len(temp_data)-1)//BATCH_SIZE + 1}，共 {len(batch)} 条数据")
+            batch_count = 0
+            for batch in iter_chunks(iter_json_items(CRU_TEMP_DATA_PATH), BATCH_SIZE):
+                batch_count += 1
+                logger.info(f"处理批次 {batch_count}，共 {len(batch)} 条数据")
                 
-                # 处理当前批次
-                for item in batch:
-                    processed_item = self._process_crunchbase_item(item)
+                # 并发处理当前批次
+                for processed_item in self._map_concurrently(self._process_crunchbase_item, batch):
                     if processed_item:
                         # 存储处理后的数据
                         if self.storage.store(processed_item):
                             stored_count += 1
                         processed_count += 1
-                
-                # 如果不是最后一批，等待一段时间再处理下一批
-                if i + BATCH_SIZE < len(temp_data):
-                    logger.info(f"批处理完成，等待 {BATCH_INTERVAL} 秒后处理下一批...")
-                    time.sleep(BATCH_INTERVAL)
+            
+            if batch_count == 0:
+                logger.info("Crunchbase临时数据为空")
+                return 0
+            
+            # 等待写入缓冲区落库后再清空临时文件
+            self.storage.flush()
             
             # 处理完成后清空临时文件
             if processed_count > 0:
@@ -731,12 +1008,26 @@ class CrunchbaseDataProcessor(DataProcessor):
             return 0
     
     def _process_crunchbase_item(self, item: Dict[str, Any]) -> Optional[Dict[str, Any]]:
-        """处理单条Crunchbase数据"""
+        """处理单条Crunchbase数据
+        
+        正文先删除模板段落；仍超过 CRUNCHBASE_MAX_INPUT_TOKENS 时先分块并发摘要，
+        再对摘要做结构化提取，避免单次请求过长而超时。
+        """
+        self._set_outcome(CLEAN_INVALID)
         try:
+            content = TextUtils.trim_boilerplate(item.get('content', ''))
+            tokens = TextUtils.estimate_tokens(content)
+            logger.info(f"Crunchbase正文估算 {tokens} tokens（删除模板段落前 {TextUtils.estimate_tokens(item.get('content', ''))}）: {item.get('url', '')}")
+            if tokens > CRUNCHBASE_MAX_INPUT_TOKENS:
+                content = self._summarize_long_content(item.get('title', ''), content)
+                if content is None:
+                    self._set_outcome(CLEAN_API_FAILED)
+                    return None
+            
             # 准备输入文本，确保包含published_date字段
             input_text = (
                 f"文章标题: {item.get('title', '')}\n\n"
-                f"文章内容: {item.get('content', '')}\n\n"
+                f"文章内容: {content}\n\n"
                 f"作者: {item.get('author', '')}\n"
                 f"发布时间: {item.get('published_date', item.get('date_time', ''))}\n"
                 f"URL: {item.get('url', '')}"
@@ -746,14 +1037,12 @@ class CrunchbaseDataProcessor(DataProcessor):
             system_prompt = SystemPrompts.get_for_source("crunchbase.com")
             
             # 调用AI处理
-            result = self._call_ai_api(system_prompt, input_text)
-            
-            # 如果结果为空，跳过
-            if not result or len(result.strip()) < 10:
-                logger.info("处理结果为空，跳过")
+            result = self._call_ai_api(system_prompt, input_text, json_mode=True)
+            if self.last_call_failed():
+                self._set_outcome(CLEAN_API_FAILED)
                 return None
             
-            # 解析处理结果
+            # 解析处理结果，不相关或解析失败时返回None，结果见 last_outcome
             return self._parse_crunchbase_result(result, item)
             
         except Exception as e:
@@ -761,159 +1050,69 @@ class CrunchbaseDataProcessor(DataProcessor):
             logger.error(traceback.format_exc())
             return None
     
+    def _summarize_long_content(self, title: str, content: str) -> Optional[str]:
+        """长文分块并发摘要，按原顺序拼接
+        
+        Returns:
+            拼接后的摘要；任一分块的AI调用最终失败时返回None，并标记本次调用失败以便重新排队
+        """
+        chunks = TextUtils.split_by_tokens(content, CRUNCHBASE_CHUNK_TOKENS)
+        logger.info(f"Crunchbase长文分为 {len(chunks)} 块并发摘要")
+        system_prompt = SystemPrompts.get_crunchbase_chunk_prompt()
+        
+        def summarize(index: int) -> Tuple[str, bool]:
+            prompt = f"文章标题: {title}\n\n第 {index + 1}/{len(chunks)} 部分:\n{chunks[index]}"
+            summary = self._call_ai_api(system_prompt, prompt)
+            return summary, self.last_call_failed()
+        
+        with ThreadPoolExecutor(max_workers=max(1, min(len(chunks), CRUNCHBASE_MAP_WORKERS))) as executor:
+            results = list(executor.map(summarize, range(len(chunks))))
+        
+        if any(failed for _, failed in results):
+            logger.error(f"Crunchbase长文分块摘要失败 {sum(1 for _, failed in results if failed)}/{len(chunks)} 块")
+            self._api_state.failed = True
+            return None
+        summaries = [summary.strip() for summary, _ in results if summary and summary.strip()]
+        merged = '\n\n'.join(summaries)
+        logger.info(f"Crunchbase长文摘要完成: {TextUtils.estimate_tokens(content)} -> {TextUtils.estimate_tokens(merged)} tokens")
+        return merged
+    
     def _parse_crunchbase_result(self, result: str, original_item: Dict[str, Any]) -> Optional[Dict[str, Any]]:
-        """解析AI处理后的Crunchbase结果"""
-        try:
-            # 记录原始API响应以进行调试
-            logger.info(f"API原始响应(Crunchbase): {result}")
-            
-            # 首先尝试将结果解析为JSON
-            try:
-                # 检查是否包含JSON字符串（可能被额外文本包围）
-                json_start = result.find('{')
-                json_end = result.rfind('}')
-                
-                if json_start >= 0 and json_end > json_start:
-                    json_str = result[json_start:json_end+1]
-                    logger.info(f"尝试解析JSON(Crunchbase): {json_str}")
-                    parsed_json = json.loads(json_str)
-                    
-                    # 如果成功解析为JSON，从中提取我们需要的字段
-                    if isinstance(parsed_json, dict):
-                        # 应用空格处理函数
-                        title = parsed_json.get('标题', parsed_json.get('title', ''))
-                        content = parsed_json.get('正文', parsed_json.get('content', ''))
-                        title = TextUtils.ensure_space_around_english_and_numbers(title)
-                        content = TextUtils.ensure_space_around_english_and_numbers(content)
-                        
-                        # 优先从文本解析结果中获取日期，如果为空或"未提供"则从原始数据中获取
-                        date_from_parsed = parsed_json.get('日期', '')
-                        if date_from_parsed and date_from_parsed != '未提供':
-                            date_time = date_from_parsed
-                        else:
-                            date_time = original_item.get('published_date', original_item.get('date_time', ''))
-                        
-                        structured_data = {
-                            'title': title,
-                            'content': content,
-                            'author': parsed_json.get('作者', parsed_json.get('author', '')),
-                            'date_time': date_time,
-                            'source': 'crunchbase.com',
-                            'source_url': original_item.get('url', ''),
-                            'company': parsed_json.get('公司', parsed_json.get('company', '')),
-                            'funding_round': parsed_json.get('融资轮次', parsed_json.get('funding_round', '')),
-                            'funding_amount': parsed_json.get('融资金额', parsed_json.get('funding_amount', '')),
-                            'investors': parsed_json.get('投资方', parsed_json.get('investors', '')),
-                            'processed_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                        }
-                        
-                        # 生成唯一ID
-                        id_text = f"crunchbase.com_{structured_data['source_url']}"
-                        structured_data['id'] = generate_id(id_text)
-                        
-                        return structured_data
-            except Exception as e:
-                logger.warning(f"JSON解析失败(Crunchbase)，回退到文本解析: {e}")
-            
-            # 如果JSON解析失败，回退到文本解析
-            lines = result.split('\n')
-            parsed = {}
-            
-            # 提取字段
-            current_field = None
-            content_lines = []
-            
-            for line in lines:
-                line = line.strip()
-                if not line:
-                    continue
-                
-                if ':' in line and not line.startswith('http') and not line.startswith('——'):
-                    # 如果有新字段开始，先保存之前收集的正文内容
-                    if current_field == 'content' and content_lines:
-                        parsed['content'] = '\n'.join(content_lines)
-                        content_lines = []
-                    
-                    key, value = line.split(':', 1)
-                    key = key.strip()
-                    value = value.strip()
-                    current_field = None
-                    
-                    if key == '标题':
-                        parsed['title'] = value
-                        current_field = 'title'
-                    elif key == '正文':
-                        # 开始收集正文内容，而不是直接赋值
-                        content_lines = [value] if value else []
-                        current_field = 'content'
-                    elif key == '作者':
-                        parsed['author'] = value
-                        current_field = 'author'
-                    elif key == '公司':
-                        parsed['company'] = value
-                        current_field = 'company'
-                    elif key == '融资轮次':
-                        parsed['funding_round'] = value
-                        current_field = 'funding_round'
-                    elif key == '融资金额':
-                        parsed['funding_amount'] = value
-                        current_field = 'funding_amount'
-                    elif key == '投资方':
-                        parsed['investors'] = value
-                        current_field = 'investors'
-                    elif key == '日期':
-                        parsed['date_time'] = value
-                        current_field = 'date_time'
-                else:
-                    # 继续收集当前字段的内容
-                    if current_field == 'content':
-                        content_lines.append(line)
-            
-            # 保存最后收集的正文内容
-            if current_field == 'content' and content_lines:
-                parsed['content'] = '\n'.join(content_lines)
-            
-            # 验证必要字段 - 如果缺少标题或内容，则返回None
-            if not parsed.get('title') or not parsed.get('content'):
-                logger.warning("解析结果缺少标题或正文字段，跳过处理")
-                return None
-            
-            # 应用空格处理函数
-            title = TextUtils.ensure_space_around_english_and_numbers(parsed.get('title', ''))
-            content = TextUtils.ensure_space_around_english_and_numbers(parsed.get('content', ''))
-            
-            # 优先从文本解析结果中获取日期，如果为空或"未提供"则从原始数据中获取
-            date_from_parsed = parsed.get('date_time', '')
-            if date_from_parsed and date_from_parsed != '未提供':
-                date_time = date_from_parsed
-            else:
-                date_time = original_item.get('published_date', original_item.get('date_time', ''))
-            
-            # 构建最终结构化数据
-            structured_data = {
-                'title': title,
-                'content': content,
-                'author': parsed.get('author', original_item.get('author', '')),
-                'date_time': date_time,
-                'source': 'crunchbase.com',
-                'source_url': original_item.get('url', ''),
-                'company': parsed.get('company', '未提供'),
-                'funding_round': parsed.get('funding_round', '未提供'),
-                'funding_amount': parsed.get('funding_amount', '未提供'),
-                'investors': parsed.get('investors', '未提供'),
-                'processed_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-            }
-            
-            # 生成唯一ID
-            id_text = f"{structured_data['source']}_{structured_data['source_url']}"
-            structured_data['id'] = generate_id(id_text)
-            
-            return structured_data
-            
-        except Exception as e:
-            logger.error(f"解析Crunchbase处理结果出错: {e}")
-            logger.error(traceback.format_exc())
+        """解析AI处理后的Crunchbase结果，内容不相关或解析失败时返回None，并记录清洗结果类型"""
+        record = self._parse_record(result, CRUNCHBASE_RECORD_FIELDS, 'Crunchbase')
+        self._settle_cache(record is not None)
+        if not record:
+            self._set_outcome(CLEAN_FORMAT_FAILED if record is None else CLEAN_IRRELEVANT)
+            if record is not None:
+                logger.info("内容不相关，跳过")
             return None
+        self._set_outcome(CLEAN_OK)
+        
+        # 优先使用AI提取的日期，如果为空或"未提供"则从原始数据中获取
+        date_time = record.get('date_time', '')
+        if not date_time or date_time == '未提供':
+            date_time = original_item.get('published_date', original_item.get('date_time', ''))
+        
+        # 构建最终结构化数据
+        structured_data = {
+            'title': TextUtils.ensure_space_around_english_and_numbers(record['title']),
+            'content': TextUtils.ensure_space_around_english_and_numbers(record['content']),
+            'author': record.get('author', original_item.get('author', '')),
+            'date_time': date_time,
+            'source': 'crunchbase.com',
+            'source_url': original_item.get('url', ''),
+            'company': record.get('company', '未提供'),
+            'funding_round': record.get('funding_round', '未提供'),
+            'funding_amount': record.get('funding_amount', '未提供'),
+            'investors': record.get('investors', '未提供'),
+            'processed_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        }
+        
+        # 生成唯一ID
+        id_text = f"{structured_data['source']}_{structured_data['source_url']}"
+        structured_data['id'] = generate_id(id_text)
+        
+        return structured_data
 
 
 # 信号处理
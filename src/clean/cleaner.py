@@ -5,16 +5,36 @@
 数据清洗主模块 - 负责协调各个数据源的清洗流程
 """
 
+import os
 import time
 import logging
 import traceback
+from concurrent.futures import ThreadPoolExecutor, Future, wait, FIRST_COMPLETED
+from typing import List, Dict, Any, Optional, Tuple
 from src.utils.log_handler import get_logger
-from src.clean.cleandata import XDataProcessor, CrunchbaseDataProcessor
-from src.clean.storage import get_unprocessed_data, update_processed_data, clear_temp_files
+from src.utils.rate_limiter import get_rate_limiter
+from src.utils.llm_cache import get_llm_cache
+from src.utils.hedging import get_hedger
+from src.clean.cleandata import (
+    XDataProcessor, CrunchbaseDataProcessor, CLEANER_MAX_WORKERS, X_BATCH_MAX_ITEMS,
+    CLEAN_OK, CLEAN_IRRELEVANT, CLEAN_FORMAT_FAILED, CLEAN_API_FAILED, CLEAN_INVALID,
+)
+from src.db.work_queue import get_work_queue, import_legacy_temp_files
+from src.db.crawl_log import get_crawl_log, pump_to_queue, QUEUE_CONSUMER
+from src.clean.storage import raw_text, text_hash
+from src.clean.relevance import get_relevance_filter, RELEVANCE_FILTER_ENABLED
+from src.clean.near_duplicates import get_near_duplicate_index, NEAR_DUP_ENABLED, STATUS_PENDING, STATUS_STORED, STATUS_REJECTED
 
 # 创建日志记录器
 logger = get_logger("cleaner")
 
+# 每次从队列领取的数据条数
+CLEANER_BATCH_SIZE = int(os.getenv('CLEANER_BATCH_SIZE', '10'))
+
+# 已完成的结果累计到该条数或等待超过该秒数后写入数据库
+CLEANER_SAVE_BATCH_SIZE = int(os.getenv('CLEANER_SAVE_BATCH_SIZE', '10'))
+CLEANER_SAVE_INTERVAL = float(os.getenv('CLEANER_SAVE_INTERVAL', '5'))
+
 class CleaningService:
     """清洗服务类，整合不同来源的数据处理器"""
     
@@ -40,120 +60,464 @@ class CleaningService:
         else:
             logger.error(f"无法处理的数据来源: {item.get('source', 'unknown')}")
             return None
+    
+    def last_outcome(self, source):
+        """对应来源的处理器在当前线程最近一条数据的清洗结果类型（CLEAN_*）"""
+        if 'crunchbase' in (source or '').lower():
+            return self.crunchbase_processor.last_outcome()
+        if 'x' in (source or '').lower():
+            return self.x_processor.last_outcome()
+        return CLEAN_INVALID
+    
+    def clean(self, item):
+        """按来源选择清洗方法，在线程池中执行
+        
+        Returns:
+            (清洗结果, 清洗结果类型 CLEAN_*)，结果类型按线程记录，必须在同一线程中读取
+        """
+        source = item.get('source', 'unknown')
+        if 'x' in source.lower():
+            result = self.clean_x_data(item)
+        elif 'crunchbase' in source.lower():
+            result = self.clean_crunchbase_data(item)
+        else:
+            logger.warning(f"未知的数据源: {source}，使用默认清洗方法")
+            result = self.clean_default_data(item)
+        return result, self.last_outcome(source)
+    
+    def plan_batches(self, items: List[Dict[str, Any]]) -> List[List[int]]:
+        """把数据分组，每组在一个线程中处理：X数据按token预算装箱后一次请求处理多条，其他来源每条一组
+        
+        Returns:
+            每组包含的数据下标列表
+        """
+        x_indexes = [i for i, item in enumerate(items) if _is_x(item)]
+        x_set = set(x_indexes)
+        groups = [[i] for i in range(len(items)) if i not in x_set]
+        if X_BATCH_MAX_ITEMS > 1 and len(x_indexes) > 1:
+            packed = self.x_processor.pack_x_batches([items[i] for i in x_indexes])
+            groups += [[x_indexes[j] for j in members] for members in packed]
+        else:
+            groups += [[i] for i in x_indexes]
+        return groups
+    
+    def clean_batch(self, items: List[Dict[str, Any]]) -> List[Tuple[Optional[Dict[str, Any]], str]]:
+        """清洗 plan_batches 分出的一组数据，在线程池中执行
+        
+        Returns:
+            与items一一对应的 (清洗结果, 清洗结果类型 CLEAN_*)
+        """
+        if len(items) > 1:
+            return self.x_processor.process_x_batch(items)
+        return [self.clean(item) for item in items]
+
+class CleaningPipeline:
+    """一次清洗运行：从队列领取数据，在有界线程池中并发清洗，结果完成后分批入库并确认"""
+    
+    def __init__(self, queue, cleaner: CleaningService, storage, max_workers: int = CLEANER_MAX_WORKERS, relevance=None,
+                 near_duplicates=None):
+        self.queue = queue
+        self.cleaner = cleaner
+        self.storage = storage
+        # 推文相关性预过滤，为空时不过滤
+        self.relevance = relevance
+        # 推文近似重复索引，为空时不检测
+        self.near_duplicates = near_duplicates
+        # 本次运行中在途的代表推文 {URL: [(等待代表完成的重复条目, 引用)]}
+        self.held_duplicates: Dict[str, List[Tuple[Dict[str, Any], Dict[str, Any]]]] = {}
+        # 已完成清洗、尚未入库的代表推文结果 {URL: 清洗结果}
+        self.unsaved_results: Dict[str, Dict[str, Any]] = {}
+        self.max_workers = max(1, max_workers)
+        # 已完成清洗、等待入库的数据 (队列条目ID, 清洗结果)
+        self.pending_saves: List[Tuple[int, Dict[str, Any]]] = []
+        self.last_save_time = time.time()
+        self.total = 0
+        self.processed = 0
+        self.rejected = 0
+        self.failed = 0
+        self.resumed = 0
+        self.saved_count = 0
+        # 清洗前跳过的条数，按原因统计 url / text / batch（去重）、irrelevant（预过滤）和 near_duplicate（近似重复）
+        self.skipped: Dict[str, int] = {}
+    
+    def _lease(self) -> List[Dict[str, Any]]:
+        """领取一批数据；队列中没有可领取的数据时，才从爬虫日志再转入一块
+        
+        积压很多时也不必等全部读完才开始第一次AI调用。
+        """
+        while True:
+            leased = self.queue.dequeue(CLEANER_BATCH_SIZE)
+            if leased:
+                return leased
+            if pump_to_queue(self.queue, batch_size=CLEANER_BATCH_SIZE, max_items=CLEANER_BATCH_SIZE) == 0:
+                return []
+    
+    def _filter_duplicates(self, leased: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], List[Tuple[Dict[str, Any], str]]]:
+        """调用AI之前先去重：URL或正文已入库的数据直接确认，不再花费一次AI调用
+        
+        启用近似重复检测时，正文与已入库或同批数据相同的推文（原因 text / batch）不在这里确认，
+        而是交给 _attach_copies 作为引用归入代表文章。
+        
+        Returns:
+            (需要继续处理的数据, 等待归入代表文章的推文及去重原因)
+        """
+        reasons = self.storage.find_stored_duplicates([entry['payload'] for entry in leased])
+        kept, copies, duplicate_ids = [], [], []
+        for entry, reason in zip(leased, reasons):
+            if not reason:
+                kept.append(entry)
+            elif reason != 'url' and self.near_duplicates is not None and _is_x(entry['payload']):
+                copies.append((entry, reason))
+            else:
+                duplicate_ids.append(entry['id'])
+                self.skipped[reason] = self.skipped.get(reason, 0) + 1
+        if duplicate_ids:
+            self.queue.ack(duplicate_ids)
+            logger.info(f"跳过 {len(duplicate_ids)} 条已入库的数据，节省 {len(duplicate_ids)} 次AI调用")
+        return kept, copies
+    
+    def _prefilter(self, leased: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """调用AI之前用本地相关性过滤整批剔除明显与AI无关的推文，直接确认"""
+        if self.relevance is None:
+            return leased
+        x_entries = [entry for entry in leased if _is_x(entry['payload'])]
+        if not x_entries:
+            return leased
+        keep = self.relevance.filter([raw_text(entry['payload']) for entry in x_entries])
+        dropped_ids = {entry['id'] for entry, kept in zip(x_entries, keep) if not kept}
+        if not dropped_ids:
+            return leased
+        self.queue.ack(list(dropped_ids))
+        self.skipped['irrelevant'] = self.skipped.get('irrelevant', 0) + len(dropped_ids)
+        logger.info(f"相关性预过滤剔除 {len(dropped_ids)} 条推文，节省 {len(dropped_ids)} 次AI调用")
+        return [entry for entry in leased if entry['id'] not in dropped_ids]
+    
+    def _group_near_duplicates(self, fresh: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """调用AI之前按近似重复分组推文，每组只清洗代表
+        
+        与索引中的代表相似的推文：代表在本次运行中处理时等待代表完成，代表已入库时作为引用追加到代表文章，
+        代表被判定不相关时直接确认；代表不存在（仍在重试或已归档）时照常清洗并成为新的代表。
+        """
+        if self.near_duplicates is None:
+            return fresh
+        kept = []
+        for entry in fresh:
+            item = entry['payload']
+            url = _source_url(item)
+            signature = self.near_duplicates.signature(raw_text(item)) if _is_x(item) and url else None
+            if signature is None:
+                kept.append(entry)
+                continue
+            match = self.near_duplicates.query(signature)
+            if match is not None and match[0] != url and self._attach_duplicate(entry, *match):
+                continue
+            self.near_duplicates.add(url, signature)
+            self.held_duplicates.setdefault(url, [])
+            kept.append(entry)
+        return kept
+    
+    def _attach_copies(self, copies: List[Tuple[Dict[str, Any], str]]):
+        """正文与已入库或同批数据相同的推文不再清洗：在近似重复索引中找到代表时作为引用归入代表文章，否则直接确认
+        
+        必须在本批 _group_near_duplicates 之后调用，同批中第一条相同正文的推文此时已成为代表或已归入代表。
+        """
+        dropped = []
+        for entry, reason in copies:
+            url = _source_url(entry['payload'])
+            signature = self.near_duplicates.signature(raw_text(entry['payload'])) if url else None
+            match = self.near_duplicates.query(signature) if signature is not None else None
+            if match is not None and match[0] != url and self._attach_duplicate(entry, *match):
+                continue
+            dropped.append(entry['id'])
+            self.skipped[reason] = self.skipped.get(reason, 0) + 1
+        if dropped:
+            self.queue.ack(dropped)
+            logger.info(f"跳过 {len(dropped)} 条正文重复且找不到代表文章的推文，节省 {len(dropped)} 次AI调用")
+    
+    def _attach_duplicate(self, entry: Dict[str, Any], rep_url: str, similarity: float, status: str) -> bool:
+        """把近似重复的推文归入代表，返回False时照常清洗"""
+        ref = _duplicate_ref(entry['payload'], similarity)
+        if rep_url in self.held_duplicates:
+            self.held_duplicates[rep_url].append((entry, ref))
+            logger.info(f"近似重复（相似度 {similarity:.2f}），等待代表推文处理完成: {ref['source_url']} -> {rep_url}")
+            return True
+        if rep_url in self.unsaved_results:
+            self.unsaved_results[rep_url].setdefault('duplicates', []).append(ref)
+        elif status != STATUS_REJECTED and (status != STATUS_STORED or not self.storage.add_duplicate_refs(rep_url, [ref])):
+            return False
+        logger.info(f"近似重复（相似度 {similarity:.2f}），跳过清洗: {ref['source_url']} -> {rep_url}")
+        self._skip_duplicates([entry])
+        return True
+    
+    def _skip_duplicates(self, entries: List[Dict[str, Any]]):
+        self.queue.ack([entry['id'] for entry in entries])
+        self.skipped['near_duplicate'] = self.skipped.get('near_duplicate', 0) + len(entries)
+    
+    def _release_duplicates(self, item: Dict[str, Any], status: Optional[str]):
+        """代表推文处理完成：按AI判定记录状态（STATUS_STORED / STATUS_REJECTED），确认等待中的重复条目
+        
+        没有AI判定（调用失败、输出格式错误或数据无效）时索引中的状态保持pending，重复条目重新排队。
+        """
+        if self.near_duplicates is None or not _is_x(item):
+            return
+        url = _source_url(item)
+        held = self.held_duplicates.pop(url, None)
+        if status is not None:
+            self.near_duplicates.mark(url, status)
+        if not held:
+            return
+        if status is None:
+            for entry, _ in held:
+                self.queue.nack(entry['id'], "近似重复的代表推文没有得到AI判定")
+            return
+        self._skip_duplicates([entry for entry, _ in held])
+    
+    def _finish(self, entry: Dict[str, Any], result: Optional[Dict[str, Any]], irrelevant: bool = True):
+        """记录单条数据的清洗结果：成功的等待入库，不相关的直接确认
+        
+        Args:
+            entry: 队列条目
+            result: 清洗结果，为空时确认并不再重试
+            irrelevant: result为空时是否为AI的不相关判定，False表示原始数据无效或处理出错
+        """
+        source_url = _source_url(entry['payload'])
+        self._release_duplicates(entry['payload'], STATUS_STORED if result else STATUS_REJECTED if irrelevant else None)
+        if result:
+            self.pending_saves.append((entry['id'], result))
+            if self.near_duplicates is not None:
+                self.unsaved_results[source_url] = result
+            self.processed += 1
+            logger.info(f"成功处理数据: {source_url}")
+        else:
+            # 内容不相关或未通过校验，不再重试
+            self.rejected += 1
+            self.queue.ack([entry['id']])
+            logger.warning(f"处理数据失败: {source_url}")
+    
+    def _handle_completed(self, entries: List[Dict[str, Any]], future: Future):
+        """处理线程池中完成的一组数据，异常只影响这一组"""
+        try:
+            outcomes = future.result()
+        except Exception as e:
+            logger.error(f"处理数据出错: {[_source_url(entry['payload']) for entry in entries]}, 错误: {str(e)}")
+            logger.error(traceback.format_exc())
+            for entry in entries:
+                self.failed += 1
+                self.queue.nack(entry['id'], str(e))
+                self._release_duplicates(entry['payload'], None)
+            return
+        for entry, (result, outcome) in zip(entries, outcomes):
+            self._handle_result(entry, result, outcome)
+    
+    def _handle_result(self, entry: Dict[str, Any], result: Optional[Dict[str, Any]], outcome: str):
+        """处理单条数据的清洗结果：AI调用失败或输出格式错误的重新排队，其余记录检查点后完成"""
+        item = entry['payload']
+        source = item.get('source', 'unknown')
+        source_url = _source_url(item)
+        if not result and outcome in (CLEAN_API_FAILED, CLEAN_FORMAT_FAILED):
+            self.failed += 1
+            reason = "AI API调用失败" if outcome == CLEAN_API_FAILED else "AI输出格式错误"
+            status = self.queue.nack(entry['id'], reason)
+            logger.warning(f"{reason}，数据重新排队: {source_url}，状态: {status}")
+            self._release_duplicates(item, None)
+            return
+        
+        # AI的判定作为相关性模型的训练样本，只有模型明确返回不相关（空对象或只有序号）才记为负样本
+        if self.relevance is not None and _is_x(item) and outcome in (CLEAN_OK, CLEAN_IRRELEVANT):
+            self.relevance.record(raw_text(item), outcome == CLEAN_OK)
+        
+        if result:
+            # 确保清洗后的数据包含源URL和来源
+            if 'source_url' not in result and source_url:
+                result['source_url'] = source_url
+            if 'source' not in result:
+                result['source'] = source
+            # 记录原始正文哈希，供之后的清洗前去重
+            digest = text_hash(raw_text(item))
+            if digest:
+                result['text_hash'] = digest
+            # 等待中的近似重复推文作为引用随代表文章一起保存
+            refs = [ref for _, ref in self.held_duplicates.get(source_url, [])]
+            if refs:
+                result['duplicates'] = (result.get('duplicates') or []) + refs
+        
+        # 有AI判定的数据处理完立即记录检查点，检查点中的空结果即为不相关判定
+        if outcome in (CLEAN_OK, CLEAN_IRRELEVANT):
+            self.queue.checkpoint(entry['key'], result or None)
+        self._finish(entry, result or None, irrelevant=outcome == CLEAN_IRRELEVANT)
+    
+    def _save(self, force: bool = False):
+        """把已完成的结果写入数据库，写入成功后才确认；数量或时间达到阈值时写入"""
+        if not self.pending_saves:
+            return
+        if not force and len(self.pending_saves) < CLEANER_SAVE_BATCH_SIZE and time.time() - self.last_save_time < CLEANER_SAVE_INTERVAL:
+            return
+        batch, self.pending_saves = self.pending_saves, []
+        self.last_save_time = time.time()
+        
+        logger.info(f"开始批量保存 {len(batch)} 条处理后的数据...")
+        inserted, failed_urls = self.storage.save_articles_with_failures([result for _, result in batch])
+        self.saved_count += inserted
+        done_ids = []
+        for item_id, result in batch:
+            self.unsaved_results.pop(result.get('source_url'), None)
+            if result.get('source_url') in failed_urls:
+                self.failed += 1
+                self.queue.nack(item_id, "文章写入数据库失败")
+                # 代表推文重试前不再接收重复引用，等待中的引用已保存在检查点中
+                if self.near_duplicates is not None:
+                    self.near_duplicates.mark(result.get('source_url'), STATUS_PENDING)
+            else:
+                done_ids.append(item_id)
+        self.queue.ack(done_ids)
+        logger.info(f"批量保存完成，成功保存 {inserted} 条数据")
+    
+    def run(self):
+        """运行到队列和爬虫日志中没有可处理的数据为止"""
+        futures: Dict[Future, List[Dict[str, Any]]] = {}
+        exhausted = False
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="cleaner") as executor:
+            while True:
+                # 在途数据少于线程数时继续领取，保持线程池满载
+                while not exhausted and len(futures) < self.max_workers:
+                    leased = self._lease()
+                    if not leased:
+                        exhausted = True
+                        break
+                    self.total += len(leased)
+                    leased, copies = self._filter_duplicates(leased)
+                    
+                    # 上次运行已完成AI处理但尚未确认的结果（崩溃或入库失败），直接复用；
+                    # 先于预过滤查找，AI已给出的判定不会被重新训练后的模型剔除
+                    checkpoints = self.queue.get_checkpoints(entry['key'] for entry in leased)
+                    fresh = []
+                    for entry in leased:
+                        if entry['key'] in checkpoints:
+                            self.resumed += 1
+                            logger.info(f"使用检查点中的处理结果: {_source_url(entry['payload'])}")
+                            self._finish(entry, checkpoints[entry['key']])
+                        else:
+                            fresh.append(entry)
+                    fresh = self._prefilter(fresh)
+                    for entry in fresh:
+                        logger.info(f"正在处理来自 {entry['payload'].get('source', 'unknown')} 的数据: "
+                                    f"{_source_url(entry['payload'])}（第 {entry['attempts']} 次）")
+                    fresh = self._group_near_duplicates(fresh)
+                    self._attach_copies(copies)
+                    
+                    # X数据按token预算装箱，一组数据一次清洗调用
+                    for group in self.cleaner.plan_batches([entry['payload'] for entry in fresh]):
+                        entries = [fresh[i] for i in group]
+                        futures[executor.submit(self.cleaner.clean_batch, [entry['payload'] for entry in entries])] = entries
+                
+                if not futures:
+                    break
+                
+                done, _ = wait(list(futures), timeout=CLEANER_SAVE_INTERVAL, return_when=FIRST_COMPLETED)
+                for future in done:
+                    self._handle_completed(futures.pop(future), future)
+                self._save()
+        
+        self._save(force=True)
+        
+        # 正常情况下代表推文都已处理完成，剩余的重复条目重新排队
+        for held in self.held_duplicates.values():
+            for entry, _ in held:
+                self.queue.nack(entry['id'], "近似重复的代表推文未处理完成")
+        self.held_duplicates.clear()
+    
+    def summary(self) -> str:
+        return (f"总计 {self.total} 条, 成功处理 {self.processed} 条, 不相关 {self.rejected} 条, 失败 {self.failed} 条, "
+                f"复用检查点 {self.resumed} 条, 成功保存 {self.saved_count} 条")
+
+
+def _source_url(item: Dict[str, Any]) -> str:
+    return item.get('source_url', '') or item.get('url', '')
+
+
+def _duplicate_ref(item: Dict[str, Any], similarity: float) -> Dict[str, Any]:
+    """近似重复推文在代表文章 duplicates 字段中的引用"""
+    raw = item.get('raw') if isinstance(item.get('raw'), dict) else {}
+    name, username = raw.get('name', ''), raw.get('username', '')
+    return {
+        'source_url': _source_url(item),
+        'author': f"{name} (@{username})" if name and username else name or username,
+        'date_time': item.get('date_time', '') or raw.get('created_at', ''),
+        'similarity': round(similarity, 3),
+    }
+
+
+def _is_x(item: Dict[str, Any]) -> bool:
+    return 'x' in item.get('source', 'unknown').lower()
+
 
 def start_cleaner():
-    """开始数据清洗过程"""
+    """开始数据清洗过程
+    
+    按块把爬虫日志中的新数据转入持久化工作队列，从队列按批领取数据，清洗并入库成功后才确认删除；
+    处理异常或AI接口调用失败的数据按退避策略重新排队，多次失败后进入死信。
+    每条数据处理完立即写入检查点，中途崩溃或入库失败后重跑时不会重复调用AI接口；
+    每批数据在调用AI之前先按URL和正文哈希批量去重，已入库的数据直接确认；
+    推文再经过本地相关性预过滤，明显与AI无关的直接确认；近似重复的推文只清洗一条代表，
+    其余作为 duplicates 引用附加到代表文章。
+    AI清洗在最多 CLEANER_MAX_WORKERS 个线程中并发执行，结果完成后分批入库；
+    X数据按 X_BATCH_TOKEN_BUDGET 装箱，一次请求清洗多条推文。
+    """
     logger.info("开始数据清洗流程")
     
     try:
-        # 初始化清洗服务
-        cleaner = CleaningService()
+        queue = get_work_queue()
         
-        # 获取未处理数据（从临时文件）
-        unprocessed_data = get_unprocessed_data()
-        total = len(unprocessed_data)
-        logger.info(f"找到 {total} 条未处理数据")
+        # 升级前残留在临时文件中的数据先导入队列
+        import_legacy_temp_files()
         
-        if total == 0:
+        stats = queue.stats()
+        logger.info(f"队列状态: {stats}")
+        if stats['pending'] == 0 and not get_crawl_log().has_pending(QUEUE_CONSUMER):
             logger.info("没有需要处理的数据，清洗流程结束")
             return True
         
+        # 初始化清洗服务
+        cleaner = CleaningService()
+        
         # 创建数据存储实例 - 批量处理模式
         from src.clean.storage import DataStorage
         storage = DataStorage()
         
-        # 用于收集清洗成功的数据
-        cleaned_data_list = []
+        # 每次运行前用最新的历史判定重新训练相关性模型
+        relevance = None
+        if RELEVANCE_FILTER_ENABLED:
+            relevance = get_relevance_filter()
+            relevance.train()
         
-        # 处理每条数据
-        processed = 0
-        failed = 0
+        # 清理过期的近似重复索引记录
+        near_duplicates = None
+        if NEAR_DUP_ENABLED:
+            near_duplicates = get_near_duplicate_index()
+            near_duplicates.prune()
         
-        for item in unprocessed_data:
-            try:
-                # 提取原始数据信息
-                source = item.get('source', 'unknown')
-                source_url = item.get('source_url', '')
-                
-                # 获取原始文本，根据数据源不同，字段可能不同
-                if 'x' in source.lower():
-                    original_text = item.get('raw', {}).get('text', '') or item.get('text', '')
-                    logger.info(f"X数据结构: {item.keys()}")
-                    if 'raw' in item:
-                        logger.info(f"X raw数据结构: {item['raw'].keys() if isinstance(item['raw'], dict) else type(item['raw'])}")
-                else:  # crunchbase
-                    original_text = item.get('content', '')
-                
-                logger.info(f"正在处理来自 {source} 的数据: {source_url}")
-                
-                # 根据来源选择不同的清洗方法
-                if 'x' in source.lower():
-                    try:
-                        result = cleaner.clean_x_data(item)
-                    except Exception as e:
-                        logger.error(f"X数据处理异常: {str(e)}")
-                        logger.error(traceback.format_exc())
-                        result = None
-                elif 'crunchbase' in source.lower():
-                    try:
-                        result = cleaner.clean_crunchbase_data(item)
-                    except Exception as e:
-                        logger.error(f"Crunchbase数据处理异常: {str(e)}")
-                        logger.error(traceback.format_exc())
-                        result = None
-                else:
-                    logger.warning(f"未知的数据源: {source}，使用默认清洗方法")
-                    try:
-                        result = cleaner.clean_default_data(item)
-                    except Exception as e:
-                        logger.error(f"默认处理异常: {str(e)}")
-                        logger.error(traceback.format_exc())
-                        result = None
-                
-                # 收集处理后的数据，等待批量保存
-                if result:
-                    # 确保清洗后的数据包含源URL
-                    if 'source_url' not in result and source_url:
-                        result['source_url'] = source_url
-                    
-                    # 确保清洗后的数据包含来源
-                    if 'source' not in result:
-                        result['source'] = source
-                    
-                    # 添加到批量保存列表
-                    cleaned_data_list.append(result)
-                    processed += 1
-                    logger.info(f"成功处理数据: {source_url}")
-                else:
-                    failed += 1
-                    logger.warning(f"处理数据失败: {source_url}")
-                
-                # 防止频繁调用API
-                time.sleep(1)
-                
-            except Exception as e:
-                failed += 1
-                logger.error(f"处理数据出错: {source_url}, 错误: {str(e)}")
-                logger.error(traceback.format_exc())
-                continue
+        # 对冲请求的预算按每次运行计算
+        get_hedger().reset_budget()
         
-        # 批量保存所有处理好的数据
-        saved_count = 0
-        if cleaned_data_list:
-            logger.info(f"开始批量保存 {len(cleaned_data_list)} 条处理后的数据...")
-            saved_count = storage.save_articles(cleaned_data_list)
-            logger.info(f"批量保存完成，成功保存 {saved_count} 条数据")
+        started = time.time()
+        pipeline = CleaningPipeline(queue, cleaner, storage, relevance=relevance, near_duplicates=near_duplicates)
+        pipeline.run()
         
         # 输出处理结果
-        logger.info(f"数据清洗完成: 总计 {total} 条, 成功处理 {processed} 条, 失败 {failed} 条, 成功保存 {saved_count} 条")
-        
-        # 清空临时文件
-        if processed > 0:
-            cleared = clear_temp_files()
-            if cleared:
-                logger.info("已清空临时文件")
-            else:
-                logger.warning("清空临时文件失败")
+        logger.info(f"数据清洗完成: {pipeline.summary()}，并发数 {pipeline.max_workers}，耗时 {time.time() - started:.1f} 秒")
+        logger.info(f"清洗前去重和预过滤节省AI调用 {sum(pipeline.skipped.values())} 次: {pipeline.skipped}")
+        if relevance is not None:
+            logger.info(f"相关性预过滤: {relevance.stats()}")
+        if near_duplicates is not None:
+            logger.info(f"近似重复检测: {near_duplicates.stats()}")
+        logger.info(f"队列状态: {queue.stats()}")
+        logger.info(f"AI调用限流器: {get_rate_limiter().stats()}")
+        logger.info(f"AI响应缓存: {get_llm_cache().stats()}")
+        logger.info(f"AI接口路由: {cleaner.x_processor.client.stats()}")
+        logger.info(f"对冲请求: {get_hedger().stats()}")
+        logger.info(f"X清洗token用量: {cleaner.x_processor.token_report()}")
+        logger.info(f"流式接收: X {cleaner.x_processor.stream_stats()}，Crunchbase {cleaner.crunchbase_processor.stream_stats()}")
+        logger.info(f"AI输出解析: X {cleaner.x_processor.parse_stats()}，Crunchbase {cleaner.crunchbase_processor.parse_stats()}")
         
         return True
         
@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+AI输出JSON解析模块 - 严格解析并校验为固定字段类型的记录
+
+- loads: 先按标准JSON解析；失败时做一次修复（去掉代码块标记和前后多余文本、删除多余逗号、
+  补全被截断的字符串和括号）后再解析，仍然失败时抛出 JSONOutputError
+- validate: 按字段定义取值（支持中文别名）并转换类型，必填字段缺失或类型不符时抛出 JSONOutputError
+"""
+
+import re
+import json
+from typing import Any, Dict, List, Sequence, Tuple
+
+from src.utils.log_handler import get_logger
+
+# 创建日志记录器
+logger = get_logger("json_output")
+
+# 整个输出包在 ```json 代码块中
+CODE_FENCE_PATTERN = re.compile(r'^\s*```(?:json)?\s*(.*?)\s*(?:```\s*)?$', re.DOTALL)
+
+# 带千位分隔符的整数，例如 "1,234"
+INTEGER_PATTERN = re.compile(r'^[+-]?\d{1,3}(?:,\d{3})+$|^[+-]?\d+$')
+
+
+class JSONOutputError(ValueError):
+    """AI输出不是有效的JSON或不符合字段定义"""
+
+
+class Field:
+    """记录中的一个字段"""
+
+    __slots__ = ('name', 'type', 'aliases', 'required')
+
+    def __init__(self, name: str, type_: type = str, aliases: Sequence[str] = (), required: bool = False):
+        """初始化字段定义
+
+        Args:
+            name: 记录中的字段名
+            type_: 字段类型，str / int
+            aliases: AI输出中可能使用的其他键名，优先于name
+            required: 是否必填，必填字段为空时校验失败
+        """
+        self.name = name
+        self.type = type_
+        self.aliases = tuple(aliases)
+        self.required = required
+
+
+def _strip_fence(text: str) -> str:
+    match = CODE_FENCE_PATTERN.match(text)
+    return match.group(1) if match else text
+
+
+def _outermost(text: str) -> str:
+    """截取第一个 { 或 [ 开始的部分，去掉前面的说明文字，并按最后一个对应的右括号去掉后面的文字"""
+    starts = [i for i in (text.find('{'), text.find('[')) if i >= 0]
+    if not starts:
+        raise JSONOutputError("输出中没有JSON对象或数组")
+    start = min(starts)
+    end = text.rfind('}' if text[start] == '{' else ']')
+    # 没有右括号时按截断处理，保留到末尾
+    return text[start:end + 1] if end > start else text[start:]
+
+
+def repair(text: str) -> str:
+    """修复接近有效的JSON：删除多余逗号，补全被截断的字符串和括号"""
+    text = _outermost(_strip_fence(text))
+    out: List[str] = []
+    stack: List[str] = []
+    in_string = False
+    escaped = False
+    for char in text:
+        if in_string:
+            out.append(char)
+            if escaped:
+                escaped = False
+            elif char == '\\':
+                escaped = True
+            elif char == '"':
+                in_string = False
+            continue
+        if char == '"':
+            in_string = True
+        elif char in '{[':
+            stack.append('}' if char == '{' else ']')
+        elif char in '}]':
+            # 删除右括号前多余的逗号
+            while out and (out[-1].isspace() or out[-1] == ','):
+                out.pop()
+            if stack:
+                stack.pop()
+        out.append(char)
+
+    if in_string:
+        if escaped:
+            out.pop()
+        out.append('"')
+    repaired = ''.join(out).rstrip()
+    while repaired.endswith(','):
+        repaired = repaired[:-1].rstrip()
+    if repaired.endswith(':'):
+        repaired += ' null'
+    return repaired + ''.join(reversed(stack))
+
+
+def loads(text: str) -> Tuple[Any, bool]:
+    """解析AI输出的JSON
+
+    Args:
+        text: AI返回的文本
+
+    Returns:
+        (解析结果, 是否经过修复)
+
+    Raises:
+        JSONOutputError: 修复后仍无法解析
+    """
+    if not text or not text.strip():
+        raise JSONOutputError("输出为空")
+    try:
+        return json.loads(_strip_fence(text)), False
+    except ValueError:
+        pass
+    try:
+        # strict=False 允许字符串中出现未转义的换行等控制字符
+        return json.loads(repair(text), strict=False), True
+    except ValueError as e:
+        raise JSONOutputError(f"JSON修复后仍无法解析: {e}") from e
+
+
+def _coerce(value: Any, type_: type) -> Any:
+    """把值转换为字段类型，无法转换时抛出ValueError"""
+    if type_ is int:
+        if isinstance(value, bool):
+            raise ValueError(f"不是整数: {value!r}")
+        if isinstance(value, int):
+            return value
+        if isinstance(value, float) and value.is_integer():
+            return int(value)
+        if isinstance(value, str) and INTEGER_PATTERN.match(value.strip()):
+            return int(value.strip().replace(',', ''))
+        raise ValueError(f"不是整数: {value!r}")
+    if isinstance(value, str):
+        return value.strip()
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return str(value)
+    if isinstance(value, list) and all(isinstance(v, str) for v in value):
+        # 多个投资方等可能以数组返回
+        return '、'.join(v.strip() for v in value)
+    raise ValueError(f"不是字符串: {value!r}")
+
+
+def validate(obj: Any, fields: Sequence[Field]) -> Dict[str, Any]:
+    """按字段定义校验并转换AI输出的对象
+
+    可选字段类型不符时忽略该字段，由调用方使用默认值。
+
+    Args:
+        obj: loads 的解析结果
+        fields: 字段定义
+
+    Returns:
+        只包含已定义字段的记录，缺失的可选字段不包含在内
+
+    Raises:
+        JSONOutputError: 不是对象，或必填字段缺失、为空、类型不符
+    """
+    if not isinstance(obj, dict):
+        raise JSONOutputError(f"输出不是JSON对象: {type(obj).__name__}")
+    record = {}
+    for field in fields:
+        value = None
+        for key in field.aliases + (field.name,):
+            if obj.get(key) not in (None, ''):
+                value = obj[key]
+                break
+        if value is None:
+            if field.required:
+                raise JSONOutputError(f"缺少必填字段: {field.name}")
+            continue
+        try:
+            value = _coerce(value, field.type)
+        except ValueError as e:
+            if field.required:
+                raise JSONOutputError(f"字段 {field.name} 类型不符: {e}") from e
+            logger.debug(f"忽略类型不符的字段 {field.name}: {e}")
+            continue
+        if field.required and value == '':
+            raise JSONOutputError(f"必填字段为空: {field.name}")
+        record[field.name] = value
+    return record
@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+近似重复检测模块 - 在调用AI之前识别转发、复制粘贴的推文
+
+同一条消息常以几十条几乎相同、source_url不同的推文出现。每条推文归一化后按相邻词组成片段，
+计算 MinHash 签名，再用 LSH 分桶（NEAR_DUP_BANDS 个带）查找候选，签名估算的相似度
+达到 NEAR_DUP_THRESHOLD 的视为近似重复。签名和分桶保存在 src/data/near_duplicates.db，
+跨运行有效，超过 NEAR_DUP_TTL_DAYS 天的记录在每次运行前清理。
+
+每组近似重复只清洗第一条（代表），代表的处理结果记录为：
+- pending: 尚未处理完成（在途或等待重试）
+- stored: 已清洗入库，之后的重复推文作为 duplicates 引用附加到该文章
+- rejected: AI判定不相关，之后的重复推文直接跳过
+"""
+
+import os
+import re
+import time
+import random
+import sqlite3
+import hashlib
+import threading
+from array import array
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.utils.log_handler import get_logger
+from src.utils.paths import NEAR_DUP_DB_PATH
+
+# 创建日志记录器
+logger = get_logger("near_duplicates")
+
+# 近似重复检测配置，可通过环境变量调整
+NEAR_DUP_ENABLED = os.getenv('NEAR_DUP', '1').lower() not in ('0', 'false', 'no')
+NEAR_DUP_THRESHOLD = float(os.getenv('NEAR_DUP_THRESHOLD', '0.8'))
+NEAR_DUP_PERMUTATIONS = int(os.getenv('NEAR_DUP_PERMUTATIONS', '64'))
+NEAR_DUP_BANDS = int(os.getenv('NEAR_DUP_BANDS', '16'))
+NEAR_DUP_MIN_SHINGLES = int(os.getenv('NEAR_DUP_MIN_SHINGLES', '5'))
+NEAR_DUP_TTL_DAYS = float(os.getenv('NEAR_DUP_TTL_DAYS', '7'))
+
+# 代表推文的处理结果
+STATUS_PENDING = 'pending'
+STATUS_STORED = 'stored'
+STATUS_REJECTED = 'rejected'
+
+# 转发前缀、链接和@用户名不参与比较
+STRIP_PATTERN = re.compile(r'^\s*rt\s+@\w+:?|https?://\S+|@\w+')
+TOKEN_PATTERN = re.compile(r'[a-z0-9][a-z0-9\-]*|[一-鿿]+')
+
+# MinHash 使用的梅森素数和固定种子，签名跨运行可比较
+MERSENNE_PRIME = (1 << 61) - 1
+PERMUTATION_SEED = 20240501
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS signatures (
+    url TEXT PRIMARY KEY,
+    signature BLOB NOT NULL,
+    status TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_signatures_created_at ON signatures (created_at);
+CREATE TABLE IF NOT EXISTS buckets (
+    band INTEGER NOT NULL,
+    bucket BLOB NOT NULL,
+    url TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_buckets_band ON buckets (band, bucket);
+CREATE INDEX IF NOT EXISTS idx_buckets_url ON buckets (url);
+"""
+
+
+def shingles(text: str) -> set:
+    """归一化后的片段集合：英文按单词、中文按相邻两字切分，再取相邻两个词"""
+    text = STRIP_PATTERN.sub(' ', (text or '').lower())
+    tokens: List[str] = []
+    for word in TOKEN_PATTERN.findall(text):
+        if word[0] < '一' or len(word) == 1:
+            tokens.append(word)
+        else:
+            tokens.extend(word[i:i + 2] for i in range(len(word) - 1))
+    if len(tokens) < 2:
+        return set(tokens)
+    return {f"{tokens[i]} {tokens[i + 1]}" for i in range(len(tokens) - 1)}
+
+
+class NearDuplicateIndex:
+    """持久化的 MinHash LSH 索引"""
+
+    def __init__(self, path: str = NEAR_DUP_DB_PATH, threshold: float = NEAR_DUP_THRESHOLD,
+                 permutations: int = NEAR_DUP_PERMUTATIONS, bands: int = NEAR_DUP_BANDS,
+                 min_shingles: int = NEAR_DUP_MIN_SHINGLES, ttl_days: float = NEAR_DUP_TTL_DAYS):
+        """初始化索引
+
+        Args:
+            path: 索引数据库文件
+            threshold: 估算相似度（Jaccard）达到该值视为近似重复
+            permutations: MinHash 签名长度
+            bands: LSH 带数，签名长度必须能被带数整除；带数越多召回越高、候选越多
+            min_shingles: 片段少于该数量的短文本不参与检测，避免短句误判
+            ttl_days: 索引记录的保留天数
+        """
+        if permutations % bands:
+            raise ValueError(f"签名长度 {permutations} 不能被带数 {bands} 整除")
+        self.path = path
+        self.threshold = threshold
+        self.permutations = permutations
+        self.bands = bands
+        self.rows = permutations // bands
+        self.min_shingles = min_shingles
+        self.ttl_days = ttl_days
+        rng = random.Random(PERMUTATION_SEED)
+        self._params = [(rng.randrange(1, MERSENNE_PRIME), rng.randrange(0, MERSENNE_PRIME)) for _ in range(permutations)]
+        self._lock = threading.Lock()
+        self._metrics = {'checked': 0, 'too_short': 0, 'candidates': 0, 'matched': 0, 'added': 0, 'pruned': 0}
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+
+    def signature(self, text: str) -> Optional[List[int]]:
+        """计算文本的 MinHash 签名，文本过短时返回None"""
+        self._count('checked')
+        pieces = shingles(text)
+        if len(pieces) < self.min_shingles:
+            self._count('too_short')
+            return None
+        hashes = [int.from_bytes(hashlib.blake2b(piece.encode('utf-8'), digest_size=8).digest(), 'big')
+                  for piece in pieces]
+        return [min((a * h + b) % MERSENNE_PRIME for h in hashes) for a, b in self._params]
+
+    def _bands(self, signature: List[int]) -> List[Tuple[int, bytes]]:
+        return [
+            (band, hashlib.blake2b(array('Q', signature[band * self.rows:(band + 1) * self.rows]).tobytes(), digest_size=8).digest())
+            for band in range(self.bands)
+        ]
+
+    def similarity(self, a: List[int], b: List[int]) -> float:
+        """两个签名估算的 Jaccard 相似度"""
+        return sum(1 for x, y in zip(a, b) if x == y) / len(a)
+
+    def query(self, signature: List[int]) -> Optional[Tuple[str, float, str]]:
+        """查找最相似的已索引推文
+
+        Returns:
+            (URL, 估算相似度, 处理结果)，没有达到阈值的推文时返回None
+        """
+        bands = self._bands(signature)
+        try:
+            with self._lock:
+                condition = " OR ".join(["(band = ? AND bucket = ?)"] * len(bands))
+                params = [value for pair in bands for value in pair]
+                rows = self._conn.execute(
+                    f"SELECT s.url, s.signature, s.status FROM signatures s WHERE s.url IN "
+                    f"(SELECT DISTINCT url FROM buckets WHERE {condition})", params
+                ).fetchall()
+        except Exception as e:
+            logger.error(f"查询近似重复索引失败: {e}")
+            return None
+        self._count('candidates', len(rows))
+        best = None
+        for url, blob, status in rows:
+            score = self.similarity(signature, array('Q', blob).tolist())
+            if score >= self.threshold and (best is None or score > best[1]):
+                best = (url, score, status)
+        if best is not None:
+            self._count('matched')
+        return best
+
+    def add(self, url: str, signature: List[int], status: str = STATUS_PENDING):
+        """把一条推文加入索引，作为之后近似重复的代表"""
+        try:
+            with self._lock, self._conn:
+                self._conn.execute("DELETE FROM buckets WHERE url = ?", (url,))
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO signatures (url, signature, status, created_at) VALUES (?, ?, ?, ?)",
+                    (url, array('Q', signature).tobytes(), status, time.time())
+                )
+                self._conn.executemany(
+                    "INSERT INTO buckets (band, bucket, url) VALUES (?, ?, ?)",
+                    [(band, bucket, url) for band, bucket in self._bands(signature)]
+                )
+                self._metrics['added'] += 1
+        except Exception as e:
+            logger.error(f"写入近似重复索引失败: {url}, 错误: {e}")
+
+    def mark(self, url: str, status: str):
+        """记录代表推文的处理结果，URL不在索引中时不做任何操作"""
+        try:
+            with self._lock:
+                self._conn.execute("UPDATE signatures SET status = ? WHERE url = ?", (status, url))
+        except Exception as e:
+            logger.error(f"更新近似重复索引失败: {url}, 错误: {e}")
+
+    def prune(self) -> int:
+        """删除超过保留天数的记录
+
+        Returns:
+            删除的记录数
+        """
+        if self.ttl_days <= 0:
+            return 0
+        cutoff = time.time() - self.ttl_days * 86400
+        try:
+            with self._lock, self._conn:
+                self._conn.execute(
+                    "DELETE FROM buckets WHERE url IN (SELECT url FROM signatures WHERE created_at < ?)", (cutoff,)
+                )
+                deleted = self._conn.execute("DELETE FROM signatures WHERE created_at < ?", (cutoff,)).rowcount
+                self._metrics['pruned'] += deleted
+            if deleted:
+                logger.info(f"清理 {deleted} 条过期的近似重复索引记录")
+            return deleted
+        except Exception as e:
+            logger.error(f"清理近似重复索引失败: {e}")
+            return 0
+
+    def _count(self, field: str, amount: int = 1):
+        with self._lock:
+            self._metrics[field] += amount
+
+    def stats(self) -> Dict[str, Any]:
+        """索引指标快照"""
+        with self._lock:
+            metrics = dict(self._metrics)
+            try:
+                metrics['entries'] = self._conn.execute("SELECT COUNT(*) FROM signatures").fetchone()[0]
+            except Exception as e:
+                logger.error(f"统计近似重复索引失败: {e}")
+        metrics['threshold'] = self.threshold
+        return metrics
+
+
+# 进程内共享实例
+_index: Optional[NearDuplicateIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_near_duplicate_index() -> NearDuplicateIndex:
+    """获取进程内共享的近似重复索引"""
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = NearDuplicateIndex()
+        return _index
+
+
+if __name__ == "__main__":
+    print(get_near_duplicate_index().stats())
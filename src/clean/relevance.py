@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+相关性预过滤模块 - 在调用AI之前本地剔除与AI无关的推文
+
+X爬虫按 q=AI 搜索，结果中有大量噪声。过滤分两层：
+1. 关键词规则：命中明确的AI术语直接保留，命中刷量/加密货币等垃圾模式直接剔除
+2. 朴素贝叶斯：用清洗器记录的历史判定（AI清洗后入库=相关，AI返回空=不相关）训练，
+   相关概率低于 RELEVANCE_THRESHOLD 的推文不再调用AI
+
+样本不足 RELEVANCE_MIN_SAMPLES 时只使用关键词规则。被模型剔除的推文按 RELEVANCE_AUDIT_RATE
+抽样仍交给AI判断，用于统计误剔除率。
+"""
+
+import os
+import re
+import math
+import time
+import random
+import sqlite3
+import hashlib
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.utils.log_handler import get_logger
+from src.utils.paths import RELEVANCE_DB_PATH
+
+# 创建日志记录器
+logger = get_logger("relevance")
+
+# 预过滤配置，可通过环境变量调整
+RELEVANCE_FILTER_ENABLED = os.getenv('RELEVANCE_FILTER', '1').lower() not in ('0', 'false', 'no')
+RELEVANCE_THRESHOLD = float(os.getenv('RELEVANCE_THRESHOLD', '0.15'))
+RELEVANCE_MIN_SAMPLES = int(os.getenv('RELEVANCE_MIN_SAMPLES', '200'))
+RELEVANCE_MAX_SAMPLES = int(os.getenv('RELEVANCE_MAX_SAMPLES', '20000'))
+RELEVANCE_AUDIT_RATE = float(os.getenv('RELEVANCE_AUDIT_RATE', '0.05'))
+
+# 每个类别至少需要的样本数，避免只有一类样本时模型失真
+MIN_SAMPLES_PER_CLASS = 20
+
+# 明确与AI相关的术语，命中即保留
+POSITIVE_PATTERN = re.compile(
+    r'\b(?:gpt-?\d*|chatgpt|llms?|openai|anthropic|claude|gemini|deepseek|mistral|llama|qwen|'
+    r'machine learning|deep learning|neural net(?:work)?s?|transformers?|diffusion|fine-?tun\w*|'
+    r'inference|embeddings?|agi|rlhf|multimodal|reasoning model|ai agents?|copilot|hugging ?face|nvidia)\b'
+    r'|人工智能|大模型|大语言模型|机器学习|深度学习|神经网络|智能体|多模态',
+    re.IGNORECASE
+)
+
+# 刷量、抽奖、加密货币推广等垃圾模式，命中且没有明确AI术语时剔除
+NEGATIVE_PATTERN = re.compile(
+    r'\b(?:airdrop|giveaway|presale|memecoin|follow (?:and|&) (?:rt|retweet)|dm me|onlyfans|'
+    r'whitelist|nft drop|100x)\b',
+    re.IGNORECASE
+)
+
+URL_PATTERN = re.compile(r'https?://\S+|@\w+')
+WORD_PATTERN = re.compile(r'[a-z][a-z0-9\-]+|[一-鿿]+')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS samples (
+    text_hash TEXT PRIMARY KEY,
+    text TEXT NOT NULL,
+    label INTEGER NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_samples_created_at ON samples (created_at);
+"""
+
+
+def tokenize(text: str) -> List[str]:
+    """分词：英文按单词，中文按相邻两字，去掉链接和@用户名，同一词只计一次"""
+    text = URL_PATTERN.sub(' ', (text or '').lower())
+    tokens = set()
+    for word in WORD_PATTERN.findall(text):
+        if word[0] < '一':
+            if len(word) > 1:
+                tokens.add(word)
+        elif len(word) == 1:
+            tokens.add(word)
+        else:
+            tokens.update(word[i:i + 2] for i in range(len(word) - 1))
+    return list(tokens)
+
+
+class NaiveBayes:
+    """二分类朴素贝叶斯，特征为词是否出现，拉普拉斯平滑"""
+
+    def __init__(self):
+        self.class_counts = [0, 0]
+        self.token_counts: List[Dict[str, int]] = [{}, {}]
+        self.totals = [0, 0]
+        self.vocabulary = 0
+
+    def fit(self, samples: List[Tuple[str, int]]):
+        """用 (文本, 标签) 训练，标签1为相关"""
+        self.__init__()
+        for text, label in samples:
+            self.class_counts[label] += 1
+            counts = self.token_counts[label]
+            for token in tokenize(text):
+                counts[token] = counts.get(token, 0) + 1
+                self.totals[label] += 1
+        self.vocabulary = len(set(self.token_counts[0]) | set(self.token_counts[1])) or 1
+        return self
+
+    def predict_proba(self, texts: List[str]) -> List[float]:
+        """每条文本属于相关类的概率"""
+        total = sum(self.class_counts)
+        priors = [math.log((count + 1) / (total + 2)) for count in self.class_counts]
+        denominators = [math.log(self.totals[label] + self.vocabulary) for label in (0, 1)]
+        probabilities = []
+        for text in texts:
+            scores = list(priors)
+            for token in tokenize(text):
+                for label in (0, 1):
+                    scores[label] += math.log(self.token_counts[label].get(token, 0) + 1) - denominators[label]
+            # 两类对数得分之差换算为概率，避免直接取指数溢出
+            diff = max(-50.0, min(50.0, scores[0] - scores[1]))
+            probabilities.append(1 / (1 + math.exp(diff)))
+        return probabilities
+
+
+class RelevanceFilter:
+    """关键词规则 + 朴素贝叶斯的相关性预过滤"""
+
+    def __init__(self, path: str = RELEVANCE_DB_PATH, threshold: float = RELEVANCE_THRESHOLD,
+                 min_samples: int = RELEVANCE_MIN_SAMPLES, audit_rate: float = RELEVANCE_AUDIT_RATE):
+        """初始化过滤器
+
+        Args:
+            path: 历史判定样本的数据库文件
+            threshold: 相关概率低于该值的推文被剔除
+            min_samples: 启用模型所需的最少样本数
+            audit_rate: 被模型剔除的推文中仍交给AI判断的比例
+        """
+        self.path = path
+        self.threshold = threshold
+        self.min_samples = min_samples
+        self.audit_rate = audit_rate
+        self.model: Optional[NaiveBayes] = None
+        self._lock = threading.Lock()
+        self._metrics = {
+            'checked': 0,
+            'kept_keyword': 0,
+            'dropped_keyword': 0,
+            'kept_model': 0,
+            'dropped_model': 0,
+            'kept_untrained': 0,
+            'audited': 0,
+            'audit_false_drops': 0,
+            'recorded': 0,
+        }
+        # 抽样复核中的推文 {正文哈希: 相关概率}，AI判定结果记录时统计误剔除
+        self._audits: Dict[str, float] = {}
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+
+    def train(self) -> bool:
+        """用最近的 RELEVANCE_MAX_SAMPLES 条历史判定训练模型
+
+        Returns:
+            样本是否足够、模型是否启用
+        """
+        try:
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT text, label FROM samples ORDER BY created_at DESC LIMIT ?", (RELEVANCE_MAX_SAMPLES,)
+                ).fetchall()
+            positives = sum(1 for _, label in rows if label)
+            if len(rows) < self.min_samples or min(positives, len(rows) - positives) < MIN_SAMPLES_PER_CLASS:
+                self.model = None
+                logger.info(f"相关性样本不足（共 {len(rows)} 条，相关 {positives} 条），只使用关键词规则")
+                return False
+            started = time.time()
+            self.model = NaiveBayes().fit(rows)
+            logger.info(f"相关性模型训练完成: {len(rows)} 条样本（相关 {positives} 条），"
+                        f"词表 {self.model.vocabulary}，耗时 {time.time() - started:.2f} 秒")
+            return True
+        except Exception as e:
+            logger.error(f"训练相关性模型失败: {e}")
+            self.model = None
+            return False
+
+    def filter(self, texts: List[str]) -> List[bool]:
+        """对一批推文正文判断是否需要交给AI
+
+        Args:
+            texts: 推文正文列表
+
+        Returns:
+            与texts一一对应，True表示保留
+        """
+        keep: List[Optional[bool]] = []
+        for text in texts:
+            if POSITIVE_PATTERN.search(text or ''):
+                keep.append(True)
+                self._count('kept_keyword')
+            elif not (text or '').strip() or NEGATIVE_PATTERN.search(text):
+                keep.append(False)
+                self._count('dropped_keyword')
+            else:
+                keep.append(None)
+
+        undecided = [i for i, decision in enumerate(keep) if decision is None]
+        model = self.model
+        if undecided and model is None:
+            for i in undecided:
+                keep[i] = True
+            self._count('kept_untrained', len(undecided))
+        elif undecided:
+            # 规则无法判断的推文整批交给模型打分
+            for i, probability in zip(undecided, model.predict_proba([texts[i] for i in undecided])):
+                if probability >= self.threshold:
+                    keep[i] = True
+                    self._count('kept_model')
+                elif random.random() < self.audit_rate:
+                    keep[i] = True
+                    self._count('audited')
+                    with self._lock:
+                        self._audits[_hash(texts[i])] = probability
+                else:
+                    keep[i] = False
+                    self._count('dropped_model')
+        self._count('checked', len(texts))
+        return keep
+
+    def record(self, text: str, relevant: bool):
+        """记录AI对一条推文的判定，作为之后训练的样本"""
+        if not text or not text.strip():
+            return
+        digest = _hash(text)
+        try:
+            with self._lock:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO samples (text_hash, text, label, created_at) VALUES (?, ?, ?, ?)",
+                    (digest, text, 1 if relevant else 0, time.time())
+                )
+                self._metrics['recorded'] += 1
+                if self._audits.pop(digest, None) is not None and relevant:
+                    self._metrics['audit_false_drops'] += 1
+        except Exception as e:
+            logger.error(f"记录相关性样本失败: {e}")
+
+    def _count(self, field: str, amount: int = 1):
+        with self._lock:
+            self._metrics[field] += amount
+
+    def stats(self) -> Dict[str, Any]:
+        """过滤指标快照：calls_avoided 为本地剔除、节省的AI调用次数"""
+        with self._lock:
+            metrics = dict(self._metrics)
+        metrics['calls_avoided'] = metrics['dropped_keyword'] + metrics['dropped_model']
+        metrics['model_enabled'] = self.model is not None
+        metrics['threshold'] = self.threshold
+        if metrics['audited']:
+            metrics['audit_false_drop_rate'] = round(metrics['audit_false_drops'] / metrics['audited'], 4)
+        return metrics
+
+
+def _hash(text: str) -> str:
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+
+# 进程内共享实例
+_filter: Optional[RelevanceFilter] = None
+_filter_lock = threading.Lock()
+
+
+def get_relevance_filter() -> RelevanceFilter:
+    """获取进程内共享的相关性过滤器，使用前需调用 train()"""
+    global _filter
+    with _filter_lock:
+        if _filter is None:
+            _filter = RelevanceFilter()
+        return _filter
+
+
+if __name__ == "__main__":
+    relevance_filter = get_relevance_filter()
+    relevance_filter.train()
+    print(relevance_filter.stats())
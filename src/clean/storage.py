@@ -3,57 +3,178 @@
 """
 
 import os
+import re
 import json
+import hashlib
 import logging
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Set, Tuple, Iterable, Iterator
 import sys
 
-from src.db.mongodb import MongoDB
+from src.db.backend import get_database, WRITE_INSERTED, WRITE_MATCHED, WRITE_FAILED
+from src.db.url_filter import get_url_filter
+from src.db.write_buffer import get_write_buffer
 from src.utils.log_handler import get_logger
 
 # 创建日志记录器
 logger = get_logger("storage")
 
+# 正文哈希：去掉链接、标点和大小写差异后取sha1，过短的文本不参与去重
+MIN_HASH_TEXT_LENGTH = int(os.getenv('MIN_HASH_TEXT_LENGTH', '20'))
+_HASH_URL_PATTERN = re.compile(r'https?://\S+')
+_HASH_NON_WORD_PATTERN = re.compile(r'[\W_]+')
+
+# 流式读取时每次从文件读取的字符数和默认分块大小
+READ_BUFFER_SIZE = 64 * 1024
+UNPROCESSED_CHUNK_SIZE = int(os.getenv('UNPROCESSED_CHUNK_SIZE', '100'))
+
+
+def iter_json_items(file_path: str, read_size: int = READ_BUFFER_SIZE) -> Iterator[Dict[str, Any]]:
+    """逐条读取JSON数组文件或JSONL文件，内存占用只与单条数据大小有关
+    
+    文件以 "[" 开头时按JSON数组增量解析（JSONDecoder.raw_decode），否则按每行一条JSON解析。
+    
+    Args:
+        file_path: 文件路径
+        read_size: 每次从文件读取的字符数
+        
+    Yields:
+        数据条目
+    """
+    if not os.path.exists(file_path) or os.path.getsize(file_path) == 0:
+        return
+    
+    with open(file_path, 'r', encoding='utf-8') as f:
+        buffer = f.read(read_size)
+        stripped = buffer.lstrip()
+        while not stripped and buffer:
+            buffer = f.read(read_size)
+            stripped = buffer.lstrip()
+        if not stripped:
+            return
+        
+        if not stripped.startswith('['):
+            # JSONL：逐行解析
+            f.seek(0)
+            for line_no, line in enumerate(f, 1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except ValueError as e:
+                    logger.error(f"{file_path} 第 {line_no} 行数据损坏，已跳过: {e}")
+            return
+        
+        decoder = json.JSONDecoder()
+        buffer = stripped[1:]
+        eof = False
+        while True:
+            # 跳过空白和分隔符
+            pos = 0
+            while pos < len(buffer) and buffer[pos] in ' \t\r\n,':
+                pos += 1
+            buffer = buffer[pos:]
+            if not buffer:
+                if eof:
+                    logger.warning(f"{file_path} 的JSON数组缺少结束符")
+                    return
+                chunk = f.read(read_size)
+                eof = not chunk
+                buffer += chunk
+                continue
+            if buffer[0] == ']':
+                return
+            try:
+                item, end = decoder.raw_decode(buffer)
+            except ValueError:
+                if eof:
+                    logger.error(f"{file_path} 末尾的JSON数据不完整，已停止读取")
+                    return
+                # 当前条目还没读完整，继续读取
+                chunk = f.read(read_size)
+                eof = not chunk
+                buffer += chunk
+                continue
+            buffer = buffer[end:]
+            yield item
+
+
+def iter_chunks(items: Iterable[Dict[str, Any]], chunk_size: int) -> Iterator[List[Dict[str, Any]]]:
+    """把条目流按固定大小分块"""
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def iter_unprocessed_data(chunk_size: int = UNPROCESSED_CHUNK_SIZE) -> Iterator[List[Dict[str, Any]]]:
+    """按块流式读取临时文件中的未处理数据
+    
+    Args:
+        chunk_size: 每块的条目数
+        
+    Yields:
+        未处理数据块
+    """
+    from src.utils.paths import X_TEMP_DATA_PATH, CRU_TEMP_DATA_PATH
+    
+    for path, source, label in ((X_TEMP_DATA_PATH, 'x', 'X'), (CRU_TEMP_DATA_PATH, 'crunchbase', 'Crunchbase')):
+        count = 0
+        try:
+            for chunk in iter_chunks(iter_json_items(path), max(1, chunk_size)):
+                for item in chunk:
+                    # 确保有source字段，方便后续清洗流程分类处理
+                    if 'source' not in item:
+                        item['source'] = source
+                count += len(chunk)
+                yield chunk
+        except Exception as e:
+            logger.error(f"读取{label}临时文件失败: {e}")
+        if count:
+            logger.info(f"从{label}临时文件中读取了 {count} 条数据")
+
+
+def raw_text(item: Dict[str, Any]) -> str:
+    """原始数据中的正文：X为推文文本，Crunchbase为文章内容"""
+    raw = item.get('raw') if isinstance(item.get('raw'), dict) else {}
+    return item.get('text') or raw.get('text') or item.get('content') or raw.get('content') or ''
+
+
+def text_hash(text: str) -> Optional[str]:
+    """归一化正文的哈希，同一内容换了链接或标点也能识别
+    
+    Args:
+        text: 正文
+        
+    Returns:
+        sha1十六进制字符串，文本过短时返回None
+    """
+    if not text:
+        return None
+    normalized = _HASH_NON_WORD_PATTERN.sub(' ', _HASH_URL_PATTERN.sub(' ', text.lower())).strip()
+    if len(normalized) < MIN_HASH_TEXT_LENGTH:
+        return None
+    return hashlib.sha1(normalized.encode('utf-8')).hexdigest()
+
+
 # 直接使用的辅助函数
 def get_unprocessed_data():
     """获取未处理的数据，仅从临时文件中读取
     
+    数据量较大时请使用 iter_unprocessed_data 按块读取。
+    
     Returns:
         未处理的数据列表
     """
     all_unprocessed = []
     
     try:
-        # 从临时文件中读取数据
-        from src.utils.paths import X_TEMP_DATA_PATH, CRU_TEMP_DATA_PATH
-        
-        # 读取X数据
-        try:
-            if os.path.exists(X_TEMP_DATA_PATH) and os.path.getsize(X_TEMP_DATA_PATH) > 0:
-                with open(X_TEMP_DATA_PATH, 'r', encoding='utf-8') as f:
-                    x_data = json.load(f)
-                    for item in x_data:
-                        # 确保有source字段，方便后续清洗流程分类处理
-                        if 'source' not in item:
-                            item['source'] = 'x'
-                        all_unprocessed.append(item)
-                    logger.info(f"从X临时文件中读取了 {len(x_data)} 条数据")
-        except Exception as e:
-            logger.error(f"读取X临时文件失败: {e}")
-        
-        # 读取Crunchbase数据
-        try:
-            if os.path.exists(CRU_TEMP_DATA_PATH) and os.path.getsize(CRU_TEMP_DATA_PATH) > 0:
-                with open(CRU_TEMP_DATA_PATH, 'r', encoding='utf-8') as f:
-                    cru_data = json.load(f)
-                    for item in cru_data:
-                        # 确保有source字段，方便后续清洗流程分类处理
-                        if 'source' not in item:
-                            item['source'] = 'crunchbase'
-                        all_unprocessed.append(item)
-                    logger.info(f"从Crunchbase临时文件中读取了 {len(cru_data)} 条数据")
-        except Exception as e:
-            logger.error(f"读取Crunchbase临时文件失败: {e}")
+        for chunk in iter_unprocessed_data():
+            all_unprocessed.extend(chunk)
         
         logger.info(f"总共获取了 {len(all_unprocessed)} 条未处理数据")
         return all_unprocessed
@@ -120,20 +241,12 @@ class DataStorage:
     
     def __init__(self):
         """初始化数据存储管理器"""
-        self.mongodb = MongoDB()
-        self._existing_urls = set()
-        self._load_existing_urls()
-    
-    def _load_existing_urls(self):
-        """加载已存在的URL集合，用于去重"""
-        try:
-            # 从MongoDB加载已存在的URL
-            existing_urls = self.mongodb.get_existing_urls()
-            self._existing_urls = set(existing_urls)
-            logger.info(f"已加载 {len(self._existing_urls)} 个现有URL")
-        except Exception as e:
-            logger.error(f"加载现有URL失败: {e}")
-            self._existing_urls = set()
+        # 存储后端由 STORAGE_BACKEND 环境变量决定（mongodb / sqlite）
+        self.mongodb = get_database()
+        # 共享的URL去重服务，替代每次全量加载已有URL
+        self.url_filter = get_url_filter(self.mongodb)
+        # 共享的后台写入缓冲区，逐条保存会被合并为批量写入
+        self.write_buffer = get_write_buffer(self.mongodb)
     
     def url_exists(self, url: str) -> bool:
         """检查URL是否已存在
@@ -144,16 +257,67 @@ class DataStorage:
         Returns:
             True如果URL已存在，否则False
         """
-        return url in self._existing_urls
+        return self.url_filter.contains(url)
+    
+    def find_stored_duplicates(self, items: List[Dict[str, Any]]) -> List[Optional[str]]:
+        """在调用AI清洗之前批量找出已入库的原始数据
+        
+        URL经布隆过滤器后只对可能存在的URL做一次$in查询，正文哈希做一次$in查询；
+        同一批次内正文相同的数据只保留第一条。
+        
+        Args:
+            items: 原始数据列表
+            
+        Returns:
+            与输入顺序一致的列表，重复时为原因 url / text / batch，否则为None
+        """
+        urls = [item.get('source_url') or item.get('url') or '' for item in items]
+        hashes = [text_hash(raw_text(item)) for item in items]
+        
+        existing_urls = self.url_filter.find_existing(url for url in urls if url)
+        existing_hashes = set()
+        try:
+            existing_hashes = self.mongodb.find_existing_text_hashes(sorted({h for h in hashes if h}))
+        except Exception as e:
+            logger.error(f"正文哈希去重失败，跳过: {e}")
+        
+        reasons = []
+        seen_hashes = set()
+        for url, digest in zip(urls, hashes):
+            if url and url in existing_urls:
+                reasons.append('url')
+            elif digest and digest in existing_hashes:
+                reasons.append('text')
+            elif digest and digest in seen_hashes:
+                reasons.append('batch')
+            else:
+                reasons.append(None)
+            if digest:
+                seen_hashes.add(digest)
+        return reasons
+    
+    def add_duplicate_refs(self, source_url: str, refs: List[Dict[str, Any]]) -> bool:
+        """把近似重复数据的引用附加到已入库的代表文章
+        
+        Returns:
+            代表文章是否存在并已更新
+        """
+        try:
+            return self.mongodb.add_duplicate_refs(source_url, refs)
+        except Exception as e:
+            logger.error(f"附加近似重复引用失败: {e}")
+            return False
     
     def store(self, article: Dict[str, Any]) -> bool:
         """保存单篇文章到数据库
         
+        文章提交到后台写入缓冲区，由缓冲区按数量或时间合并为批量写入。
+        
         Args:
             article: 要保存的文章
             
         Returns:
-            是否成功保存
+            是否成功提交保存
         """
         if not article:
             logger.warning("尝试保存空文章")
@@ -169,17 +333,30 @@ class DataStorage:
             logger.info(f"跳过已存在的URL: {url}")
             return False
             
-        # 保存到MongoDB
+        # 提交到写入缓冲区
         try:
-            self.mongodb.insert_articles([article])
-            # 添加到已存在URL集合中
-            self._existing_urls.add(url)
-            logger.info(f"成功保存文章: {article.get('title', '无标题')} - {url}")
+            self.write_buffer.submit(article)
+            # 记录到URL去重服务，避免同一URL重复提交
+            self.url_filter.add([url])
+            logger.info(f"已提交保存文章: {article.get('title', '无标题')} - {url}")
             return True
         except Exception as e:
             logger.error(f"保存文章失败: {e}")
             return False
     
+    def flush(self, timeout: float = None) -> bool:
+        """等待写入缓冲区中已提交的文章全部写入
+        
+        Args:
+            timeout: 最长等待时间（秒）
+            
+        Returns:
+            是否在超时前完成
+        """
+        flushed = self.write_buffer.flush(timeout)
+        logger.info(f"写入缓冲区指标: {self.write_buffer.metrics()}")
+        return flushed
+    
     def save_articles(self, articles: List[Dict[str, Any]]) -> int:
         """保存文章数据到MongoDB
         
@@ -189,26 +366,47 @@ class DataStorage:
         Returns:
             成功保存的文章数量
         """
-        # 过滤掉已存在的URL
+        inserted, _ = self.save_articles_with_failures(articles)
+        return inserted
+    
+    def save_articles_with_failures(self, articles: List[Dict[str, Any]]) -> Tuple[int, Set[str]]:
+        """保存文章数据，并返回写入失败的URL，供调用方决定哪些数据需要重试
+        
+        Args:
+            articles: 要保存的文章列表
+            
+        Returns:
+            (新保存的文章数量, 写入失败的source_url集合)
+        """
+        # 过滤掉已存在的URL（批量确认）以及本批次内重复的URL
+        existing_urls = self.url_filter.find_existing(article.get('source_url', '') for article in articles)
         new_articles = []
+        seen_urls = set()
         for article in articles:
             url = article.get('source_url', '')
-            if url and not self.url_exists(url):
+            if url and url not in existing_urls and url not in seen_urls:
                 new_articles.append(article)
-                self._existing_urls.add(url)
+                seen_urls.add(url)
         
-        # 保存新文章
+        # 保存新文章，按source_url无序upsert，单条重复不会影响其他文章
         if new_articles:
             try:
-                self.mongodb.insert_articles(new_articles)
-                logger.info(f"成功保存 {len(new_articles)} 篇新文章")
-                return len(new_articles)
+                statuses = self.mongodb.bulk_upsert_articles(new_articles)
+                stored_urls = [article['source_url'] for article, status in zip(new_articles, statuses) if status != WRITE_FAILED]
+                self.url_filter.add(stored_urls)
+                self.url_filter.save()
+                
+                inserted = statuses.count(WRITE_INSERTED)
+                matched = statuses.count(WRITE_MATCHED)
+                failed = statuses.count(WRITE_FAILED)
+                logger.info(f"成功保存 {inserted} 篇新文章，已存在 {matched} 篇，失败 {failed} 篇")
+                return inserted, {article['source_url'] for article, status in zip(new_articles, statuses) if status == WRITE_FAILED}
             except Exception as e:
                 logger.error(f"保存文章失败: {e}")
-                return 0
+                return 0, seen_urls
         else:
             logger.info("没有新文章需要保存")
-            return 0
+            return 0, set()
     
     def save_temp_data(self, data: List[Dict[str, Any]], temp_file: str):
         """保存临时数据到文件
@@ -270,4 +468,4 @@ class DataStorage:
         try:
             self.mongodb.close()
         except Exception as e:
-            logger.error(f"关闭MongoDB连接失败: {e}") 
\ No newline at end of file
+            logger.error(f"关闭数据库连接失败: {e}") 
\ No newline at end of file
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+流式响应解析模块 - 边接收AI输出边解析，尽早终止无用的生成
+
+- 输出以空对象 "{}"（内容不相关的约定返回值）开头时立即停止接收
+- 输出超过长度上限时停止接收，按格式错误处理
+- 已经完整接收的 "字段": 值 会立即通过回调提供给调用方
+"""
+
+import re
+import json
+from typing import Any, Callable, Dict, Optional
+
+from src.utils.log_handler import get_logger
+
+# 创建日志记录器
+logger = get_logger("stream_parser")
+
+# 停止原因
+STOP_IRRELEVANT = 'irrelevant'
+STOP_LENGTH = 'length'
+
+# 开头是空对象（允许包在 ```json 代码块中）
+SENTINEL_PATTERN = re.compile(r'^\s*(?:```(?:json)?\s*)?\{\s*\}')
+
+# 判断开头前至少需要的非空白字符数，避免代码块标记只收到一半就下结论
+HEAD_CHECK_CHARS = 10
+
+# 已完整接收的字符串或数值字段，值后面必须跟着分隔符才算完整
+FIELD_PATTERN = re.compile(r'"([^"\\\n]{1,40})"\s*:\s*("(?:[^"\\]|\\.)*"|-?\d+(?:\.\d+)?)\s*[,}\n]')
+
+
+class StreamParser:
+    """增量解析流式输出"""
+
+    def __init__(self, max_chars: int, on_field: Optional[Callable[[str, Any], None]] = None):
+        """初始化解析器
+
+        Args:
+            max_chars: 输出长度上限（字符数）
+            on_field: 字段完整接收时的回调 on_field(字段名, 值)
+        """
+        self.max_chars = max_chars
+        self.on_field = on_field
+        self.text = ''
+        self.fields: Dict[str, Any] = {}
+        self.stop_reason: Optional[str] = None
+        self._head_checked = False
+        self._scan_from = 0
+
+    def feed(self, delta: str) -> bool:
+        """接收一段输出
+
+        Args:
+            delta: 新收到的文本
+
+        Returns:
+            是否应该停止接收
+        """
+        self.text += delta
+
+        if not self._head_checked:
+            stripped = self.text.strip()
+            if SENTINEL_PATTERN.match(self.text):
+                self.stop_reason = STOP_IRRELEVANT
+                return True
+            if len(stripped) >= HEAD_CHECK_CHARS:
+                self._head_checked = True
+
+        if len(self.text) > self.max_chars:
+            self.stop_reason = STOP_LENGTH
+            return True
+
+        self._scan_fields()
+        return False
+
+    def _scan_fields(self):
+        """从上次扫描位置开始提取新完成的字段"""
+        for match in FIELD_PATTERN.finditer(self.text, self._scan_from):
+            self._scan_from = match.end() - 1
+            name = match.group(1)
+            if name in self.fields:
+                continue
+            try:
+                value = json.loads(match.group(2))
+            except ValueError:
+                continue
+            self.fields[name] = value
+            if self.on_field is not None:
+                try:
+                    self.on_field(name, value)
+                except Exception as e:
+                    logger.error(f"处理流式字段回调出错: {name}, 错误: {e}")
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+文本规范化模块 - 预编译正则的中英文空格、数字合并、表情统计和Crunchbase排版
+
+TextUtils 的对应方法直接调用这里的函数，输出与原实现逐字节一致，
+逐字节对比和性能测试见 src/clean/text_normalizer_bench.py。
+
+- space_text: 中文与英文/数字之间插入空格，合并被空白隔开的短数字（URL中的数字不合并）
+- space_batch: 批量处理一批文本
+"""
+
+import re
+from typing import Iterable, List, Optional
+
+# 中文与英文/数字的交界处（零宽匹配，在交界处插入空格）
+CJK_LATIN_BOUNDARY = re.compile(r'(?<=[\u4e00-\u9fa5])(?=[a-zA-Z0-9])|(?<=[a-zA-Z0-9])(?=[\u4e00-\u9fa5])')
+
+# URL整体匹配后原样保留，否则匹配被空白隔开的两段数字
+URL_OR_SPLIT_DIGITS = re.compile(r'https?://[^\s]+|(\d+)\s+(\d+)')
+URL_PATTERN = re.compile(r'https?://[^\s]+')
+SPLIT_DIGITS = re.compile(r'(\d+)\s+(\d+)')
+
+# 合并后总长度不超过该值的数字才合并（例如 100 000 -> 100000）
+MAX_MERGED_DIGITS = 10
+
+# 估算token数时按每字一个token计算的中日韩字符
+CJK_TOKEN_CHARS = re.compile(r'[\u3000-\u303f\u3040-\u30ff\u4e00-\u9fff\uff00-\uffef]')
+
+# 表情符号（与原实现的字符范围相同）
+EMOJI_PATTERN = re.compile(
+    "["
+    "\U0001F600-\U0001F64F"  # 表情符号
+    "\U0001F300-\U0001F5FF"  # 符号和象形文字
+    "\U0001F680-\U0001F6FF"  # 交通和地图符号
+    "\U0001F700-\U0001F77F"  # 字母符号
+    "\U0001F780-\U0001F7FF"  # 几何符号
+    "\U0001F800-\U0001F8FF"  # 补充箭头
+    "\U0001F900-\U0001F9FF"  # 补充符号和象形文字
+    "\U0001FA00-\U0001FA6F"  # 国际象棋符号
+    "\U0001FA70-\U0001FAFF"  # 符号和象形文字扩展
+    "\U00002702-\U000027B0"  # Dingbats
+    "\U000024C2-\U0001F251"
+    "]+"
+)
+
+# 标点规范化
+MULTI_BLANK_LINES = re.compile(r'\n{3,}')
+CJK_PUNCT_NO_SPACE = re.compile(r'([，。！？；：])([^\s])')
+
+# Crunchbase排版
+CRUNCHBASE_LINK = re.compile(r'http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\(\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+')
+SINGLE_NEWLINE = re.compile(r'(?<!\n)\n(?!\n)')
+SENTENCE_SPLIT = re.compile(r'([。！？.!?])')
+MAX_PARAGRAPH_LENGTH = 300
+
+
+def _merge_digits(match) -> str:
+    if match.group(1) is None:
+        return match.group(0)
+    left, right = match.group(1), match.group(2)
+    return left + right if len(left) + len(right) <= MAX_MERGED_DIGITS else match.group(0)
+
+
+def _has_nested_urls(text: str) -> bool:
+    """文本中是否有一个URL是另一个不同URL的一部分"""
+    if '://' not in text:
+        return False
+    urls = set(URL_PATTERN.findall(text))
+    return len(urls) > 1 and any(a != b and a in b for a in urls for b in urls)
+
+
+def _merge_digits_with_placeholders(text: str) -> str:
+    """原实现的做法：URL依次替换为占位符后合并数字再恢复
+
+    一个URL是另一个URL的前缀时，较长URL的剩余部分不受保护，其中的数字也会被合并，
+    只有这种情况需要按原做法处理才能得到相同的输出。
+    """
+    urls = URL_PATTERN.findall(text)
+    for i, url in enumerate(urls):
+        text = text.replace(url, f"__URL_PLACEHOLDER_{i}__")
+    text = SPLIT_DIGITS.sub(_merge_digits, text)
+    for i, url in enumerate(urls):
+        text = text.replace(f"__URL_PLACEHOLDER_{i}__", url)
+    return text
+
+
+def _merge_spaced_digits(text: str) -> str:
+    if _has_nested_urls(text):
+        return _merge_digits_with_placeholders(text)
+    return URL_OR_SPLIT_DIGITS.sub(_merge_digits, text)
+
+
+def space_text(text: Optional[str]) -> str:
+    """确保英文单词和数字前后有空格，并合并被空白隔开的短数字"""
+    if not text:
+        return ""
+    return _merge_spaced_digits(CJK_LATIN_BOUNDARY.sub(' ', text))
+
+
+def space_batch(texts: Iterable[Optional[str]]) -> List[str]:
+    """批量执行 space_text
+
+    把整批文本连接成一个字符串处理在测试中没有更快（正则的工作量相同，另有连接和切分的开销），
+    因此逐条处理。
+    """
+    return [space_text(text) for text in texts]
+
+
+def count_emoji(text: str) -> int:
+    """统计文本中表情符号（连续的算一个）的数量"""
+    return len(EMOJI_PATTERN.findall(text))
+
+
+def standardize_punctuation(content: str) -> str:
+    """段落间最多保留一个空行，中文标点后补空格，确保以句号结尾"""
+    if not content:
+        return ""
+    content = CJK_PUNCT_NO_SPACE.sub(r'\1 \2', MULTI_BLANK_LINES.sub('\n\n', content)).rstrip()
+    if content and not content[-1] in '。！？.!?':
+        content += '。'
+    return content
+
+
+def _split_long_paragraph(para: str) -> str:
+    """按句子把超长段落分成不超过 MAX_PARAGRAPH_LENGTH 字符的段落"""
+    parts = SENTENCE_SPLIT.split(para)
+    pieces: List[str] = []
+    char_count = 0
+    for i in range(0, len(parts), 2):
+        sentence = parts[i] + parts[i + 1] if i + 1 < len(parts) else parts[i]
+        if char_count + len(sentence) > MAX_PARAGRAPH_LENGTH:
+            pieces.append("\n\n")
+            char_count = len(sentence)
+        else:
+            char_count += len(sentence)
+        pieces.append(sentence)
+    return ''.join(pieces)
+
+
+def format_crunchbase(content: str) -> str:
+    """Crunchbase正文排版：链接加标签，单个换行改为空行，超长段落按句子分段"""
+    if not content:
+        return ""
+    content = SINGLE_NEWLINE.sub("\n\n", CRUNCHBASE_LINK.sub(lambda m: f"[链接]({m.group(0)})", content))
+    return "\n\n".join(
+        _split_long_paragraph(para) if len(para) > MAX_PARAGRAPH_LENGTH else para
+        for para in content.split("\n\n")
+    )
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+文本规范化逐字节对比与性能测试
+
+用原 TextUtils 实现（保留在本文件中作为对照）和 src/clean/text_normalizer.py 处理同一批文本，
+逐条对比输出，任一条不一致时列出差异并以状态码1退出；然后分别计时。
+
+    python -m src.clean.text_normalizer_bench --count 100000
+    python -m src.clean.text_normalizer_bench --data src/data/crawl_log   # 加入真实数据
+"""
+
+import re
+import sys
+import time
+import random
+import argparse
+from typing import Callable, Dict, List
+
+from src.clean import text_normalizer
+from src.clean.storage import iter_json_items, raw_text
+
+
+# ---- 原实现，仅作为对照 ----
+
+def legacy_ensure_space(text: str) -> str:
+    if not text:
+        return ""
+    text = re.sub(r'([\u4e00-\u9fa5])([a-zA-Z0-9])', r'\1 \2', text)
+    text = re.sub(r'([a-zA-Z0-9])([\u4e00-\u9fa5])', r'\1 \2', text)
+    urls = re.findall(r'https?://[^\s]+', text)
+    for i, url in enumerate(urls):
+        placeholder = f"__URL_PLACEHOLDER_{i}__"
+        text = text.replace(url, placeholder)
+    text = re.sub(r'(\d+)\s+(\d+)', lambda m: m.group(1) + m.group(2) if len(m.group(1)) + len(m.group(2)) <= 10 else m.group(0), text)
+    for i, url in enumerate(urls):
+        placeholder = f"__URL_PLACEHOLDER_{i}__"
+        text = text.replace(placeholder, url)
+    return text
+
+
+def legacy_count_emoji(text: str) -> int:
+    emoji_pattern = re.compile(
+        "["
+        "\U0001F600-\U0001F64F"
+        "\U0001F300-\U0001F5FF"
+        "\U0001F680-\U0001F6FF"
+        "\U0001F700-\U0001F77F"
+        "\U0001F780-\U0001F7FF"
+        "\U0001F800-\U0001F8FF"
+        "\U0001F900-\U0001F9FF"
+        "\U0001FA00-\U0001FA6F"
+        "\U0001FA70-\U0001FAFF"
+        "\U00002702-\U000027B0"
+        "\U000024C2-\U0001F251"
+        "]+"
+    )
+    return len(emoji_pattern.findall(text))
+
+
+def legacy_standardize_punctuation(content: str) -> str:
+    if not content:
+        return ""
+    content = re.sub(r'\n{3,}', '\n\n', content)
+    content = re.sub(r'([，。！？；：])([^\s])', r'\1 \2', content)
+    content = content.rstrip()
+    if content and not content[-1] in '。！？.!?':
+        content += '。'
+    return content
+
+
+def legacy_format_crunchbase(content: str) -> str:
+    if not content:
+        return ""
+    content = re.sub('http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\(\\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+',
+                     lambda m: f"[链接]({m.group(0)})", content)
+    content = re.sub(r'(?<!\n)\n(?!\n)', "\n\n", content)
+    paragraphs = content.split("\n\n")
+    formatted_paragraphs = []
+    for para in paragraphs:
+        if len(para) > 300:
+            sentences = re.split(r'([。！？.!?])', para)
+            new_para = ""
+            char_count = 0
+            for i in range(0, len(sentences), 2):
+                if i+1 < len(sentences):
+                    sentence = sentences[i] + sentences[i+1]
+                else:
+                    sentence = sentences[i]
+                if char_count + len(sentence) > 300:
+                    new_para += "\n\n" + sentence
+                    char_count = len(sentence)
+                else:
+                    new_para += sentence
+                    char_count += len(sentence)
+            formatted_paragraphs.append(new_para)
+        else:
+            formatted_paragraphs.append(para)
+    return "\n\n".join(formatted_paragraphs)
+
+
+# ---- 测试数据 ----
+
+FRAGMENTS = [
+    "OpenAI发布GPT-5模型", "参数量达到1.8万亿", "共50张图片", "融资1000 万美元", "100 000 次调用",
+    "详情见https://example.com/a/123 456", "视频 http://t.co/abc123中文", "Llama3在MMLU上得分86.1",
+    "估值 12 345 678 901 美元", "🚀🚀 AI来了！", "点赞 1,234，转发 56", "2024-05-01 12:00",
+    "Anthropic's Claude 3.5 Sonnet", "这是一段没有英文的中文内容。", "\n\n\n", "第二段，没有空格。",
+    "链接：https://www.crunchbase.com/organization/x?utm=1&a=(b)", "A轮融资2亿元，由红杉中国领投",
+    "The company raised $25M in a Series B round led by a16z.", "数据 3 4 5 6",
+]
+
+
+def build_corpus(count: int, seed: int = 42) -> List[str]:
+    """用常见片段随机拼接出count条文本，其中少量为超过300字符的长段落"""
+    rng = random.Random(seed)
+    corpus = []
+    for i in range(count):
+        parts = rng.choices(FRAGMENTS, k=rng.randint(1, 30 if i % 20 == 0 else 6))
+        corpus.append(rng.choice(['', ' ', '\n']).join(parts))
+    return corpus
+
+
+def load_real_texts(path: str) -> List[str]:
+    return [text for text in (raw_text(item) for item in iter_json_items(path)) if text]
+
+
+def _time(func: Callable, *args) -> float:
+    started = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description="文本规范化逐字节对比与性能测试")
+    parser.add_argument('--count', type=int, default=100000, help="生成的测试文本条数")
+    parser.add_argument('--data', help="额外加入的真实数据（JSON数组、JSONL或爬虫日志目录）")
+    args = parser.parse_args()
+
+    corpus = build_corpus(args.count)
+    if args.data:
+        corpus += load_real_texts(args.data)
+    print(f"测试文本 {len(corpus)} 条，平均长度 {sum(map(len, corpus)) / max(1, len(corpus)):.0f} 字符")
+
+    pairs: Dict[str, tuple] = {
+        'ensure_space': (legacy_ensure_space, text_normalizer.space_text),
+        'count_emoji': (legacy_count_emoji, text_normalizer.count_emoji),
+        'standardize_punctuation': (legacy_standardize_punctuation, text_normalizer.standardize_punctuation),
+        'format_crunchbase': (legacy_format_crunchbase, text_normalizer.format_crunchbase),
+    }
+
+    # 逐字节对比
+    mismatches = 0
+    for name, (legacy, new) in pairs.items():
+        for text in corpus:
+            expected, actual = legacy(text), new(text)
+            if expected != actual:
+                mismatches += 1
+                if mismatches <= 5:
+                    print(f"[{name}] 输出不一致\n  输入: {text!r}\n  原实现: {expected!r}\n  新实现: {actual!r}")
+    batch = text_normalizer.space_batch(corpus)
+    batch_mismatches = sum(1 for text, actual in zip(corpus, batch) if legacy_ensure_space(text) != actual)
+    if batch_mismatches or len(batch) != len(corpus):
+        print(f"[space_batch] 输出不一致 {batch_mismatches} 条，条数 {len(batch)}/{len(corpus)}")
+        mismatches += batch_mismatches or 1
+    if mismatches:
+        print(f"共 {mismatches} 条输出不一致")
+        sys.exit(1)
+    print("逐字节对比通过")
+
+    # 性能测试
+    for name, (legacy, new) in pairs.items():
+        old_seconds = _time(lambda: [legacy(text) for text in corpus])
+        new_seconds = _time(lambda: [new(text) for text in corpus])
+        print(f"{name:<24} 原实现 {old_seconds:.2f} 秒，新实现 {new_seconds:.2f} 秒，加速 {old_seconds / max(new_seconds, 1e-9):.1f} 倍")
+    batch_seconds = _time(text_normalizer.space_batch, corpus)
+    print(f"{'space_batch':<24} {batch_seconds:.2f} 秒")
+
+
+if __name__ == "__main__":
+    main()
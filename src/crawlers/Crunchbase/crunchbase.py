@@ -24,7 +24,10 @@ import random
 import re
 import logging
 import threading
-from src.utils.paths import CRU_TEMP_DATA_PATH, DATA_DIR, CRU_URLS_PATH, CRU_URLS_DEBUG_PATH, LOGS_DIR
+from src.utils.paths import DATA_DIR, CRU_URLS_PATH, CRU_URLS_DEBUG_PATH, LOGS_DIR
+from src.db.url_filter import get_url_filter
+from src.db.work_queue import get_work_queue
+from src.db.crawl_log import get_crawl_log, QUEUE_CONSUMER
 
 # 常量定义
 BEIJING_TZ = pytz.timezone('Asia/Shanghai')
@@ -239,6 +242,22 @@ class CrunchbaseCrawler:
             logger.info("首次运行，爬取所有URL")
             new_urls = current_urls
         
+        # 排除已入库的文章（与清洗器共享URL去重服务），记入URL表避免下次重复检查
+        try:
+            url_filter = get_url_filter()
+            stored_urls = url_filter.find_existing(new_urls)
+            if stored_urls:
+                logger.info(f"跳过 {len(stored_urls)} 个已入库的URL")
+                for url in stored_urls:
+                    url_table["urls"][url] = {
+                        "scraped": True,
+                        "first_seen": datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+                    }
+                new_urls = [url for url in new_urls if url not in stored_urls]
+            logger.info(f"URL过滤器状态: {url_filter.stats()}")
+        except Exception as e:
+            logger.warning(f"URL去重服务不可用，跳过入库去重: {e}")
+        
         # 将新URL添加到表中，标记为未爬取
         for url in new_urls:
             url_table["urls"][url] = {
@@ -613,44 +632,21 @@ class CrunchbaseCrawler:
         return formatted_posts
     
     def _save_to_temp_storage(self, article_data):
-        """将爬取的文章数据保存到临时存储"""
+        """将爬取的文章数据追加到爬虫日志，由清洗器转入待清洗队列"""
         if not article_data:
             return
         
         try:
-            # 使用paths.py中定义的常量路径
-            temp_file = CRU_TEMP_DATA_PATH
-            
-            # 确保目录存在
-            if not os.path.exists(os.path.dirname(temp_file)):
-                os.makedirs(os.path.dirname(temp_file))
-            
-            # 读取现有数据
-            existing_data = []
-            if os.path.exists(temp_file) and os.path.getsize(temp_file) > 0:
-                try:
-                    with open(temp_file, 'r', encoding='utf-8') as f:
-                        content = f.read().strip()
-                        if content:
-                            existing_data = json.loads(content)
-                except json.JSONDecodeError as e:
-                    logger.error(f"解析现有数据出错: {e}，将创建新文件")
-            
-            # 合并并保存数据
-            if isinstance(article_data, list):
-                combined_data = existing_data + article_data
-            else:
-                combined_data = existing_data + [article_data]
-                
-            with open(temp_file, 'w', encoding='utf-8') as f:
-                json.dump(combined_data, f, ensure_ascii=False)
+            if not isinstance(article_data, list):
+                article_data = [article_data]
+            added = get_crawl_log().append(article_data, source='crunchbase.com')
             
             # 更新存储时间戳
             self.last_save_time = time.time()
-            logger.info(f"成功保存文章数据到临时存储: {temp_file}")
+            logger.info(f"成功追加 {added} 篇文章数据到爬虫日志")
             
         except Exception as e:
-            logger.error(f"保存到临时存储时出错: {e}")
+            logger.error(f"追加到爬虫日志时出错: {e}")
     
     def process_and_save_in_batches(self, posts, batch_size=10):
         """将大量文章数据批量处理并只保存到临时存储，不再直接写入data.jsonl"""
@@ -689,8 +685,8 @@ class CrunchbaseCrawler:
             posts = self.crawl_posts()
             
             # 判断是否需要分批处理
-            # 如果文章数量超过15，或者这是首次运行（判断cru_tempdata.json是否存在）
-            is_first_run = not os.path.exists(CRU_TEMP_DATA_PATH) or os.path.getsize(CRU_TEMP_DATA_PATH) < 100
+            # 如果文章数量超过15，或者这是首次运行（待清洗队列和爬虫日志中都没有数据）
+            is_first_run = get_work_queue().pending_count() == 0 and not get_crawl_log().has_pending(QUEUE_CONSUMER)
             
             if len(posts) > 15 or is_first_run:
                 logger.info("检测到大量文章或首次运行，使用分批处理模式")
@@ -729,9 +725,6 @@ def main():
             crawler_thread.daemon = True
             crawler_thread.start()
             
-            # 检查是否有新数据写入
-            temp_file = CRU_TEMP_DATA_PATH
-            
             # 超时监控循环
             while crawler_thread.is_alive():
                 # 每30秒检查一次
@@ -739,16 +732,13 @@ def main():
                 
                 current_time = time.time()
                 
-                # 检查文件是否存在和最后修改时间
-                if os.path.exists(temp_file):
-                    file_mod_time = os.path.getmtime(temp_file)
-                    
-                    # 如果超过10分钟没有更新文件，判断为爬虫卡死
-                    if (current_time - file_mod_time > 600) and (current_time - last_check_time > 600):
-                        logger.warning("警告: 超过10分钟没有新数据写入tempdata.json，判断爬虫卡死")
-                        crawler.close()
-                        logger.warning("强制关闭爬虫并退出监控")
-                        return
+                # 检查最后一次写入爬虫日志的时间
+                # 如果超过10分钟没有新数据写入，判断为爬虫卡死
+                if (current_time - crawler.last_save_time > 600) and (current_time - last_check_time > 600):
+                    logger.warning("警告: 超过10分钟没有新数据写入爬虫日志，判断爬虫卡死")
+                    crawler.close()
+                    logger.warning("强制关闭爬虫并退出监控")
+                    return
                 
                 # 如果总运行时间超过20分钟，也强制退出
                 if current_time - start_time > 1200:  # 20分钟
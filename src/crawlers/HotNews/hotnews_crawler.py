@@ -15,10 +15,12 @@ import datetime
 import pytz
 from typing import List, Dict, Any, Optional
 import traceback
-from openai import OpenAI
 
 from src.utils.log_handler import get_logger
-from src.db.mongodb import MongoDB
+from src.utils.rate_limiter import get_rate_limiter
+from src.utils.llm_router import get_llm_router
+from src.db.backend import get_database, WRITE_INSERTED
+from src.db.write_buffer import get_write_buffer
 from src.utils.paths import DATA_DIR
 
 # 创建日志记录器
@@ -33,6 +35,9 @@ PROCESS_MODEL_NAME = 'deepseek-v3-0324'    # 用于处理结果
 # 控制API请求频率的参数
 API_REQUEST_TIMEOUT = 180  # 秒，增加timeout以适应搜索过程
 
+# 等待报告写入数据库的超时时间
+WRITE_TIMEOUT = 60  # 秒
+
 # 输出文件路径
 HOTNEWS_OUTPUT_PATH = os.path.join(DATA_DIR, "hotnews_data.json")
 
@@ -43,25 +48,16 @@ class HotNewsCrawler:
         """初始化爬虫"""
         # 初始化数据库连接
         try:
-            self.db = MongoDB()
-            logger.info("MongoDB连接初始化成功")
+            self.db = get_database()
+            logger.info("数据库连接初始化成功")
         except Exception as e:
-            logger.error(f"MongoDB连接初始化失败: {e}")
+            logger.error(f"数据库连接初始化失败: {e}")
             self.db = None
             raise
         
-        # 初始化OpenAI客户端
-        try:
-            self.client = OpenAI(
-                api_key=API_KEY,
-                base_url=API_BASE_URL,
-                timeout=API_REQUEST_TIMEOUT
-            )
-            logger.info(f"OpenAI客户端初始化成功，搜索模型: {SEARCH_MODEL_NAME}, 处理模型: {PROCESS_MODEL_NAME}")
-        except Exception as e:
-            logger.error(f"OpenAI客户端初始化失败: {e}")
-            self.client = None
-            raise
+        # 与清洗器共享接口路由器：多个接口间按健康状况选择并自动故障转移，重试由共享的限流器负责
+        self.client = get_llm_router(API_BASE_URL, API_KEY)
+        logger.info(f"AI客户端初始化成功，搜索模型: {SEARCH_MODEL_NAME}, 处理模型: {PROCESS_MODEL_NAME}")
     
     def get_time_range(self) -> tuple:
         """获取时间范围：前一天下午2点到今天上午10点
@@ -159,13 +155,15 @@ class HotNewsCrawler:
             
             logger.info("开始生成资讯报告...")
             
-            # 调用API
-            response = self.client.chat.completions.create(
+            # 调用API，使用独立的限流器：深度搜索模型的长时间超时不应让清洗器减小并发、全局暂停
+            response = get_rate_limiter('hotnews').call(
+                self.client.chat.completions.create,
                 model=SEARCH_MODEL_NAME,
                 messages=[
                     {"role": "user", "content": prompt}
                 ],
-                temperature=0.1
+                temperature=0.1,
+                timeout=API_REQUEST_TIMEOUT
             )
             
             # 提取结果
@@ -205,13 +203,15 @@ class HotNewsCrawler:
             
             logger.info("开始处理最终报告...")
             
-            # 调用API
-            response = self.client.chat.completions.create(
+            # 调用API，使用独立的限流器：深度搜索模型的长时间超时不应让清洗器减小并发、全局暂停
+            response = get_rate_limiter('hotnews').call(
+                self.client.chat.completions.create,
                 model=PROCESS_MODEL_NAME,
                 messages=[
                     {"role": "user", "content": prompt}
                 ],
-                temperature=0.1
+                temperature=0.1,
+                timeout=API_REQUEST_TIMEOUT
             )
             
             # 提取结果
@@ -283,9 +283,9 @@ class HotNewsCrawler:
             date_str = report.get('date', '').replace(' ', '_').replace(':', '-')
             report['source_url'] = f"hotnews://{date_str}"
             
-            # 保存到数据库
-            result = self.db.insert_articles([report])
-            if result > 0:
+            # 通过共享写入缓冲区保存，与同进程内的其他写入合并为批量写入
+            status = get_write_buffer(self.db).submit(report).result(timeout=WRITE_TIMEOUT)
+            if status == WRITE_INSERTED:
                 logger.info(f"成功保存报告到数据库: {report.get('title', '无标题')}")
                 return True
             else:
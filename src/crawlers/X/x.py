@@ -34,7 +34,10 @@ from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
 
 # 导入路径常量
-from src.utils.paths import X_TEMP_DATA_PATH, DATA_DIR
+from src.utils.paths import DATA_DIR
+from src.db.url_filter import get_url_filter
+from src.db.work_queue import get_work_queue
+from src.db.crawl_log import get_crawl_log, QUEUE_CONSUMER
 
 # 常量定义
 BEIJING_TZ = pytz.timezone('Asia/Shanghai')
@@ -1406,37 +1409,15 @@ class XCrawler:
         return formatted_posts
 
     def save_to_temp_storage(self, posts):
-        """将文章保存到临时存储文件"""
+        """将文章追加到爬虫日志，由清洗器转入待清洗队列"""
         if not posts:
             return
 
         try:
-            # 使用paths.py中定义的常量路径
-            temp_file_path = X_TEMP_DATA_PATH
-            
-            # 确保目录存在
-            if not os.path.exists(os.path.dirname(temp_file_path)):
-                os.makedirs(os.path.dirname(temp_file_path))
-                
-            # 读取现有数据
-            existing_data = []
-            if os.path.exists(temp_file_path) and os.path.getsize(temp_file_path) > 0:
-                try:
-                    with open(temp_file_path, 'r', encoding='utf-8') as f:
-                        content = f.read().strip()
-                        if content:
-                            existing_data = json.loads(content)
-                except json.JSONDecodeError as e:
-                    print(f"解析现有数据出错: {e}，将创建新文件")
-            
-            # 合并并保存数据
-            combined_data = existing_data + posts
-            with open(temp_file_path, 'w', encoding='utf-8') as f:
-                json.dump(combined_data, f, ensure_ascii=False, indent=2)
-
-            print(f"成功保存 {len(posts)} 篇文章到临时存储文件: {temp_file_path}")
+            added = get_crawl_log().append(posts, source='x.com')
+            print(f"成功追加 {added} 篇文章到爬虫日志")
         except Exception as e:
-            print(f"保存到临时存储时出错: {e}")
+            print(f"追加到爬虫日志时出错: {e}")
             import traceback
             traceback.print_exc()
 
@@ -1454,26 +1435,15 @@ class XCrawler:
             except:
                 pass
 
-    def _get_existing_posts(self):
-        """获取已存在的帖子数据，避免重复爬取"""
+    def _get_existing_urls(self):
+        """获取待清洗队列和爬虫日志中尚未清洗的URL，避免重复爬取"""
         try:
-            # 使用paths.py中定义的常量路径
-            temp_file_path = X_TEMP_DATA_PATH
-            
-            # 读取现有数据
-            if os.path.exists(temp_file_path) and os.path.getsize(temp_file_path) > 0:
-                try:
-                    with open(temp_file_path, 'r', encoding='utf-8') as f:
-                        content = f.read().strip()
-                        if content:
-                            return json.loads(content)
-                except json.JSONDecodeError as e:
-                    print(f"解析现有数据出错: {e}")
-            
-            return []
+            urls = get_work_queue().pending_keys()
+            urls.update(item.get('source_url', '') for item in get_crawl_log().iter_pending(QUEUE_CONSUMER))
+            return urls
         except Exception as e:
-            print(f"获取已存在帖子时出错: {e}")
-            return []
+            print(f"获取待清洗URL时出错: {e}")
+            return set()
             
     def retry_with_another_account(self):
         """使用另一个账号重试"""
@@ -1542,15 +1512,26 @@ class XCrawler:
             print("\n===== 爬取资讯 =====")
             
             # 先获取已有的数据，避免重复爬取
-            existing_posts = self._get_existing_posts()
-            existing_urls = set(post.get('source_url', '') for post in existing_posts if 'source_url' in post)
-            print(f"已有 {len(existing_urls)} 条推文URL在数据库中")
+            existing_urls = self._get_existing_urls()
+            print(f"已有 {len(existing_urls)} 条推文URL在待清洗队列中")
             
             # 爬取推文
             posts = self.crawl_posts()
             
             # 过滤已爬取过的推文
             new_posts = [post for post in posts if post.get('url', '') not in existing_urls]
+            
+            # 过滤已入库的推文（与清洗器共享URL去重服务）
+            try:
+                url_filter = get_url_filter()
+                stored_urls = url_filter.find_existing(post.get('url', '') for post in new_posts)
+                if stored_urls:
+                    new_posts = [post for post in new_posts if post.get('url', '') not in stored_urls]
+                    print(f"跳过 {len(stored_urls)} 条已入库的推文")
+                print(f"URL过滤器状态: {url_filter.stats()}")
+            except Exception as e:
+                print(f"URL去重服务不可用，跳过入库去重: {e}")
+            
             print(f"新增推文 {len(new_posts)}/{len(posts)} 条")
             
             # 如果需要，可以继续筛选新推文
@@ -1563,10 +1544,9 @@ class XCrawler:
                 print("未能爬取到任何帖子，任务结束")
                 return 0
 
-            # 保存数据到临时存储
+            # 保存数据到待清洗队列
             formatted_posts = self.format_posts_for_saving(posts)
             self.save_to_temp_storage(formatted_posts)
-            print(f"已将 {len(formatted_posts)} 条资讯保存到临时存储")
             
             # 任务完成后，再次更新cookie
             self._safe_update_cookie()
@@ -0,0 +1,197 @@
+"""
+存储后端抽象模块
+
+定义各存储后端需要实现的文章读写接口，并根据环境变量选择具体实现：
+- mongodb（默认）：MongoDB / Atlas
+- sqlite：单机部署使用的嵌入式SQLite数据库
+"""
+
+import os
+import threading
+from typing import List, Dict, Any, Optional, Tuple, Union, Set, Iterator
+
+from src.utils.log_handler import get_logger
+
+# 创建日志记录器
+logger = get_logger("storage_backend")
+
+# 存储后端选择
+STORAGE_BACKEND = os.getenv('STORAGE_BACKEND', 'mongodb').lower()
+
+# 写入结果状态
+WRITE_INSERTED = 'inserted'
+WRITE_MATCHED = 'matched'
+WRITE_FAILED = 'failed'
+
+
+class StorageBackend:
+    """存储后端基类，接口与MongoDB类保持一致"""
+
+    def check_connection(self) -> bool:
+        """检查数据库连接是否可用"""
+        raise NotImplementedError("子类必须实现check_connection方法")
+
+    def get_existing_urls(self) -> List[str]:
+        """获取所有已存在的URL"""
+        raise NotImplementedError("子类必须实现get_existing_urls方法")
+
+    def find_existing_urls(self, urls: List[str]) -> Set[str]:
+        """批量确认哪些URL已存在"""
+        raise NotImplementedError("子类必须实现find_existing_urls方法")
+
+    def find_existing_text_hashes(self, hashes: List[str]) -> Set[str]:
+        """批量确认哪些正文哈希（text_hash字段）已存在"""
+        raise NotImplementedError("子类必须实现find_existing_text_hashes方法")
+
+    def add_duplicate_refs(self, source_url: str, refs: List[Dict[str, Any]]) -> bool:
+        """把近似重复数据的引用追加到文章的duplicates字段，文章不存在时返回False"""
+        raise NotImplementedError("子类必须实现add_duplicate_refs方法")
+    
+    def iter_urls_after(self, last_id: Optional[str] = None) -> Iterator[Tuple[str, str]]:
+        """按写入顺序遍历指定文档ID之后的URL"""
+        raise NotImplementedError("子类必须实现iter_urls_after方法")
+
+    def iter_articles_after(self, last_id: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        """按写入顺序遍历指定文档ID之后的完整文章，_id为字符串"""
+        raise NotImplementedError("子类必须实现iter_articles_after方法")
+
+    def bulk_upsert_articles(self, articles: List[Dict[str, Any]]) -> List[str]:
+        """按source_url批量upsert文章，返回每篇文章的写入状态"""
+        raise NotImplementedError("子类必须实现bulk_upsert_articles方法")
+
+    def find_by_url(self, url: str) -> Optional[Dict[str, Any]]:
+        """根据URL查找文章"""
+        raise NotImplementedError("子类必须实现find_by_url方法")
+
+    def get_articles(self, query: Dict[str, Any] = None, skip: int = 0, limit: int = 10, sort: List[Tuple[str, int]] = None) -> List[Dict[str, Any]]:
+        """获取文章列表，支持分页和排序"""
+        raise NotImplementedError("子类必须实现get_articles方法")
+
+    def get_article_by_id(self, article_id: str) -> Optional[Dict[str, Any]]:
+        """根据ID获取文章"""
+        raise NotImplementedError("子类必须实现get_article_by_id方法")
+
+    def search_articles(self, query_term: str = None, query: str = None, query_filter: Dict[str, Any] = None, search_criteria: Dict[str, Any] = None, skip: int = 0, limit: int = 50, page: int = 1, per_page: int = 50) -> Union[List[Dict[str, Any]], Tuple[List[Dict[str, Any]], int]]:
+        """搜索文章，返回(文章列表, 总匹配数)"""
+        raise NotImplementedError("子类必须实现search_articles方法")
+
+    def get_article_count(self, query: Dict[str, Any] = None) -> int:
+        """获取文章总数"""
+        raise NotImplementedError("子类必须实现get_article_count方法")
+
+    def get_unprocessed_data(self) -> List[Dict[str, Any]]:
+        """获取未处理的数据"""
+        raise NotImplementedError("子类必须实现get_unprocessed_data方法")
+
+    def update_processed_data(self, doc_id: str, cleaned_data: Dict[str, Any]) -> bool:
+        """更新已处理的数据"""
+        raise NotImplementedError("子类必须实现update_processed_data方法")
+
+    def insert_articles(self, articles: List[Dict[str, Any]]) -> int:
+        """批量插入文章，已存在的source_url会被跳过而不会中断整批写入
+
+        Args:
+            articles: 要插入的文章列表
+
+        Returns:
+            成功插入的文章数量
+        """
+        return self.upsert_articles(articles)[WRITE_INSERTED]
+
+    def upsert_articles(self, articles: List[Dict[str, Any]]) -> Dict[str, int]:
+        """按source_url批量upsert文章
+
+        Args:
+            articles: 要写入的文章列表
+
+        Returns:
+            包含inserted（新插入）、matched（已存在）、failed（失败）数量的字典
+        """
+        if not articles:
+            return {WRITE_INSERTED: 0, WRITE_MATCHED: 0, WRITE_FAILED: 0}
+        statuses = self.bulk_upsert_articles(articles)
+        counts = {WRITE_INSERTED: 0, WRITE_MATCHED: 0, WRITE_FAILED: 0}
+        for status in statuses:
+            counts[status] += 1
+        if counts[WRITE_MATCHED] or counts[WRITE_FAILED]:
+            logger.info(f"批量写入完成: 新插入 {counts[WRITE_INSERTED]} 条, 已存在 {counts[WRITE_MATCHED]} 条, 失败 {counts[WRITE_FAILED]} 条")
+        return counts
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取数据库统计信息
+
+        Returns:
+            包含统计信息的字典
+        """
+        try:
+            # 获取总文章数
+            total_articles = self.get_article_count()
+
+            # 获取各数据源的文章数
+            sources = {}
+            for source in ['x.com', 'crunchbase']:
+                count = self.get_article_count({'source': source})
+                sources[source] = count
+
+            # 获取最新更新时间
+            latest_article = self.get_articles(limit=1, sort=[('date_time', -1)])
+            last_update = latest_article[0]['date_time'] if latest_article else None
+
+            return {
+                'total_articles': total_articles,
+                'sources': sources,
+                'last_update': last_update
+            }
+        except Exception as e:
+            logger.error(f"获取统计信息失败: {e}")
+            return {
+                'error': str(e)
+            }
+
+    def get_pool_stats(self) -> Dict[str, Any]:
+        """获取连接池指标，默认无连接池"""
+        return {}
+
+    def close(self):
+        """释放数据库资源"""
+        pass
+
+
+# 进程内共享实例
+_database: Optional[StorageBackend] = None
+_database_lock = threading.Lock()
+_database_pid = None
+
+
+def create_database(backend: str = None) -> StorageBackend:
+    """创建指定类型的存储后端实例
+
+    Args:
+        backend: 后端名称 mongodb / sqlite，为空时读取STORAGE_BACKEND环境变量
+
+    Returns:
+        存储后端实例
+    """
+    backend = (backend or STORAGE_BACKEND).lower()
+    if backend == 'sqlite':
+        from src.db.sqlite_backend import SQLiteDB
+        return SQLiteDB()
+    if backend != 'mongodb':
+        logger.warning(f"未知的存储后端: {backend}，使用MongoDB")
+    from src.db.mongodb import MongoDB
+    return MongoDB()
+
+
+def get_database() -> StorageBackend:
+    """获取进程内共享的存储后端实例
+
+    Returns:
+        存储后端实例
+    """
+    global _database, _database_pid
+    with _database_lock:
+        if _database is None or _database_pid != os.getpid():
+            _database = create_database()
+            _database_pid = os.getpid()
+            logger.info(f"使用存储后端: {type(_database).__name__}")
+        return _database
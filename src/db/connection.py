@@ -0,0 +1,241 @@
+"""
+MongoDB连接注册表模块
+
+每个进程只为同一个URI创建一个带连接池的MongoClient，供所有MongoDB实例共享，
+避免每个组件各自握手、各自维护连接池并重复创建索引。
+"""
+
+import os
+import re
+import atexit
+import threading
+from typing import Dict, Any, Callable, Hashable
+
+import certifi
+from pymongo import MongoClient, monitoring
+
+from src.db import profiler
+from src.utils.log_handler import get_logger
+
+# 创建日志记录器
+logger = get_logger("mongodb_pool")
+
+# 连接池配置，可通过环境变量调整
+MAX_POOL_SIZE = int(os.getenv('MONGODB_MAX_POOL_SIZE', '20'))
+MIN_POOL_SIZE = int(os.getenv('MONGODB_MIN_POOL_SIZE', '0'))
+MAX_IDLE_TIME_MS = int(os.getenv('MONGODB_MAX_IDLE_TIME_MS', '300000'))
+WAIT_QUEUE_TIMEOUT_MS = int(os.getenv('MONGODB_WAIT_QUEUE_TIMEOUT_MS', '10000'))
+
+
+class PoolMetricsListener(monitoring.ConnectionPoolListener):
+    """连接池事件监听器，统计连接创建、借出和归还等指标"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.connections_created = 0
+        self.connections_closed = 0
+        self.checkouts = 0
+        self.checkins = 0
+        self.checkout_failures = 0
+        self.pool_clears = 0
+        self.peak_in_use = 0
+
+    def _incr(self, field: str):
+        with self._lock:
+            setattr(self, field, getattr(self, field) + 1)
+            in_use = self.checkouts - self.checkins
+            if in_use > self.peak_in_use:
+                self.peak_in_use = in_use
+
+    def pool_created(self, event):
+        logger.info(f"连接池已创建: {event.address}")
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        self._incr('pool_clears')
+        logger.warning(f"连接池已清空: {event.address}")
+
+    def pool_closed(self, event):
+        logger.info(f"连接池已关闭: {event.address}")
+
+    def connection_created(self, event):
+        self._incr('connections_created')
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        self._incr('connections_closed')
+
+    def connection_check_out_started(self, event):
+        pass
+
+    def connection_check_out_failed(self, event):
+        self._incr('checkout_failures')
+        logger.warning(f"从连接池获取连接失败: {event.address}, 原因: {event.reason}")
+
+    def connection_checked_out(self, event):
+        self._incr('checkouts')
+
+    def connection_checked_in(self, event):
+        self._incr('checkins')
+
+    def snapshot(self) -> Dict[str, int]:
+        """获取当前指标快照
+
+        Returns:
+            指标字典
+        """
+        with self._lock:
+            return {
+                'connections_created': self.connections_created,
+                'connections_closed': self.connections_closed,
+                'connections_open': self.connections_created - self.connections_closed,
+                'checkouts': self.checkouts,
+                'checkins': self.checkins,
+                'in_use': self.checkouts - self.checkins,
+                'peak_in_use': self.peak_in_use,
+                'checkout_failures': self.checkout_failures,
+                'pool_clears': self.pool_clears,
+            }
+
+
+# 注册表状态，fork之后在子进程中重置
+_lock = threading.Lock()
+_clients: Dict[str, MongoClient] = {}
+_listeners: Dict[str, PoolMetricsListener] = {}
+_done_once: set = set()
+_once_locks: Dict[Hashable, threading.Lock] = {}
+_owner_pid = os.getpid()
+
+
+def _reset_after_fork():
+    """fork后重置注册表，子进程不能复用父进程的连接池"""
+    global _lock, _clients, _listeners, _done_once, _once_locks, _owner_pid
+    _lock = threading.Lock()
+    _clients = {}
+    _listeners = {}
+    _done_once = set()
+    _once_locks = {}
+    _owner_pid = os.getpid()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def _check_pid():
+    """兜底检查：如果进程号变化（未经过register_at_fork的fork），重置注册表"""
+    if os.getpid() != _owner_pid:
+        _reset_after_fork()
+
+
+def _mask_uri(uri: str) -> str:
+    """隐藏URI中的用户名和密码，用于日志和指标输出"""
+    return re.sub(r'//[^@/]+@', '//***@', uri)
+
+
+def get_client(uri: str) -> MongoClient:
+    """获取指定URI对应的共享MongoClient，不存在时创建
+
+    Args:
+        uri: MongoDB连接URI
+
+    Returns:
+        当前进程共享的MongoClient
+    """
+    _check_pid()
+    with _lock:
+        client = _clients.get(uri)
+        if client is not None:
+            return client
+
+        listener = PoolMetricsListener()
+        options = {
+            'maxPoolSize': MAX_POOL_SIZE,
+            'minPoolSize': MIN_POOL_SIZE,
+            'maxIdleTimeMS': MAX_IDLE_TIME_MS,
+            'waitQueueTimeoutMS': WAIT_QUEUE_TIMEOUT_MS,
+            'event_listeners': [listener],
+        }
+        # MONGODB_PROFILE开启时记录每种查询形状，见 src/db/profiler.py
+        if profiler.is_enabled():
+            options['event_listeners'].append(profiler.get_listener())
+        # 本地连接不使用TLS证书
+        if uri.startswith('mongodb+srv://') or 'tls=true' in uri or 'ssl=true' in uri:
+            options['tlsCAFile'] = certifi.where()
+
+        client = MongoClient(uri, **options)
+        _clients[uri] = client
+        _listeners[uri] = listener
+        logger.info(f"已创建共享MongoClient: {_mask_uri(uri)}, 连接池大小: {MIN_POOL_SIZE}-{MAX_POOL_SIZE}")
+        return client
+
+
+def run_once(key: Hashable, func: Callable[[], Any]) -> bool:
+    """在当前进程内对同一个key只执行一次func，例如创建索引
+
+    Args:
+        key: 唯一标识
+        func: 要执行的函数
+
+    func在注册表锁之外执行（每个key各自一把锁），耗时的网络操作不会阻塞
+    get_client，func内部也可以调用get_client；func抛出异常时key不会被标记，
+    下次调用会重试。
+    
+    Returns:
+        本次是否实际执行了func
+    """
+    _check_pid()
+    with _lock:
+        if key in _done_once:
+            return False
+        key_lock = _once_locks.setdefault(key, threading.Lock())
+    
+    with key_lock:
+        with _lock:
+            if key in _done_once:
+                return False
+        func()
+        with _lock:
+            _done_once.add(key)
+        return True
+
+
+def get_pool_stats() -> Dict[str, Any]:
+    """获取所有共享客户端的连接池指标
+
+    Returns:
+        以脱敏URI为键的指标字典
+    """
+    _check_pid()
+    with _lock:
+        stats = {}
+        for uri, listener in _listeners.items():
+            stats[_mask_uri(uri)] = {
+                **listener.snapshot(),
+                'max_pool_size': MAX_POOL_SIZE,
+                'min_pool_size': MIN_POOL_SIZE,
+            }
+        return {'pid': os.getpid(), 'clients': stats}
+
+
+def close_all():
+    """关闭当前进程的所有共享客户端，进程退出时自动调用"""
+    _check_pid()
+    with _lock:
+        for uri, client in list(_clients.items()):
+            try:
+                client.close()
+                logger.info(f"已关闭共享MongoClient: {_mask_uri(uri)}")
+            except Exception as e:
+                logger.error(f"关闭共享MongoClient失败: {e}")
+        _clients.clear()
+        _listeners.clear()
+        _done_once.clear()
+        _once_locks.clear()
+
+
+atexit.register(close_all)
@@ -0,0 +1,318 @@
+"""
+爬虫输出的分段追加日志
+
+爬虫把原始数据按行追加到JSONL分段文件，不再每次读出整个JSON数组再整体重写：
+- append: 每条数据一行，追加写入当前分段，按 CRAWL_LOG_FSYNC 策略刷盘
+- 分段轮转: 当前分段超过 CRAWL_LOG_SEGMENT_BYTES 后新建下一个分段
+- 消费位点: 每个消费者记录 (分段号, 字节偏移)，清洗器从上次位置增量读取
+- compact: 删除所有消费者都已读完的旧分段
+
+目录结构：
+    CRAWL_LOG_DIR/0000000001.jsonl, 0000000002.jsonl, ..., offsets.json
+"""
+
+import os
+import json
+import threading
+from typing import List, Dict, Any, Optional, Iterable, Iterator, Tuple
+
+from src.utils.log_handler import get_logger
+from src.utils.paths import CRAWL_LOG_DIR
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows下只使用进程内锁
+    fcntl = None
+
+# 创建日志记录器
+logger = get_logger("crawl_log")
+
+# 分段大小和刷盘策略：always 每条刷盘 / batch 每次append刷盘 / never 交给操作系统
+CRAWL_LOG_SEGMENT_BYTES = int(os.getenv('CRAWL_LOG_SEGMENT_BYTES', str(8 * 1024 * 1024)))
+CRAWL_LOG_FSYNC = os.getenv('CRAWL_LOG_FSYNC', 'batch').lower()
+
+# 工作队列作为消费者时使用的名称
+QUEUE_CONSUMER = 'work_queue'
+
+SEGMENT_SUFFIX = '.jsonl'
+OFFSETS_FILE = 'offsets.json'
+LOCK_FILE = '.lock'
+
+
+def _segment_name(seq: int) -> str:
+    return f"{seq:010d}{SEGMENT_SUFFIX}"
+
+
+class _FileLock:
+    """进程内线程锁 + 跨进程文件锁"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._fd = None
+
+    def __enter__(self):
+        self._lock.acquire()
+        if fcntl is not None:
+            self._fd = os.open(self.path, os.O_CREAT | os.O_RDWR, 0o644)
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            if self._fd is not None:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+                os.close(self._fd)
+                self._fd = None
+        finally:
+            self._lock.release()
+        return False
+
+
+class CrawlLog:
+    """分段追加的JSONL日志"""
+
+    def __init__(self, directory: str = CRAWL_LOG_DIR, segment_bytes: int = CRAWL_LOG_SEGMENT_BYTES, fsync: str = CRAWL_LOG_FSYNC):
+        """初始化日志
+
+        Args:
+            directory: 日志目录
+            segment_bytes: 单个分段的最大字节数，超过后轮转
+            fsync: 刷盘策略 always / batch / never
+        """
+        if fsync not in ('always', 'batch', 'never'):
+            raise ValueError(f"不支持的刷盘策略: {fsync}")
+        self.directory = directory
+        self.segment_bytes = max(1024, segment_bytes)
+        self.fsync = fsync
+        os.makedirs(self.directory, exist_ok=True)
+        self._lock = _FileLock(os.path.join(self.directory, LOCK_FILE))
+
+    def segments(self) -> List[int]:
+        """现有分段号，升序"""
+        seqs = []
+        for name in os.listdir(self.directory):
+            if name.endswith(SEGMENT_SUFFIX) and name[:-len(SEGMENT_SUFFIX)].isdigit():
+                seqs.append(int(name[:-len(SEGMENT_SUFFIX)]))
+        return sorted(seqs)
+
+    def _path(self, seq: int) -> str:
+        return os.path.join(self.directory, _segment_name(seq))
+
+    def _active_segment(self) -> int:
+        """当前写入的分段号，超过大小上限时轮转到下一个分段（需持有锁）"""
+        seqs = self.segments()
+        seq = seqs[-1] if seqs else 1
+        path = self._path(seq)
+        if os.path.exists(path) and os.path.getsize(path) >= self.segment_bytes:
+            seq += 1
+            logger.info(f"爬虫日志轮转到新分段: {_segment_name(seq)}")
+        return seq
+
+    def append(self, items: Iterable[Dict[str, Any]], source: str = None) -> int:
+        """追加数据，每条一行
+
+        Args:
+            items: 原始数据列表
+            source: 数据来源，条目中没有source字段时补充
+
+        Returns:
+            追加的条数
+        """
+        lines = []
+        for item in items:
+            if source and 'source' not in item:
+                item = {**item, 'source': source}
+            lines.append(json.dumps(item, ensure_ascii=False, default=str) + '\n')
+        if not lines:
+            return 0
+
+        with self._lock:
+            path = self._path(self._active_segment())
+            with open(path, 'a', encoding='utf-8') as f:
+                if self.fsync == 'always':
+                    for line in lines:
+                        f.write(line)
+                        f.flush()
+                        os.fsync(f.fileno())
+                else:
+                    f.write(''.join(lines))
+                    f.flush()
+                    if self.fsync == 'batch':
+                        os.fsync(f.fileno())
+        return len(lines)
+
+    # ---------------- 消费位点 ----------------
+
+    def _offsets_path(self) -> str:
+        return os.path.join(self.directory, OFFSETS_FILE)
+
+    def load_offsets(self) -> Dict[str, List[int]]:
+        """读取所有消费者的位点 {消费者: [分段号, 字节偏移]}"""
+        try:
+            path = self._offsets_path()
+            if os.path.exists(path):
+                with open(path, 'r', encoding='utf-8') as f:
+                    return json.load(f)
+        except Exception as e:
+            logger.error(f"读取爬虫日志消费位点失败: {e}")
+        return {}
+
+    def get_offset(self, consumer: str) -> Tuple[int, int]:
+        """消费者的当前位点，未登记时从最早的分段开始"""
+        offset = self.load_offsets().get(consumer)
+        if offset:
+            return int(offset[0]), int(offset[1])
+        seqs = self.segments()
+        return (seqs[0] if seqs else 1), 0
+
+    def commit(self, consumer: str, offset: Tuple[int, int]):
+        """提交消费位点（先写临时文件再原子替换）"""
+        with self._lock:
+            offsets = self.load_offsets()
+            offsets[consumer] = [int(offset[0]), int(offset[1])]
+            tmp_path = f"{self._offsets_path()}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(offsets, f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self._offsets_path())
+
+    def read(self, consumer: str, max_items: int = 1000, offset: Tuple[int, int] = None) -> Tuple[List[Dict[str, Any]], Tuple[int, int]]:
+        """从消费者位点开始读取一批数据，不会提交位点
+
+        只读取以换行结尾的完整行，正在写入的半行留到下次读取。
+
+        Args:
+            consumer: 消费者名称
+            max_items: 最多读取的条数
+            offset: 起始位点，为空时使用已提交的位点
+
+        Returns:
+            (数据列表, 读完后的新位点)，处理完成后用新位点调用commit
+        """
+        items = []
+        seq, position = offset or self.get_offset(consumer)
+        seqs = self.segments()
+        if seqs and seq < seqs[0]:
+            # 位点所在分段已被清理
+            seq, position = seqs[0], 0
+
+        while len(items) < max_items:
+            path = self._path(seq)
+            # 先确认下一个分段是否存在：下一个分段已创建说明当前分段不会再被追加
+            has_next = any(s > seq for s in self.segments())
+            if os.path.exists(path):
+                with open(path, 'rb') as f:
+                    f.seek(position)
+                    while len(items) < max_items:
+                        line = f.readline()
+                        if not line or not line.endswith(b'\n'):
+                            break
+                        position += len(line)
+                        try:
+                            items.append(json.loads(line))
+                        except ValueError as e:
+                            logger.error(f"爬虫日志 {_segment_name(seq)} 偏移 {position - len(line)} 处数据损坏，已跳过: {e}")
+            if len(items) >= max_items or not has_next:
+                break
+            seq = min(s for s in self.segments() if s > seq)
+            position = 0
+        return items, (seq, position)
+
+    def iter_pending(self, consumer: str, batch_size: int = 1000) -> Iterator[Dict[str, Any]]:
+        """遍历消费者尚未提交的数据，不会提交位点"""
+        offset = None
+        while True:
+            items, offset = self.read(consumer, batch_size, offset)
+            if not items:
+                return
+            yield from items
+
+    def has_pending(self, consumer: str) -> bool:
+        """消费者是否还有未读取的数据"""
+        items, _ = self.read(consumer, 1)
+        return bool(items)
+
+    def compact(self) -> int:
+        """删除所有消费者都已读完的旧分段，当前写入的分段始终保留
+
+        Returns:
+            删除的分段数
+        """
+        with self._lock:
+            offsets = self.load_offsets()
+            seqs = self.segments()
+            if not offsets or len(seqs) <= 1:
+                return 0
+            min_seq = min(int(offset[0]) for offset in offsets.values())
+            removed = 0
+            for seq in seqs[:-1]:
+                if seq >= min_seq:
+                    break
+                try:
+                    os.remove(self._path(seq))
+                    removed += 1
+                except OSError as e:
+                    logger.error(f"删除爬虫日志分段失败: {_segment_name(seq)}, 错误: {e}")
+            if removed:
+                logger.info(f"爬虫日志已清理 {removed} 个已消费分段")
+            return removed
+
+    def stats(self) -> Dict[str, Any]:
+        """分段数量、总大小和各消费者位点"""
+        seqs = self.segments()
+        return {
+            'segments': len(seqs),
+            'bytes': sum(os.path.getsize(self._path(seq)) for seq in seqs if os.path.exists(self._path(seq))),
+            'active_segment': seqs[-1] if seqs else None,
+            'offsets': self.load_offsets(),
+        }
+
+
+# 进程内共享实例
+_log: Optional[CrawlLog] = None
+_log_lock = threading.Lock()
+
+
+def get_crawl_log() -> CrawlLog:
+    """获取进程内共享的爬虫日志"""
+    global _log
+    with _log_lock:
+        if _log is None:
+            _log = CrawlLog()
+        return _log
+
+
+def pump_to_queue(queue=None, batch_size: int = 1000, max_items: int = None) -> int:
+    """把爬虫日志中的新数据转入工作队列，入队后再提交位点并清理已消费分段
+
+    Args:
+        queue: 工作队列，为空时使用共享队列
+        batch_size: 每批读取的条数
+        max_items: 本次最多转入的条数，为空时读到日志末尾
+
+    Returns:
+        读取的条数
+    """
+    from src.db.work_queue import get_work_queue
+    queue = queue or get_work_queue()
+    crawl_log = get_crawl_log()
+    total = 0
+    while max_items is None or total < max_items:
+        limit = batch_size if max_items is None else min(batch_size, max_items - total)
+        items, offset = crawl_log.read(QUEUE_CONSUMER, limit)
+        if items:
+            queue.enqueue(items)
+            total += len(items)
+        crawl_log.commit(QUEUE_CONSUMER, offset)
+        if len(items) < limit:
+            break
+    crawl_log.compact()
+    if total:
+        logger.info(f"已从爬虫日志转入工作队列 {total} 条数据")
+    return total
+
+
+if __name__ == "__main__":
+    print(get_crawl_log().stats())
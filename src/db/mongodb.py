@@ -4,21 +4,120 @@ MongoDB数据库模块
 
 import os
 import logging
-import certifi
 import json
-from typing import List, Dict, Any, Optional, Tuple, Union
-from pymongo import MongoClient, ASCENDING, DESCENDING
+import heapq
+import itertools
+from typing import List, Dict, Any, Optional, Tuple, Union, Set, Iterator
+from pymongo import ASCENDING, DESCENDING, UpdateOne, ReplaceOne
 from pymongo.collection import Collection
 from pymongo.database import Database
-from pymongo.errors import DuplicateKeyError, ConnectionFailure
+from pymongo.errors import ConnectionFailure, BulkWriteError
 from bson import ObjectId, json_util
+import bson
+import time
 import datetime
 
+from src.db.connection import get_client, run_once, get_pool_stats
+from src.db.profiler import track
+from src.db.backend import StorageBackend, WRITE_INSERTED, WRITE_MATCHED, WRITE_FAILED
+
 # 设置日志记录
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("mongodb")
 
-class MongoDB:
+# 批量写入时每个请求的最大文档数和最大字节数
+BULK_WRITE_BATCH_SIZE = int(os.getenv('MONGODB_BULK_BATCH_SIZE', '500'))
+BULK_WRITE_MAX_BYTES = int(os.getenv('MONGODB_BULK_MAX_BYTES', str(8 * 1024 * 1024)))
+
+# MongoDB重复键错误码
+DUPLICATE_KEY_ERROR = 11000
+
+# 冷热分层：归档集合、分层元数据集合，以及归档分界时间的缓存秒数
+ARCHIVE_COLLECTION_SUFFIX = '_archive'
+TIER_META_COLLECTION = 'tiering_meta'
+TIER_CUTOFF_TTL = int(os.getenv('TIER_CUTOFF_TTL', '60'))
+ARCHIVE_BATCH_SIZE = int(os.getenv('ARCHIVE_BATCH_SIZE', '500'))
+
+# 有原始内容但尚未清洗的文档，这类文档不参与归档
+UNPROCESSED_QUERY = {
+    "original_text": {"$exists": True, "$ne": ""},
+    "$or": [
+        {"processed": {"$exists": False}},
+        {"processed": False},
+        {"content": {"$exists": False}},
+        {"content": ""}
+    ]
+}
+
+# 正则前缀中可以直接作为日期下界的字符
+_DATE_PREFIX_CHARS = set('0123456789-: T')
+
+
+def _date_key(value: Any) -> Optional[str]:
+    """将date_time取值转换为可比较的字符串"""
+    if isinstance(value, datetime.datetime):
+        return value.strftime('%Y-%m-%d %H:%M:%S')
+    if isinstance(value, str):
+        return value
+    return None
+
+
+def _sort_key(sort: List[Tuple[str, int]]):
+    """跨集合归并排序结果时使用的键，空值与MongoDB一样排在最前（升序时）"""
+    def key(doc: Dict[str, Any]) -> tuple:
+        values = []
+        for field, _ in sort:
+            value = doc.get(field)
+            if field == 'date_time':
+                value = _date_key(value)
+            values.append((0, '') if value is None else (1, value))
+        return tuple(values)
+    return key
+
+
+def _condition_lower_bound(condition: Any) -> Optional[str]:
+    """单个date_time条件允许的最早取值"""
+    if not isinstance(condition, dict):
+        return _date_key(condition)
+    bounds = []
+    for op, value in condition.items():
+        if op in ('$gt', '$gte', '$eq'):
+            bounds.append(_date_key(value))
+        elif op == '$in' and value:
+            keys = [_date_key(v) for v in value]
+            bounds.append(min(keys) if None not in keys else None)
+        elif op == '$regex' and isinstance(value, str) and value.startswith('^'):
+            prefix = ''
+            for char in value[1:]:
+                if char not in _DATE_PREFIX_CHARS:
+                    break
+                prefix += char
+            bounds.append(prefix or None)
+    bounds = [b for b in bounds if b is not None]
+    return max(bounds) if bounds else None
+
+
+def _date_lower_bound(query: Optional[Dict[str, Any]]) -> Optional[str]:
+    """估算查询条件允许的最早date_time，没有下界时返回None
+    
+    $or 取各分支下界的最小值（任一分支无下界则整体无下界），其余条件取最大值。
+    """
+    bounds = []
+    for key, value in (query or {}).items():
+        if key == '$or':
+            branches = [_date_lower_bound(sub_query) for sub_query in value]
+            if branches and None not in branches:
+                bounds.append(min(branches))
+        elif key == '$and':
+            bounds.extend(b for b in (_date_lower_bound(sub_query) for sub_query in value) if b is not None)
+        elif key == 'date_time':
+            bound = _condition_lower_bound(value)
+            if bound is not None:
+                bounds.append(bound)
+    return max(bounds) if bounds else None
+
+
+class MongoDB(StorageBackend):
     """MongoDB数据库管理类"""
     
     def __init__(self):
@@ -28,20 +127,23 @@ class MongoDB:
         self.db_name = os.getenv('MONGODB_DB', 'liaonews')
         self.collection_name = os.getenv('MONGODB_COLLECTION', 'articles')
         
+        # 归档分界时间缓存 (分界时间, 读取时间)
+        self._cutoff_cache: Tuple[Optional[str], float] = (None, 0.0)
+        
         # 连接MongoDB
         self._connect()
         
-        # 创建索引
-        self._create_indexes()
+        # 创建索引（每个进程对同一集合只执行一次）
+        run_once(('indexes', self.uri, self.db_name, self.collection_name), self._create_indexes)
     
     def _connect(self):
-        """连接到MongoDB数据库"""
+        """从连接注册表获取共享的MongoClient"""
         try:
-            # 使用certifi提供的证书
-            self.client = MongoClient(self.uri, tlsCAFile=certifi.where())
+            self.client = get_client(self.uri)
             self.db = self.client[self.db_name]
             self.collection = self.db[self.collection_name]
-            logger.info("MongoDB连接成功")
+            self.archive_collection = self.db[self.collection_name + ARCHIVE_COLLECTION_SUFFIX]
+            self.meta_collection = self.db[TIER_META_COLLECTION]
         except Exception as e:
             logger.error(f"MongoDB连接失败: {e}")
             raise
@@ -69,6 +171,8 @@ class MongoDB:
             self.collection.create_index([("title", "text"), ("content", "text")])
             # 创建日期索引
             self.collection.create_index([("date_time", DESCENDING)])
+            # 正文哈希索引，清洗前去重使用，旧文章没有该字段
+            self.collection.create_index([("text_hash", ASCENDING)], sparse=True)
             logger.info("MongoDB索引创建成功")
         except Exception as e:
             logger.error(f"创建索引失败: {e}")
@@ -100,6 +204,7 @@ class MongoDB:
         """
         return [self._serialize_doc(doc) for doc in docs]
     
+    @track
     def get_existing_urls(self) -> List[str]:
         """获取所有已存在的URL
         
@@ -114,28 +219,208 @@ class MongoDB:
             logger.error(f"获取现有URL失败: {e}")
             return []
     
-    def insert_articles(self, articles: List[Dict[str, Any]]) -> int:
-        """批量插入文章
+    @track
+    def find_existing_urls(self, urls: List[str]) -> Set[str]:
+        """批量确认哪些URL已存在，一次$in查询
         
         Args:
-            articles: 要插入的文章列表
-            
+            urls: 待确认的URL列表
+        
         Returns:
-            成功插入的文章数量
+            其中已存在于数据库的URL集合
         """
-        if not articles:
-            return 0
+        if not urls:
+            return set()
         
         try:
-            result = self.collection.insert_many(articles)
-            return len(result.inserted_ids)
-        except DuplicateKeyError as e:
-            logger.error(f"插入文档失败: {e}")
-            return 0
+            existing = set()
+            remaining = list(urls)
+            # 先查热数据，剩余的再到归档集合确认
+            collections = [self.collection, self.archive_collection] if self._archive_cutoff() else [self.collection]
+            for collection in collections:
+                documents = collection.find(
+                    {"source_url": {"$in": remaining}},
+                    {"source_url": 1, "_id": 0}
+                )
+                existing.update(doc["source_url"] for doc in documents if "source_url" in doc)
+                remaining = [url for url in remaining if url not in existing]
+                if not remaining:
+                    break
+            return existing
         except Exception as e:
-            logger.error(f"批量插入文档失败: {e}")
-            return 0
+            logger.error(f"批量确认URL失败: {e}")
+            return set()
+    
+    @track
+    def find_existing_text_hashes(self, hashes: List[str]) -> Set[str]:
+        """批量确认哪些正文哈希已存在，一次$in查询
+        
+        只查热数据集合：重复抓取的内容都是近期的，归档集合不维护text_hash索引。
+        
+        Args:
+            hashes: 待确认的正文哈希列表
+        
+        Returns:
+            其中已存在于数据库的哈希集合
+        """
+        if not hashes:
+            return set()
+        
+        try:
+            documents = self.collection.find(
+                {"text_hash": {"$in": list(hashes)}},
+                {"text_hash": 1, "_id": 0}
+            )
+            return {doc["text_hash"] for doc in documents if "text_hash" in doc}
+        except Exception as e:
+            logger.error(f"批量确认正文哈希失败: {e}")
+            return set()
     
+    @track
+    def add_duplicate_refs(self, source_url: str, refs: List[Dict[str, Any]]) -> bool:
+        """把近似重复数据的引用追加到文章的duplicates字段
+        
+        只更新热数据集合：近似重复的推文都是近期的，归档的文章不再追加引用。
+        
+        Args:
+            source_url: 代表文章的URL
+            refs: 引用列表，每项包含 source_url、author、date_time、similarity
+        
+        Returns:
+            文章是否存在并已更新
+        """
+        if not refs:
+            return True
+        try:
+            result = self.collection.update_one(
+                {"source_url": source_url},
+                {"$addToSet": {"duplicates": {"$each": refs}}}
+            )
+            return result.matched_count > 0
+        except Exception as e:
+            logger.error(f"追加近似重复引用失败: {source_url}, 错误: {e}")
+            return False
+    
+    def iter_urls_after(self, last_id: Optional[str] = None) -> Iterator[Tuple[str, str]]:
+        """按_id升序遍历指定_id之后写入的URL，用于增量同步
+        
+        归档的文档保留原有_id，热数据和归档集合按_id归并后输出。
+        
+        Args:
+            last_id: 上次同步到的文档ID，为空时从头遍历
+        
+        Yields:
+            (source_url, 文档ID) 元组
+        """
+        query = {"_id": {"$gt": ObjectId(last_id)}} if last_id else {}
+        cursors = [
+            collection.find(query, {"source_url": 1}).sort([("_id", ASCENDING)])
+            for collection in (self.collection, self.archive_collection)
+        ]
+        for doc in heapq.merge(*cursors, key=lambda d: d["_id"]):
+            if doc.get("source_url"):
+                yield doc["source_url"], str(doc["_id"])
+    
+    def iter_articles_after(self, last_id: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        """按_id升序遍历指定_id之后写入的完整文章，用于增量导出
+        
+        Args:
+            last_id: 上次导出到的文档ID，为空时从头遍历
+        
+        Yields:
+            文章字典，_id转换为字符串
+        """
+        query = {"_id": {"$gt": ObjectId(last_id)}} if last_id else {}
+        cursors = [
+            collection.find(query).sort([("_id", ASCENDING)])
+            for collection in (self.collection, self.archive_collection)
+        ]
+        for doc in heapq.merge(*cursors, key=lambda d: d["_id"]):
+            doc["_id"] = str(doc["_id"])
+            yield doc
+    
+    @track
+    def bulk_upsert_articles(self, articles: List[Dict[str, Any]]) -> List[str]:
+        """按source_url无序批量upsert文章，返回每篇文章的写入状态
+        
+        使用$setOnInsert，已存在的文章保持不变；单条重复或失败不会影响同批次的其他文章。
+        
+        Args:
+            articles: 要写入的文章列表
+            
+        Returns:
+            与输入顺序一致的状态列表，取值为 inserted / matched / failed
+        """
+        statuses = [WRITE_FAILED] * len(articles)
+        for chunk in self._chunk_for_bulk_write(articles):
+            operations = []
+            positions = []
+            for position in chunk:
+                article = articles[position]
+                url = article.get('source_url')
+                if not url:
+                    logger.warning("文章缺少source_url字段，跳过写入")
+                    continue
+                document = {k: v for k, v in article.items() if k not in ('_id', 'source_url')}
+                operations.append(UpdateOne({'source_url': url}, {'$setOnInsert': document}, upsert=True))
+                positions.append(position)
+            
+            if not operations:
+                continue
+            
+            upserted = set()
+            errors = {}
+            try:
+                result = self.collection.bulk_write(operations, ordered=False)
+                upserted = set(result.upserted_ids.keys())
+            except BulkWriteError as e:
+                details = e.details or {}
+                upserted = {item['index'] for item in details.get('upserted', [])}
+                errors = {item['index']: item for item in details.get('writeErrors', [])}
+            except Exception as e:
+                logger.error(f"批量写入文档失败: {e}")
+                continue
+            
+            for index, position in enumerate(positions):
+                if index in upserted:
+                    statuses[position] = WRITE_INSERTED
+                elif index in errors:
+                    # 并发upsert同一source_url时会触发重复键错误，此时文档已存在
+                    if errors[index].get('code') == DUPLICATE_KEY_ERROR:
+                        statuses[position] = WRITE_MATCHED
+                    else:
+                        logger.error(f"写入文档失败: {articles[position].get('source_url')}, 错误: {errors[index].get('errmsg')}")
+                else:
+                    statuses[position] = WRITE_MATCHED
+        
+        return statuses
+    
+    def _chunk_for_bulk_write(self, articles: List[Dict[str, Any]]) -> Iterator[List[int]]:
+        """按文档数和估算字节数将文章切分成批次
+        
+        Args:
+            articles: 文章列表
+            
+        Yields:
+            每批文章在原列表中的下标
+        """
+        chunk = []
+        chunk_bytes = 0
+        for position, article in enumerate(articles):
+            try:
+                size = len(bson.encode(article))
+            except Exception:
+                size = len(str(article).encode('utf-8'))
+            if chunk and (len(chunk) >= BULK_WRITE_BATCH_SIZE or chunk_bytes + size > BULK_WRITE_MAX_BYTES):
+                yield chunk
+                chunk = []
+                chunk_bytes = 0
+            chunk.append(position)
+            chunk_bytes += size
+        if chunk:
+            yield chunk
+    
+    @track
     def find_by_url(self, url: str) -> Optional[Dict[str, Any]]:
         """根据URL查找文章
         
@@ -147,11 +432,14 @@ class MongoDB:
         """
         try:
             doc = self.collection.find_one({"source_url": url})
+            if doc is None and self._archive_cutoff():
+                doc = self.archive_collection.find_one({"source_url": url})
             return self._serialize_doc(doc)
         except Exception as e:
             logger.error(f"查询文档失败: {e}")
             return None
     
+    @track
     def get_articles(self, query: Dict[str, Any] = None, skip: int = 0, limit: int = 10, sort: List[Tuple[str, int]] = None) -> List[Dict[str, Any]]:
         """获取文章列表，支持分页和排序
         
@@ -165,15 +453,12 @@ class MongoDB:
             文章列表
         """
         try:
-            cursor = self.collection.find(query or {})
-            if sort:
-                cursor = cursor.sort(sort)
-            cursor = cursor.skip(skip).limit(limit)
-            return self._serialize_docs(list(cursor))
+            return self._serialize_docs(self._find_tiered(query or {}, skip, limit, sort))
         except Exception as e:
             logger.error(f"获取文章列表失败: {e}")
             return []
     
+    @track
     def get_article_by_id(self, article_id: str) -> Optional[Dict[str, Any]]:
         """根据ID获取文章
         
@@ -185,11 +470,14 @@ class MongoDB:
         """
         try:
             doc = self.collection.find_one({"_id": ObjectId(article_id)})
+            if doc is None and self._archive_cutoff():
+                doc = self.archive_collection.find_one({"_id": ObjectId(article_id)})
             return self._serialize_doc(doc)
         except Exception as e:
             logger.error(f"根据ID获取文章失败: {e}")
             return None
     
+    @track
     def search_articles(self, query_term: str = None, query: str = None, query_filter: Dict[str, Any] = None, search_criteria: Dict[str, Any] = None, skip: int = 0, limit: int = 50, page: int = 1, per_page: int = 50) -> Union[List[Dict[str, Any]], Tuple[List[Dict[str, Any]], int]]:
         """搜索文章 - 支持多种参数形式以保持兼容性
         
@@ -224,36 +512,36 @@ class MongoDB:
             
             # 增强搜索功能，支持多字段搜索和部分匹配
             if search_term:
-                text_search_query = {
-                    "$or": [
-                        # 全文搜索
-                        {"$text": {"$search": search_term}},
-                        # 标题部分匹配
-                        {"title": {"$regex": search_term, "$options": "i"}},
-                        # 内容部分匹配
-                        {"content": {"$regex": search_term, "$options": "i"}},
-                        # 作者部分匹配
-                        {"author": {"$regex": search_term, "$options": "i"}}
-                    ]
-                }
+                regex_clauses = [
+                    # 标题部分匹配
+                    {"title": {"$regex": search_term, "$options": "i"}},
+                    # 内容部分匹配
+                    {"content": {"$regex": search_term, "$options": "i"}},
+                    # 作者部分匹配
+                    {"author": {"$regex": search_term, "$options": "i"}}
+                ]
+                # 全文搜索
+                text_search_query = {"$or": [{"$text": {"$search": search_term}}] + regex_clauses}
                 
                 # 合并附加搜索条件和文本搜索条件
                 final_query = {**text_search_query, **filter_criteria}
+                # 归档集合没有全文索引，只做部分匹配
+                archive_query = {"$or": regex_clauses, **filter_criteria}
             else:
                 # 如果没有搜索词，仅使用过滤条件
                 final_query = filter_criteria
+                archive_query = filter_criteria
             
             # 计算总匹配数量
             total_matches = self.collection.count_documents(final_query)
+            if self._needs_archive(final_query):
+                total_matches += self.archive_collection.count_documents(archive_query)
             
-            # 按日期倒序排序
-            cursor = self.collection.find(final_query).sort([("date_time", -1)])
-            
-            # 应用分页
-            cursor = cursor.skip(actual_skip).limit(actual_limit)
+            # 按日期倒序排序并分页，查询范围早于归档分界时间时归并两层的结果
+            docs = self._find_tiered(final_query, actual_skip, actual_limit, [("date_time", -1)], archive_query)
             
             # 获取并序列化结果
-            results = self._serialize_docs(list(cursor))
+            results = self._serialize_docs(docs)
             logger.info(f"搜索关键词 '{search_term}' 找到 {total_matches} 个结果，返回 {len(results)} 个")
             
             # 返回元组 (结果列表, 总匹配数)
@@ -262,6 +550,7 @@ class MongoDB:
             logger.error(f"搜索文档失败: {e}")
             return [], 0
     
+    @track
     def get_article_count(self, query: Dict[str, Any] = None) -> int:
         """获取文章总数
         
@@ -272,55 +561,211 @@ class MongoDB:
             文章总数
         """
         try:
-            return self.collection.count_documents(query or {})
+            count = self.collection.count_documents(query or {})
+            if self._needs_archive(query):
+                count += self.archive_collection.count_documents(query or {})
+            return count
         except Exception as e:
             logger.error(f"获取文章总数失败: {e}")
             return 0
     
-    def get_stats(self) -> Dict[str, Any]:
-        """获取数据库统计信息
+    def _archive_cutoff(self) -> Optional[str]:
+        """获取归档分界时间，早于该时间的文章位于归档集合
         
         Returns:
-            包含统计信息的字典
+            分界时间字符串，从未归档过时返回None
         """
+        cutoff, loaded_at = self._cutoff_cache
+        if time.monotonic() - loaded_at < TIER_CUTOFF_TTL:
+            return cutoff
         try:
-            # 获取总文章数
-            total_articles = self.get_article_count()
-            
-            # 获取各数据源的文章数
-            sources = {}
-            for source in ['x.com', 'crunchbase']:
-                count = self.get_article_count({'source': source})
-                sources[source] = count
-                
-            # 获取最新更新时间
-            latest_article = self.get_articles(limit=1, sort=[('date_time', -1)])
-            last_update = latest_article[0]['date_time'] if latest_article else None
-            
-            return {
-                'total_articles': total_articles,
-                'sources': sources,
-                'last_update': last_update
-            }
+            meta = self.meta_collection.find_one({"_id": self.collection_name})
+            cutoff = meta.get("cutoff") if meta else None
         except Exception as e:
-            logger.error(f"获取统计信息失败: {e}")
-            return {
-                'error': str(e)
-            }
+            logger.error(f"读取归档分界时间失败: {e}")
+        self._cutoff_cache = (cutoff, time.monotonic())
+        return cutoff
     
-    def close(self):
-        """关闭MongoDB连接"""
+    def _needs_archive(self, query: Optional[Dict[str, Any]]) -> bool:
+        """判断查询的日期范围是否可能包含已归档的文章"""
+        cutoff = self._archive_cutoff()
+        if not cutoff:
+            return False
+        lower_bound = _date_lower_bound(query)
+        return lower_bound is None or lower_bound < cutoff
+    
+    def _find_tiered(self, query: Dict[str, Any], skip: int, limit: int, sort: List[Tuple[str, int]] = None, archive_query: Dict[str, Any] = None) -> List[Dict[str, Any]]:
+        """查询热数据和归档集合，跨集合分页
+        
+        未清洗的旧文章不参与归档，热数据中也可能有早于分界时间的文章，两层的日期范围会重叠，
+        因此有排序条件时两层各取前 skip+limit 篇，按排序键归并后再分页。
+        没有排序条件时依次读取，热数据已满足分页时不会访问归档集合。
+        
+        Args:
+            query: 查询条件
+            skip: 跳过的文档数
+            limit: 返回的文档数，0表示不限制
+            sort: 排序条件列表
+            archive_query: 归档集合使用的查询条件，为空时与query相同
+            
+        Returns:
+            原始文档列表
+        """
+        tiers = [(self.collection, query)]
+        if self._needs_archive(query):
+            tiers.append((self.archive_collection, query if archive_query is None else archive_query))
+        
+        if sort and len(tiers) > 1:
+            window = skip + limit if limit else 0
+            cursors = [collection.find(tier_query).sort(sort).limit(window) for collection, tier_query in tiers]
+            directions = {direction for _, direction in sort}
+            if len(directions) == 1:
+                merged = heapq.merge(*cursors, key=_sort_key(sort), reverse=directions.pop() < 0)
+            else:
+                # 各字段方向不同时无法直接归并，按字段从后往前稳定排序
+                merged = [doc for cursor in cursors for doc in cursor]
+                for field, direction in reversed(sort):
+                    merged.sort(key=_sort_key([(field, direction)]), reverse=direction < 0)
+            return list(itertools.islice(merged, skip, window or None))
+        
+        docs = []
+        for index, (collection, tier_query) in enumerate(tiers):
+            cursor = collection.find(tier_query)
+            if sort:
+                cursor = cursor.sort(sort)
+            batch = list(cursor.skip(skip).limit(limit - len(docs) if limit else 0))
+            docs.extend(batch)
+            if (limit and len(docs) >= limit) or index == len(tiers) - 1:
+                break
+            # 本层未取满，下一层的skip扣除本层的匹配总数
+            if skip:
+                matched = skip + len(batch) if batch else collection.count_documents(tier_query)
+                skip = max(0, skip - matched)
+        return docs
+    
+    def _create_archive_collection(self):
+        """创建使用zstd块压缩的归档集合，只保留去重和日期查询需要的索引"""
         try:
-            if hasattr(self, 'client'):
-                self.client.close()
-                logger.info("MongoDB连接已关闭")
+            if self.archive_collection.name not in self.db.list_collection_names():
+                self.db.create_collection(
+                    self.archive_collection.name,
+                    storageEngine={"wiredTiger": {"configString": "block_compressor=zstd"}}
+                )
+                logger.info(f"已创建zstd压缩的归档集合: {self.archive_collection.name}")
         except Exception as e:
-            logger.error(f"关闭MongoDB连接失败: {e}")
+            logger.warning(f"创建zstd压缩的归档集合失败，使用默认配置: {e}")
+        self.archive_collection.create_index([("source_url", ASCENDING)], unique=True)
+        self.archive_collection.create_index([("date_time", DESCENDING)])
+    
+    @track
+    def archive_articles(self, cutoff: str, batch_size: int = ARCHIVE_BATCH_SIZE) -> int:
+        """将date_time早于分界时间的文章移动到归档集合
+        
+        先发布新的分界时间再移动文档，保证读取方在文档离开热数据之前就会查询归档集合；
+        分界时间前移时会等待 TIER_CUTOFF_TTL 秒，定时任务在独立线程中调用（见 scheduler_loop.run_archiver）。
+        尚未清洗的文档保留在热数据中。
+        
+        Args:
+            cutoff: 分界时间，格式为 %Y-%m-%d %H:%M:%S
+            batch_size: 每批移动的文档数
+            
+        Returns:
+            移动的文档数量
+        """
+        run_once(('archive_indexes', self.uri, self.db_name, self.archive_collection.name), self._create_archive_collection)
+        
+        previous = self._archive_cutoff()
+        self.meta_collection.update_one(
+            {"_id": self.collection_name},
+            {"$max": {"cutoff": cutoff}, "$set": {"updated_at": datetime.datetime.now()}},
+            upsert=True
+        )
+        self._cutoff_cache = (None, 0.0)
+        if previous is None or cutoff > previous:
+            # 等待其他进程的分界时间缓存过期
+            logger.info(f"归档分界时间更新为 {cutoff}，等待 {TIER_CUTOFF_TTL} 秒后开始移动")
+            time.sleep(TIER_CUTOFF_TTL)
+        
+        cutoff_dt = datetime.datetime.strptime(cutoff, '%Y-%m-%d %H:%M:%S')
+        query = {
+            "$and": [
+                {"$or": [{"date_time": {"$lt": cutoff}}, {"date_time": {"$lt": cutoff_dt}}]},
+                {"$nor": [UNPROCESSED_QUERY]}
+            ]
+        }
+        
+        moved = 0
+        failed_ids = set()
+        while True:
+            batch_query = {**query, "_id": {"$nin": list(failed_ids)}} if failed_ids else query
+            docs = list(self.collection.find(batch_query).sort([("_id", ASCENDING)]).limit(batch_size))
+            if not docs:
+                break
+            
+            errors = {}
+            try:
+                self.archive_collection.bulk_write(
+                    [ReplaceOne({"_id": doc["_id"]}, doc, upsert=True) for doc in docs],
+                    ordered=False
+                )
+            except BulkWriteError as e:
+                errors = {item['index']: item for item in (e.details or {}).get('writeErrors', [])}
+            
+            archived_ids = []
+            for index, doc in enumerate(docs):
+                error = errors.get(index)
+                # 重复键说明归档集合中已有同一source_url的文章
+                if error is None or error.get('code') == DUPLICATE_KEY_ERROR:
+                    archived_ids.append(doc["_id"])
+                else:
+                    logger.error(f"归档文档失败: {doc.get('source_url')}, 错误: {error.get('errmsg')}")
+                    failed_ids.add(doc["_id"])
+            
+            if archived_ids:
+                self.collection.delete_many({"_id": {"$in": archived_ids}})
+                moved += len(archived_ids)
+        
+        logger.info(f"归档完成: 移动 {moved} 篇文章，失败 {len(failed_ids)} 篇，分界时间 {cutoff}")
+        return moved
+    
+    def get_tier_stats(self) -> Dict[str, Any]:
+        """获取热数据和归档集合的文档数与存储大小
+        
+        Returns:
+            分层统计字典
+        """
+        stats = {'cutoff': self._archive_cutoff()}
+        for tier, collection in (('hot', self.collection), ('archive', self.archive_collection)):
+            try:
+                coll_stats = self.db.command('collStats', collection.name)
+                stats[tier] = {
+                    'count': coll_stats.get('count', 0),
+                    'storage_bytes': coll_stats.get('storageSize', 0),
+                    'index_bytes': coll_stats.get('totalIndexSize', 0),
+                }
+            except Exception as e:
+                logger.error(f"获取集合统计失败: {collection.name}, 错误: {e}")
+                stats[tier] = {}
+        return stats
+    
+    def get_pool_stats(self) -> Dict[str, Any]:
+        """获取共享连接池的指标
+        
+        Returns:
+            连接池指标字典
+        """
+        return get_pool_stats()
     
-    def __del__(self):
-        """析构函数，确保连接被关闭"""
-        self.close()
+    def close(self):
+        """释放对共享连接的引用
+        
+        客户端由连接注册表在进程退出时统一关闭，这里不关闭共享连接，
+        以免影响同一进程内的其他组件。
+        """
+        if hasattr(self, 'client'):
+            self.client = None
     
+    @track
     def get_unprocessed_data(self) -> List[Dict[str, Any]]:
         """获取未处理的数据
         
@@ -329,21 +774,13 @@ class MongoDB:
         """
         try:
             # 查询条件：有原始内容但没有清洗后的内容
-            query = {
-                "original_text": {"$exists": True, "$ne": ""},
-                "$or": [
-                    {"processed": {"$exists": False}},
-                    {"processed": False},
-                    {"content": {"$exists": False}},
-                    {"content": ""}
-                ]
-            }
-            cursor = self.collection.find(query).limit(20)  # 限制每次处理的数量
+            cursor = self.collection.find(UNPROCESSED_QUERY).limit(20)  # 限制每次处理的数量
             return self._serialize_docs(list(cursor))
         except Exception as e:
             logger.error(f"获取未处理数据失败: {e}")
             return []
     
+    @track
     def update_processed_data(self, doc_id: str, cleaned_data: Dict[str, Any]) -> bool:
         """更新已处理的数据
         
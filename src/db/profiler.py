@@ -0,0 +1,463 @@
+"""
+MongoDB查询分析模块（可选开启）
+
+设置环境变量 MONGODB_PROFILE=1 后，共享MongoClient会注册命令监听器，
+按MongoDB类的方法记录每种查询形状（去掉具体取值后的filter/sort）的次数和耗时。
+生成报告时对每种形状执行一次 explain(executionStats)，给出获胜执行计划、
+扫描文档数与返回文档数，并按 ESR（相等-排序-范围）规则推荐缺失的索引。
+
+命令行用法（针对本地种子数据库）：
+    python -m src.db.profiler --uri mongodb://localhost:27017 --seed 20000
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import datetime
+import functools
+import threading
+from typing import List, Dict, Any, Tuple
+
+from pymongo import monitoring
+
+from src.utils.log_handler import get_logger
+
+# 创建日志记录器
+logger = get_logger("mongodb_profiler")
+
+# 是否开启查询分析
+PROFILE_ENABLED = os.getenv('MONGODB_PROFILE', '').lower() in ('1', 'true', 'yes')
+
+# 记录的命令类型，只有读命令会执行explain
+READ_COMMANDS = ('find', 'aggregate', 'count', 'distinct')
+WRITE_COMMANDS = ('update', 'delete', 'insert')
+
+# explain时保留的命令字段
+_SAMPLE_FIELDS = ('filter', 'sort', 'projection', 'skip', 'limit', 'pipeline', 'cursor', 'query', 'key', 'hint', 'collation')
+
+# 扫描文档数超过返回文档数多少倍视为低效
+INEFFICIENT_RATIO = 10
+INEFFICIENT_MIN_EXAMINED = 100
+
+# 当前线程正在执行的MongoDB方法
+_context = threading.local()
+
+
+def is_enabled() -> bool:
+    """查询分析是否开启"""
+    return PROFILE_ENABLED
+
+
+def enable():
+    """在代码中开启查询分析，需在创建MongoClient之前调用"""
+    global PROFILE_ENABLED
+    PROFILE_ENABLED = True
+
+
+def track(method):
+    """装饰MongoDB方法，使该方法内发出的命令归属到方法名下"""
+    @functools.wraps(method)
+    def wrapper(*args, **kwargs):
+        if not PROFILE_ENABLED:
+            return method(*args, **kwargs)
+        stack = getattr(_context, 'stack', None)
+        if stack is None:
+            stack = _context.stack = []
+        stack.append(method.__name__)
+        try:
+            return method(*args, **kwargs)
+        finally:
+            stack.pop()
+    return wrapper
+
+
+def _current_method() -> str:
+    stack = getattr(_context, 'stack', None)
+    return stack[-1] if stack else 'unknown'
+
+
+def _shape(value: Any) -> Any:
+    """将查询条件中的具体取值替换为类型占位符"""
+    if isinstance(value, dict):
+        return {key: _shape(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        # $or/$and 的分支保留结构，$in 等取值列表合并为一个占位符
+        if value and all(isinstance(item, dict) for item in value):
+            return [_shape(item) for item in value]
+        return '<list>'
+    return f"<{type(value).__name__}>"
+
+
+def _command_filter(command_name: str, command: Dict[str, Any]) -> Dict[str, Any]:
+    """取出命令中的查询条件"""
+    if command_name == 'find':
+        return command.get('filter') or {}
+    if command_name in ('count', 'distinct'):
+        return command.get('query') or {}
+    if command_name == 'aggregate':
+        pipeline = command.get('pipeline') or []
+        if pipeline and '$match' in pipeline[0]:
+            return pipeline[0]['$match']
+    return {}
+
+
+def _command_sort(command_name: str, command: Dict[str, Any]) -> Dict[str, Any]:
+    if command_name == 'find':
+        return dict(command.get('sort') or {})
+    if command_name == 'aggregate':
+        for stage in command.get('pipeline') or []:
+            if '$sort' in stage:
+                return dict(stage['$sort'])
+    return {}
+
+
+class QueryProfiler(monitoring.CommandListener):
+    """命令监听器，按方法和查询形状汇总命令"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending: Dict[Tuple[int, Any], str] = {}
+        self.shapes: Dict[str, Dict[str, Any]] = {}
+
+    def started(self, event):
+        if event.command_name not in READ_COMMANDS + WRITE_COMMANDS:
+            return
+        command = event.command
+        collection = command.get(event.command_name)
+        query_filter = _command_filter(event.command_name, command)
+        sort = _command_sort(event.command_name, command)
+        method = _current_method()
+        shape = json.dumps({'filter': _shape(query_filter), 'sort': sort}, sort_keys=True, default=str)
+        key = f"{method}|{event.database_name}.{collection}|{event.command_name}|{shape}"
+
+        with self._lock:
+            entry = self.shapes.get(key)
+            if entry is None:
+                entry = self.shapes[key] = {
+                    'method': method,
+                    'database': event.database_name,
+                    'collection': collection,
+                    'command': event.command_name,
+                    'shape': shape,
+                    'filter': query_filter,
+                    'sort': sort,
+                    # 第一次出现时的命令，生成报告时用于explain
+                    'sample': {event.command_name: collection, **{k: command[k] for k in _SAMPLE_FIELDS if k in command}},
+                    'calls': 0,
+                    'errors': 0,
+                    'total_ms': 0.0,
+                    'max_ms': 0.0,
+                }
+            entry['calls'] += 1
+            self._pending[(event.request_id, event.connection_id)] = key
+
+    def _finish(self, event, failed: bool):
+        with self._lock:
+            key = self._pending.pop((event.request_id, event.connection_id), None)
+            if key is None:
+                return
+            entry = self.shapes[key]
+            elapsed = event.duration_micros / 1000
+            entry['total_ms'] += elapsed
+            entry['max_ms'] = max(entry['max_ms'], elapsed)
+            if failed:
+                entry['errors'] += 1
+
+    def succeeded(self, event):
+        self._finish(event, failed=False)
+
+    def failed(self, event):
+        self._finish(event, failed=True)
+
+    def reset(self):
+        with self._lock:
+            self.shapes.clear()
+            self._pending.clear()
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [dict(entry) for entry in self.shapes.values()]
+
+
+# 进程内共享的监听器
+_profiler = QueryProfiler()
+
+
+def get_listener() -> QueryProfiler:
+    """获取命令监听器，由连接注册表在创建MongoClient时注册"""
+    return _profiler
+
+
+def _walk(node: Any):
+    """遍历explain结果中的所有字典"""
+    if isinstance(node, dict):
+        yield node
+        for value in node.values():
+            yield from _walk(value)
+    elif isinstance(node, list):
+        for item in node:
+            yield from _walk(item)
+
+
+def _plan_stages(plan: Dict[str, Any]) -> List[str]:
+    """获胜执行计划中的所有阶段名"""
+    stages = []
+    for node in _walk(plan):
+        stage = node.get('stage')
+        if isinstance(stage, str):
+            name = stage
+            if stage == 'IXSCAN' and node.get('indexName'):
+                name = f"IXSCAN({node['indexName']})"
+            stages.append(name)
+    return stages
+
+
+def parse_explain(explain: Dict[str, Any]) -> Dict[str, Any]:
+    """从explain结果中提取获胜计划和执行统计"""
+    winning_plan = next((node['winningPlan'] for node in _walk(explain) if 'winningPlan' in node), {})
+    stats = next((node for node in _walk(explain) if 'totalDocsExamined' in node), {})
+    stages = _plan_stages(winning_plan)
+    docs_examined = stats.get('totalDocsExamined', 0)
+    returned = stats.get('nReturned', 0)
+    problems = []
+    if 'COLLSCAN' in stages:
+        problems.append('COLLSCAN')
+    if 'SORT' in stages:
+        problems.append('内存排序')
+    if docs_examined >= INEFFICIENT_MIN_EXAMINED and docs_examined > INEFFICIENT_RATIO * max(returned, 1):
+        problems.append(f"扫描/返回={docs_examined}/{returned}")
+    return {
+        'plan': ' <- '.join(stages) or 'unknown',
+        'docs_examined': docs_examined,
+        'keys_examined': stats.get('totalKeysExamined', 0),
+        'returned': returned,
+        'execution_ms': stats.get('executionTimeMillis', 0),
+        'problems': problems,
+    }
+
+
+def _field_kind(condition: Any) -> str:
+    """判断字段条件属于相等（E）还是范围（R）"""
+    if not isinstance(condition, dict) or not any(key.startswith('$') for key in condition):
+        return 'E'
+    if set(condition) == {'$eq'}:
+        return 'E'
+    if set(condition) == {'$in'} and len(condition['$in']) == 1:
+        return 'E'
+    return 'R'
+
+
+def recommend_indexes(query_filter: Dict[str, Any], sort: Dict[str, Any]) -> List[List[Tuple[str, int]]]:
+    """按ESR规则为查询推荐复合索引
+
+    Args:
+        query_filter: 查询条件
+        sort: 排序条件
+
+    Returns:
+        推荐的索引键列表，$or 查询每个分支各推荐一个
+    """
+    if '$or' in query_filter:
+        rest = {key: value for key, value in query_filter.items() if key != '$or'}
+        recommendations = []
+        for branch in query_filter['$or']:
+            if '$text' in branch:
+                continue
+            for keys in recommend_indexes({**rest, **branch}, sort):
+                if keys not in recommendations:
+                    recommendations.append(keys)
+        return recommendations
+
+    equality, ranges = [], []
+    for field, condition in query_filter.items():
+        if field.startswith('$'):
+            continue
+        (equality if _field_kind(condition) == 'E' else ranges).append(field)
+
+    keys = [(field, 1) for field in equality]
+    keys += [(field, int(direction)) for field, direction in sort.items() if field not in equality]
+    keys += [(field, 1) for field in ranges if field not in sort]
+    if not keys or keys == [('_id', 1)]:
+        return []
+    return [keys]
+
+
+def _is_covered(keys: List[Tuple[str, int]], existing: List[List[Tuple[str, int]]]) -> bool:
+    """推荐索引的字段是否已是某个现有索引的前缀"""
+    fields = [field for field, _ in keys]
+    return any([field for field, _ in index[:len(fields)]] == fields for index in existing)
+
+
+def report(db, run_explain: bool = True) -> List[Dict[str, Any]]:
+    """生成查询分析报告
+
+    Args:
+        db: MongoDB实例，用于执行explain和读取现有索引
+        run_explain: 是否对读命令执行explain
+
+    Returns:
+        按总耗时倒序的查询形状列表
+    """
+    existing_indexes: Dict[str, List[List[Tuple[str, int]]]] = {}
+    rows = []
+    for entry in sorted(get_listener().snapshot(), key=lambda e: e['total_ms'], reverse=True):
+        row = {
+            'method': entry['method'],
+            'collection': entry['collection'],
+            'command': entry['command'],
+            'shape': entry['shape'],
+            'calls': entry['calls'],
+            'errors': entry['errors'],
+            'avg_ms': round(entry['total_ms'] / entry['calls'], 2) if entry['calls'] else 0,
+            'max_ms': round(entry['max_ms'], 2),
+            'recommendations': [],
+        }
+        if run_explain and entry['command'] in READ_COMMANDS:
+            database = db.client[entry['database']]
+            try:
+                explain = database.command({'explain': entry['sample'], 'verbosity': 'executionStats'})
+                row.update(parse_explain(explain))
+            except Exception as e:
+                row['explain_error'] = str(e)
+
+            if row.get('problems'):
+                collection = entry['collection']
+                if collection not in existing_indexes:
+                    try:
+                        info = database[collection].index_information()
+                        existing_indexes[collection] = [list(index['key']) for index in info.values()]
+                    except Exception:
+                        existing_indexes[collection] = []
+                for keys in recommend_indexes(entry['filter'], entry['sort']):
+                    if not _is_covered(keys, existing_indexes[collection]):
+                        spec = ', '.join(f'"{field}": {direction}' for field, direction in keys)
+                        row['recommendations'].append(f"db.{collection}.createIndex({{{spec}}})")
+        rows.append(row)
+    return rows
+
+
+def format_report(rows: List[Dict[str, Any]]) -> str:
+    """将报告格式化为文本"""
+    lines = [f"共 {len(rows)} 种查询形状（按总耗时排序）", ""]
+    recommendations = []
+    for index, row in enumerate(rows, 1):
+        lines.append(f"{index}. {row['method']} -> {row['collection']}.{row['command']}  调用 {row['calls']} 次, 平均 {row['avg_ms']} ms, 最大 {row['max_ms']} ms")
+        lines.append(f"   形状: {row['shape']}")
+        if 'plan' in row:
+            lines.append(f"   计划: {row['plan']}")
+            lines.append(f"   扫描文档 {row['docs_examined']}, 扫描索引键 {row['keys_examined']}, 返回 {row['returned']}")
+            if row['problems']:
+                lines.append(f"   问题: {', '.join(row['problems'])}")
+        if row.get('explain_error'):
+            lines.append(f"   explain失败: {row['explain_error']}")
+        for recommendation in row['recommendations']:
+            lines.append(f"   建议: {recommendation}")
+            if recommendation not in recommendations:
+                recommendations.append(recommendation)
+        lines.append("")
+    lines.append("索引建议汇总:" if recommendations else "未发现需要新增的索引")
+    lines.extend(f"  {recommendation}" for recommendation in recommendations)
+    return '\n'.join(lines)
+
+
+def seed(db, count: int):
+    """向测试数据库写入模拟文章
+
+    Args:
+        db: MongoDB实例
+        count: 文章数量
+    """
+    now = datetime.datetime.now()
+    authors = [f"author_{i}" for i in range(200)]
+    words = ['AI', 'LLM', 'OpenAI', '融资', '模型', 'GPU', 'agent', '开源', '推理', '芯片']
+    articles = []
+    for i in range(count):
+        source = 'x.com' if i % 3 else 'crunchbase.com'
+        article = {
+            'source_url': f"https://example.com/{source}/{i}",
+            'source': source,
+            'date_time': (now - datetime.timedelta(minutes=random.randint(0, 60 * 24 * 90))).strftime('%Y-%m-%d %H:%M:%S'),
+            'title': ' '.join(random.sample(words, 3)),
+            'content': ' '.join(random.choices(words, k=60)),
+            'author': random.choice(authors),
+            'likes': random.randint(0, 5000),
+        }
+        # 少量待清洗的原始数据
+        if i % 50 == 0:
+            article['original_text'] = article.pop('content')
+        articles.append(article)
+    for start in range(0, count, 1000):
+        db.bulk_upsert_articles(articles[start:start + 1000])
+
+
+def run_workload(db, rounds: int = 3):
+    """模拟API和清洗器的典型调用"""
+    now = datetime.datetime.now()
+    for _ in range(rounds):
+        for source in ('x.com', 'crunchbase.com'):
+            start = (now - datetime.timedelta(days=random.randint(1, 30))).replace(hour=0, minute=0, second=0)
+            end = start + datetime.timedelta(days=2)
+            # 与 /api/articles 的日期分页查询形状一致
+            query = {
+                'source': source,
+                '$or': [
+                    {'date_time': {'$gte': start.strftime('%Y-%m-%d %H:%M:%S'), '$lte': end.strftime('%Y-%m-%d %H:%M:%S')}},
+                    {'date_time': {'$regex': f"^{start.strftime('%Y-%m-%d')}"}},
+                ]
+            }
+            db.get_article_count(query)
+            db.get_articles(query=query, skip=0, limit=10, sort=[('date_time', -1)])
+            db.get_articles(query={'source': source}, limit=1, sort=[('date_time', 1)])
+        db.search_articles(query_term='OpenAI', page=1, per_page=20)
+        db.search_articles(query_term='融资', query_filter={'source': 'crunchbase.com'})
+        db.get_unprocessed_data()
+        db.find_by_url(f"https://example.com/x.com/{random.randint(0, 1000)}")
+        db.find_existing_urls([f"https://example.com/x.com/{i}" for i in range(50)])
+        db.get_stats()
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="MongoDB查询分析和索引建议")
+    parser.add_argument('--uri', default='mongodb://localhost:27017', help='MongoDB连接URI（请使用本地测试库）')
+    parser.add_argument('--db', default='liaonews_profile', help='数据库名')
+    parser.add_argument('--collection', default='articles', help='集合名')
+    parser.add_argument('--seed', type=int, default=0, help='先写入指定数量的模拟文章')
+    parser.add_argument('--rounds', type=int, default=3, help='模拟调用的轮数')
+    parser.add_argument('--json', action='store_true', help='以JSON格式输出报告')
+    args = parser.parse_args(argv)
+
+    os.environ['MONGODB_URI'] = args.uri
+    os.environ['MONGODB_DB'] = args.db
+    os.environ['MONGODB_COLLECTION'] = args.collection
+    # 以 python -m 运行时本模块是 __main__，connection.py 和 @track 读取的是
+    # src.db.profiler 模块，开关、监听器和报告都要作用在那个模块上
+    import src.db.profiler as profiler
+    profiler.enable()
+
+    from src.db.mongodb import MongoDB
+    db = MongoDB()
+    if not db.check_connection():
+        print(f"无法连接MongoDB: {args.uri}")
+        return 1
+
+    if args.seed:
+        start_time = time.time()
+        seed(db, args.seed)
+        print(f"已写入 {args.seed} 篇模拟文章，耗时 {time.time() - start_time:.1f} 秒")
+
+    # 只分析模拟调用产生的查询
+    profiler.get_listener().reset()
+    run_workload(db, args.rounds)
+    rows = profiler.report(db)
+    if args.json:
+        print(json.dumps(rows, ensure_ascii=False, indent=2, default=str))
+    else:
+        print(format_report(rows))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
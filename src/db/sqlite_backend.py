@@ -0,0 +1,586 @@
+"""
+SQLite存储后端模块
+
+单机部署时替代MongoDB Atlas的嵌入式存储，实现与MongoDB类相同的接口：
+- WAL模式，读写互不阻塞
+- (source, date_time) 覆盖索引支撑按来源分页查询
+- FTS5全文索引支撑搜索
+- 每个线程一个连接
+"""
+
+import os
+import re
+import json
+import sqlite3
+import datetime
+import threading
+import functools
+from typing import List, Dict, Any, Optional, Tuple, Union, Set, Iterator
+
+from src.db.backend import StorageBackend, WRITE_INSERTED, WRITE_MATCHED, WRITE_FAILED
+from src.utils.log_handler import get_logger
+from src.utils.paths import SQLITE_DB_PATH
+
+# 创建日志记录器
+logger = get_logger("sqlite_backend")
+
+# 数据库文件路径
+SQLITE_PATH = os.getenv('SQLITE_DB_PATH', SQLITE_DB_PATH)
+
+# 单独存成列的字段，其余字段从JSON文档中提取
+COLUMN_FIELDS = ('source_url', 'source', 'date_time', 'title', 'content', 'author', 'likes')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS articles (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    source_url TEXT NOT NULL UNIQUE,
+    source TEXT,
+    date_time TEXT,
+    title TEXT,
+    content TEXT,
+    author TEXT,
+    likes INTEGER,
+    doc TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_articles_source_date ON articles (source, date_time, id);
+CREATE INDEX IF NOT EXISTS idx_articles_date ON articles (date_time, id);
+CREATE INDEX IF NOT EXISTS idx_articles_text_hash ON articles (json_extract(doc, '$.text_hash'));
+CREATE VIRTUAL TABLE IF NOT EXISTS articles_fts USING fts5 (
+    title, content, author, content='articles', content_rowid='id'
+);
+CREATE TRIGGER IF NOT EXISTS articles_ai AFTER INSERT ON articles BEGIN
+    INSERT INTO articles_fts (rowid, title, content, author) VALUES (new.id, new.title, new.content, new.author);
+END;
+CREATE TRIGGER IF NOT EXISTS articles_ad AFTER DELETE ON articles BEGIN
+    INSERT INTO articles_fts (articles_fts, rowid, title, content, author) VALUES ('delete', old.id, old.title, old.content, old.author);
+END;
+CREATE TRIGGER IF NOT EXISTS articles_au AFTER UPDATE ON articles BEGIN
+    INSERT INTO articles_fts (articles_fts, rowid, title, content, author) VALUES ('delete', old.id, old.title, old.content, old.author);
+    INSERT INTO articles_fts (rowid, title, content, author) VALUES (new.id, new.title, new.content, new.author);
+END;
+"""
+
+
+@functools.lru_cache(maxsize=256)
+def _compile_regex(pattern: str, flags: int) -> "re.Pattern":
+    return re.compile(pattern, flags)
+
+
+def _regexp(pattern: str, value: Any) -> bool:
+    """REGEXP函数实现，区分大小写"""
+    if value is None:
+        return False
+    return _compile_regex(pattern, 0).search(str(value)) is not None
+
+
+def _regexp_i(pattern: str, value: Any) -> bool:
+    """REGEXP函数实现，不区分大小写"""
+    if value is None:
+        return False
+    return _compile_regex(pattern, re.IGNORECASE).search(str(value)) is not None
+
+
+def _encode_id(row_id: int) -> str:
+    """将自增ID编码为与ObjectId相同长度的十六进制字符串，保持写入顺序可比较"""
+    return f"{row_id:024x}"
+
+
+def _decode_id(doc_id: Any) -> int:
+    return int(str(doc_id), 16)
+
+
+def _to_sql_value(value: Any) -> Any:
+    """将查询中的Python值转换为SQLite可比较的值"""
+    if isinstance(value, bool):
+        return int(value)
+    if isinstance(value, datetime.datetime):
+        return value.strftime('%Y-%m-%d %H:%M:%S')
+    if type(value).__name__ == 'ObjectId':
+        return _decode_id(value)
+    return value
+
+
+def _fts_query(term: str) -> str:
+    """将用户输入转换为FTS5短语查询，避免语法错误"""
+    return '"' + term.replace('"', '""') + '"'
+
+
+class SQLiteDB(StorageBackend):
+    """SQLite数据库管理类"""
+
+    def __init__(self, path: str = None):
+        """初始化SQLite数据库
+
+        Args:
+            path: 数据库文件路径，为空时使用SQLITE_PATH
+        """
+        self.path = path or SQLITE_PATH
+        self._local = threading.local()
+        self._schema_lock = threading.Lock()
+        self._schema_ready = False
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._connection()
+        logger.info(f"SQLite数据库已就绪: {self.path}")
+
+    def _connection(self) -> sqlite3.Connection:
+        """获取当前线程的连接，不存在时创建"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None and getattr(self._local, 'pid', None) == os.getpid():
+            return conn
+
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.create_function("regexp", 2, _regexp, deterministic=True)
+        conn.create_function("regexp_i", 2, _regexp_i, deterministic=True)
+        with self._schema_lock:
+            if not self._schema_ready:
+                conn.executescript(SCHEMA)
+                self._schema_ready = True
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+        return conn
+
+    def _field_expr(self, field: str, params: List[Any]) -> str:
+        """字段对应的SQL表达式"""
+        if field == '_id':
+            return 'id'
+        if field in COLUMN_FIELDS:
+            return field
+        params.append(f'$."{field}"')
+        return 'json_extract(doc, ?)'
+
+    def _compile_filter(self, query: Optional[Dict[str, Any]], params: List[Any]) -> str:
+        """将MongoDB风格的查询条件转换为SQL WHERE子句
+
+        支持字段相等、$eq/$ne/$gt/$gte/$lt/$lte/$in/$nin/$exists/$regex，以及$or/$and/$text。
+        """
+        clauses = []
+        for key, value in (query or {}).items():
+            if key in ('$or', '$and'):
+                parts = [self._compile_filter(sub_query, params) for sub_query in value]
+                joiner = ' OR ' if key == '$or' else ' AND '
+                clauses.append('(' + joiner.join(parts or ['0' if key == '$or' else '1']) + ')')
+            elif key == '$text':
+                clauses.append('id IN (SELECT rowid FROM articles_fts WHERE articles_fts MATCH ?)')
+                params.append(_fts_query(value.get('$search', '')))
+            else:
+                clauses.append(self._compile_condition(key, value, params))
+        return ' AND '.join(clauses) if clauses else '1'
+
+    def _compile_condition(self, field: str, condition: Any, params: List[Any]) -> str:
+        """编译单个字段的条件"""
+        if not (isinstance(condition, dict) and condition and all(k.startswith('$') for k in condition)):
+            return self._compile_operator(field, '$eq', condition, params)
+
+        parts = []
+        for op, value in condition.items():
+            if op == '$options':
+                continue
+            if op == '$regex':
+                ignore_case = 'i' in condition.get('$options', '')
+                params.append(value)
+                func = 'regexp_i' if ignore_case else 'regexp'
+                parts.append(f"{func}(?, {self._field_expr(field, params)})")
+            else:
+                parts.append(self._compile_operator(field, op, value, params))
+        return '(' + ' AND '.join(parts or ['1']) + ')'
+
+    def _compile_operator(self, field: str, op: str, value: Any, params: List[Any]) -> str:
+        """编译单个比较运算符"""
+        expr = self._field_expr(field, params)
+        if op == '$eq':
+            if value is None:
+                return f"{expr} IS NULL"
+            params.append(_to_sql_value(value))
+            return f"{expr} = ?"
+        if op == '$ne':
+            if value is None:
+                return f"{expr} IS NOT NULL"
+            # 与MongoDB一致，字段缺失也视为不等
+            compare_expr = self._field_expr(field, params)
+            params.append(_to_sql_value(value))
+            return f"({expr} IS NULL OR {compare_expr} != ?)"
+        if op in ('$gt', '$gte', '$lt', '$lte'):
+            params.append(_to_sql_value(value))
+            symbol = {'$gt': '>', '$gte': '>=', '$lt': '<', '$lte': '<='}[op]
+            return f"{expr} {symbol} ?"
+        if op in ('$in', '$nin'):
+            values = [_to_sql_value(v) for v in value]
+            if not values:
+                return '0' if op == '$in' else '1'
+            params.extend(values)
+            placeholders = ', '.join('?' * len(values))
+            return f"{expr} {'IN' if op == '$in' else 'NOT IN'} ({placeholders})"
+        if op == '$exists':
+            return f"{expr} IS {'NOT ' if value else ''}NULL"
+        raise ValueError(f"SQLite后端不支持的查询运算符: {op}")
+
+    def _compile_sort(self, sort: Optional[List[Tuple[str, int]]], params: List[Any]) -> str:
+        """编译排序条件"""
+        if not sort:
+            return 'id ASC'
+        parts = [f"{self._field_expr(field, params)} {'DESC' if direction < 0 else 'ASC'}" for field, direction in sort]
+        return ', '.join(parts)
+
+    def _row_to_doc(self, row: sqlite3.Row) -> Dict[str, Any]:
+        """将数据行还原为与MongoDB序列化结果一致的文档"""
+        doc = json.loads(row['doc'])
+        doc['_id'] = {'$oid': _encode_id(row['id'])}
+        return doc
+
+    def check_connection(self) -> bool:
+        """检查数据库是否可用
+
+        Returns:
+            连接状态，True表示正常
+        """
+        try:
+            self._connection().execute("SELECT 1").fetchone()
+            return True
+        except Exception as e:
+            logger.error(f"SQLite连接检查失败: {e}")
+            return False
+
+    def get_existing_urls(self) -> List[str]:
+        """获取所有已存在的URL
+
+        Returns:
+            URL列表
+        """
+        try:
+            return [row[0] for row in self._connection().execute("SELECT source_url FROM articles")]
+        except Exception as e:
+            logger.error(f"获取现有URL失败: {e}")
+            return []
+
+    def find_existing_urls(self, urls: List[str]) -> Set[str]:
+        """批量确认哪些URL已存在
+
+        Args:
+            urls: 待确认的URL列表
+
+        Returns:
+            其中已存在的URL集合
+        """
+        urls = list(urls)
+        if not urls:
+            return set()
+        try:
+            existing = set()
+            conn = self._connection()
+            # SQLite单条语句的参数数量有限，分批查询
+            for start in range(0, len(urls), 500):
+                chunk = urls[start:start + 500]
+                placeholders = ', '.join('?' * len(chunk))
+                rows = conn.execute(f"SELECT source_url FROM articles WHERE source_url IN ({placeholders})", chunk)
+                existing.update(row[0] for row in rows)
+            return existing
+        except Exception as e:
+            logger.error(f"批量确认URL失败: {e}")
+            return set()
+
+    def find_existing_text_hashes(self, hashes: List[str]) -> Set[str]:
+        """批量确认哪些正文哈希已存在，使用 json_extract(doc, '$.text_hash') 表达式索引
+
+        Args:
+            hashes: 待确认的正文哈希列表
+
+        Returns:
+            其中已存在的哈希集合
+        """
+        hashes = list(hashes)
+        if not hashes:
+            return set()
+        try:
+            existing = set()
+            conn = self._connection()
+            for start in range(0, len(hashes), 500):
+                chunk = hashes[start:start + 500]
+                placeholders = ', '.join('?' * len(chunk))
+                rows = conn.execute(
+                    f"SELECT json_extract(doc, '$.text_hash') FROM articles WHERE json_extract(doc, '$.text_hash') IN ({placeholders})",
+                    chunk
+                )
+                existing.update(row[0] for row in rows)
+            return existing
+        except Exception as e:
+            logger.error(f"批量确认正文哈希失败: {e}")
+            return set()
+
+    def add_duplicate_refs(self, source_url: str, refs: List[Dict[str, Any]]) -> bool:
+        """把近似重复数据的引用追加到文章的duplicates字段，按引用的source_url去重
+        
+        Args:
+            source_url: 代表文章的URL
+            refs: 引用列表，每项包含 source_url、author、date_time、similarity
+        
+        Returns:
+            文章是否存在并已更新
+        """
+        if not refs:
+            return True
+        try:
+            conn = self._connection()
+            with conn:
+                row = conn.execute("SELECT id, doc FROM articles WHERE source_url = ?", (source_url,)).fetchone()
+                if not row:
+                    return False
+                doc = json.loads(row['doc'])
+                duplicates = doc.get('duplicates') or []
+                known = {ref.get('source_url') for ref in duplicates}
+                duplicates.extend(ref for ref in refs if ref.get('source_url') not in known)
+                doc['duplicates'] = duplicates
+                conn.execute("UPDATE articles SET doc = ? WHERE id = ?",
+                             (json.dumps(doc, ensure_ascii=False, default=str), row['id']))
+            return True
+        except Exception as e:
+            logger.error(f"追加近似重复引用失败: {source_url}, 错误: {e}")
+            return False
+    
+    def iter_urls_after(self, last_id: Optional[str] = None) -> Iterator[Tuple[str, str]]:
+        """按写入顺序遍历指定文档ID之后的URL
+
+        Args:
+            last_id: 上次同步到的文档ID，为空时从头遍历
+
+        Yields:
+            (source_url, 文档ID) 元组
+        """
+        start = _decode_id(last_id) if last_id else 0
+        rows = self._connection().execute("SELECT id, source_url FROM articles WHERE id > ? ORDER BY id", (start,))
+        for row in rows:
+            yield row['source_url'], _encode_id(row['id'])
+
+    def iter_articles_after(self, last_id: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        """按写入顺序遍历指定文档ID之后的完整文章
+
+        Args:
+            last_id: 上次导出到的文档ID，为空时从头遍历
+
+        Yields:
+            文章字典，_id为字符串
+        """
+        start = _decode_id(last_id) if last_id else 0
+        rows = self._connection().execute("SELECT id, doc FROM articles WHERE id > ? ORDER BY id", (start,))
+        for row in rows:
+            doc = json.loads(row['doc'])
+            doc['_id'] = _encode_id(row['id'])
+            yield doc
+
+    def bulk_upsert_articles(self, articles: List[Dict[str, Any]]) -> List[str]:
+        """按source_url批量写入文章，已存在的文章保持不变
+
+        Args:
+            articles: 要写入的文章列表
+
+        Returns:
+            与输入顺序一致的状态列表，取值为 inserted / matched / failed
+        """
+        statuses = []
+        conn = self._connection()
+        try:
+            with conn:
+                for article in articles:
+                    url = article.get('source_url')
+                    if not url:
+                        logger.warning("文章缺少source_url字段，跳过写入")
+                        statuses.append(WRITE_FAILED)
+                        continue
+                    try:
+                        document = {k: v for k, v in article.items() if k != '_id'}
+                        cursor = conn.execute(
+                            "INSERT INTO articles (source_url, source, date_time, title, content, author, likes, doc) "
+                            "VALUES (?, ?, ?, ?, ?, ?, ?, ?) ON CONFLICT(source_url) DO NOTHING",
+                            (url, article.get('source'), _to_sql_value(article.get('date_time')), article.get('title'),
+                             article.get('content'), article.get('author'), self._to_int(article.get('likes')),
+                             json.dumps(document, ensure_ascii=False, default=str))
+                        )
+                        statuses.append(WRITE_INSERTED if cursor.rowcount == 1 else WRITE_MATCHED)
+                    except (sqlite3.IntegrityError, TypeError, ValueError) as e:
+                        logger.error(f"写入文档失败: {url}, 错误: {e}")
+                        statuses.append(WRITE_FAILED)
+        except Exception as e:
+            logger.error(f"批量写入文档失败: {e}")
+            return [WRITE_FAILED] * len(articles)
+        return statuses
+
+    @staticmethod
+    def _to_int(value: Any) -> Optional[int]:
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            return None
+
+    def find_by_url(self, url: str) -> Optional[Dict[str, Any]]:
+        """根据URL查找文章
+
+        Args:
+            url: 文章URL
+
+        Returns:
+            文章数据，如果不存在返回None
+        """
+        try:
+            row = self._connection().execute("SELECT id, doc FROM articles WHERE source_url = ?", (url,)).fetchone()
+            return self._row_to_doc(row) if row else None
+        except Exception as e:
+            logger.error(f"查询文档失败: {e}")
+            return None
+
+    def get_articles(self, query: Dict[str, Any] = None, skip: int = 0, limit: int = 10, sort: List[Tuple[str, int]] = None) -> List[Dict[str, Any]]:
+        """获取文章列表，支持分页和排序
+
+        Args:
+            query: 查询条件（MongoDB风格）
+            skip: 跳过的文档数
+            limit: 返回的文档数，0表示不限制
+            sort: 排序条件列表，如 [('date_time', -1)]
+
+        Returns:
+            文章列表
+        """
+        try:
+            params: List[Any] = []
+            where = self._compile_filter(query, params)
+            order = self._compile_sort(sort, params)
+            params.extend([limit if limit else -1, skip])
+            rows = self._connection().execute(
+                f"SELECT id, doc FROM articles WHERE {where} ORDER BY {order} LIMIT ? OFFSET ?", params
+            )
+            return [self._row_to_doc(row) for row in rows]
+        except Exception as e:
+            logger.error(f"获取文章列表失败: {e}")
+            return []
+
+    def get_article_by_id(self, article_id: str) -> Optional[Dict[str, Any]]:
+        """根据ID获取文章
+
+        Args:
+            article_id: 文章ID
+
+        Returns:
+            文章数据，如果不存在返回None
+        """
+        try:
+            row = self._connection().execute("SELECT id, doc FROM articles WHERE id = ?", (_decode_id(article_id),)).fetchone()
+            return self._row_to_doc(row) if row else None
+        except Exception as e:
+            logger.error(f"根据ID获取文章失败: {e}")
+            return None
+
+    def search_articles(self, query_term: str = None, query: str = None, query_filter: Dict[str, Any] = None, search_criteria: Dict[str, Any] = None, skip: int = 0, limit: int = 50, page: int = 1, per_page: int = 50) -> Union[List[Dict[str, Any]], Tuple[List[Dict[str, Any]], int]]:
+        """搜索文章，参数与MongoDB.search_articles一致
+
+        Returns:
+            元组(文章列表, 总匹配数)
+        """
+        try:
+            search_term = query_term or query or ""
+            filter_criteria = query_filter or search_criteria or {}
+
+            if page > 1 and per_page > 0:
+                actual_skip = (page - 1) * per_page
+                actual_limit = per_page
+            else:
+                actual_skip = skip
+                actual_limit = limit
+
+            if search_term:
+                # 与MongoDB实现一致：全文索引或标题/内容/作者部分匹配
+                escaped = re.escape(search_term)
+                final_query = {
+                    "$or": [
+                        {"$text": {"$search": search_term}},
+                        {"title": {"$regex": escaped, "$options": "i"}},
+                        {"content": {"$regex": escaped, "$options": "i"}},
+                        {"author": {"$regex": escaped, "$options": "i"}}
+                    ],
+                    **filter_criteria
+                }
+            else:
+                final_query = filter_criteria
+
+            total_matches = self.get_article_count(final_query)
+            results = self.get_articles(final_query, skip=actual_skip, limit=actual_limit, sort=[("date_time", -1)])
+            logger.info(f"搜索关键词 '{search_term}' 找到 {total_matches} 个结果，返回 {len(results)} 个")
+            return results, total_matches
+        except Exception as e:
+            logger.error(f"搜索文档失败: {e}")
+            return [], 0
+
+    def get_article_count(self, query: Dict[str, Any] = None) -> int:
+        """获取文章总数
+
+        Args:
+            query: 查询条件
+
+        Returns:
+            文章总数
+        """
+        try:
+            params: List[Any] = []
+            where = self._compile_filter(query, params)
+            return self._connection().execute(f"SELECT COUNT(*) FROM articles WHERE {where}", params).fetchone()[0]
+        except Exception as e:
+            logger.error(f"获取文章总数失败: {e}")
+            return 0
+
+    def get_unprocessed_data(self) -> List[Dict[str, Any]]:
+        """获取未处理的数据
+
+        Returns:
+            未处理的数据列表
+        """
+        query = {
+            "original_text": {"$exists": True, "$ne": ""},
+            "$or": [
+                {"processed": {"$exists": False}},
+                {"processed": False},
+                {"content": {"$exists": False}},
+                {"content": ""}
+            ]
+        }
+        return self.get_articles(query, limit=20)
+
+    def update_processed_data(self, doc_id: str, cleaned_data: Dict[str, Any]) -> bool:
+        """更新已处理的数据
+
+        Args:
+            doc_id: 文档ID
+            cleaned_data: 清洗后的数据
+
+        Returns:
+            是否成功更新
+        """
+        try:
+            conn = self._connection()
+            row_id = _decode_id(doc_id)
+            with conn:
+                row = conn.execute("SELECT doc FROM articles WHERE id = ?", (row_id,)).fetchone()
+                if not row:
+                    return False
+                doc = json.loads(row['doc'])
+                doc.update(cleaned_data)
+                doc['processed'] = True
+                doc['processed_time'] = datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+                conn.execute(
+                    "UPDATE articles SET source = ?, date_time = ?, title = ?, content = ?, author = ?, likes = ?, doc = ? WHERE id = ?",
+                    (doc.get('source'), _to_sql_value(doc.get('date_time')), doc.get('title'), doc.get('content'),
+                     doc.get('author'), self._to_int(doc.get('likes')), json.dumps(doc, ensure_ascii=False, default=str), row_id)
+                )
+            return True
+        except Exception as e:
+            logger.error(f"更新已处理数据失败: {e}")
+            return False
+
+    def close(self):
+        """关闭当前线程的连接"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            try:
+                conn.close()
+            except Exception as e:
+                logger.error(f"关闭SQLite连接失败: {e}")
+            self._local.conn = None
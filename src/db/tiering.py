@@ -0,0 +1,44 @@
+"""
+冷热分层模块
+
+定期将date_time早于ARCHIVE_AFTER_DAYS天的文章从热数据集合移动到
+zstd压缩的归档集合（articles_archive），热数据集合及其索引大小保持有界。
+MongoDB.get_articles / search_articles 只在查询的日期范围需要时才读取归档集合。
+"""
+
+import os
+import datetime
+from typing import Dict, Any
+
+from src.db.backend import get_database
+from src.db.mongodb import MongoDB
+from src.utils.log_handler import get_logger
+
+# 创建日志记录器
+logger = get_logger("tiering")
+
+# 超过多少天的文章会被归档
+ARCHIVE_AFTER_DAYS = int(os.getenv('ARCHIVE_AFTER_DAYS', '30'))
+
+
+def start_archiver() -> Dict[str, Any]:
+    """执行一次归档任务
+
+    Returns:
+        归档结果和分层统计
+    """
+    db = get_database()
+    if not isinstance(db, MongoDB):
+        logger.info(f"存储后端 {type(db).__name__} 不支持冷热分层，跳过归档")
+        return {}
+
+    cutoff = (datetime.datetime.now() - datetime.timedelta(days=ARCHIVE_AFTER_DAYS)).strftime('%Y-%m-%d %H:%M:%S')
+    logger.info(f"开始归档 {cutoff} 之前的文章")
+    moved = db.archive_articles(cutoff)
+    stats = db.get_tier_stats()
+    logger.info(f"分层统计: {stats}")
+    return {'moved': moved, **stats}
+
+
+if __name__ == "__main__":
+    print(start_archiver())
@@ -0,0 +1,315 @@
+"""
+URL去重服务模块
+
+使用持久化到磁盘的布隆过滤器判断URL是否已入库，布隆过滤器判定“可能存在”时
+再用一次$in查询做精确确认，避免每次初始化都全量加载数据库中的所有URL。
+"""
+
+import os
+import json
+import math
+import atexit
+import hashlib
+import threading
+from typing import List, Dict, Any, Optional, Iterable, Set
+
+from src.utils.log_handler import get_logger
+from src.utils.paths import URL_FILTER_PATH
+
+# 创建日志记录器
+logger = get_logger("url_filter")
+
+# 布隆过滤器配置
+URL_FILTER_CAPACITY = int(os.getenv('URL_FILTER_CAPACITY', '200000'))
+URL_FILTER_ERROR_RATE = float(os.getenv('URL_FILTER_ERROR_RATE', '0.001'))
+
+# 累积多少条新增URL后自动写一次快照
+AUTOSAVE_EVERY = 50
+
+# 快照文件头
+SNAPSHOT_MAGIC = b'URLBLOOM1\n'
+
+
+class BloomFilter:
+    """基于bytearray的布隆过滤器，使用双重哈希生成k个位置"""
+
+    def __init__(self, capacity: int, error_rate: float, num_bits: int = None, num_hashes: int = None, bits: bytearray = None, count: int = 0):
+        """初始化布隆过滤器
+
+        Args:
+            capacity: 预期容纳的元素数量
+            error_rate: 预期误判率
+            num_bits: 位数组长度，为空时按容量和误判率计算
+            num_hashes: 哈希函数个数，为空时按最优值计算
+            bits: 已有的位数组（从快照恢复时使用）
+            count: 已加入的元素数量
+        """
+        self.capacity = max(1, capacity)
+        self.error_rate = error_rate
+        self.num_bits = num_bits or int(math.ceil(-self.capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.num_hashes = num_hashes or max(1, int(round(self.num_bits / self.capacity * math.log(2))))
+        self.bits = bits if bits is not None else bytearray((self.num_bits + 7) // 8)
+        self.count = count
+
+    def _positions(self, item: str) -> List[int]:
+        digest = hashlib.blake2b(item.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.num_bits for i in range(self.num_hashes)]
+
+    def add(self, item: str) -> bool:
+        """加入元素
+
+        Returns:
+            元素此前是否不在过滤器中
+        """
+        added = False
+        for pos in self._positions(item):
+            byte, mask = pos >> 3, 1 << (pos & 7)
+            if not self.bits[byte] & mask:
+                self.bits[byte] |= mask
+                added = True
+        if added:
+            self.count += 1
+        return added
+
+    def __contains__(self, item: str) -> bool:
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(item))
+
+    @property
+    def size_bytes(self) -> int:
+        return len(self.bits)
+
+    def estimated_fpr(self) -> float:
+        """按当前元素数量估算误判率"""
+        return (1 - math.exp(-self.num_hashes * self.count / self.num_bits)) ** self.num_hashes
+
+
+class UrlDedupService:
+    """URL去重服务，爬虫和清洗器共享同一个实例"""
+
+    def __init__(self, db=None, path: str = URL_FILTER_PATH):
+        """初始化去重服务
+
+        Args:
+            db: 数据库实例，为空时使用进程内共享的存储后端
+            path: 快照文件路径
+        """
+        self._db = db
+        self.path = path
+        self._lock = threading.Lock()
+        self._bloom: Optional[BloomFilter] = None
+        self._last_id: Optional[str] = None
+        self._dirty = 0
+        # 运行指标
+        self.checks = 0
+        self.bloom_negatives = 0
+        self.exact_checks = 0
+        self.false_positives = 0
+        self._load()
+
+    @property
+    def db(self):
+        if self._db is None:
+            from src.db.backend import get_database
+            self._db = get_database()
+        return self._db
+
+    def _load(self):
+        """加载快照，不存在或损坏时从数据库重建，随后增量同步"""
+        bloom = None
+        try:
+            if os.path.exists(self.path):
+                with open(self.path, 'rb') as f:
+                    if f.readline() == SNAPSHOT_MAGIC:
+                        meta = json.loads(f.readline().decode('utf-8'))
+                        bits = bytearray(f.read())
+                        bloom = BloomFilter(meta['capacity'], meta['error_rate'], meta['num_bits'],
+                                            meta['num_hashes'], bits, meta['count'])
+                        if len(bits) != (bloom.num_bits + 7) // 8:
+                            logger.warning("URL过滤器快照长度不符，将重建")
+                            bloom = None
+                        else:
+                            self._last_id = meta.get('last_id')
+                    else:
+                        logger.warning("URL过滤器快照格式不正确，将重建")
+        except Exception as e:
+            logger.error(f"加载URL过滤器快照失败: {e}，将重建")
+            bloom = None
+
+        if bloom is None:
+            self._rebuild()
+        else:
+            self._bloom = bloom
+            self._catch_up()
+            # 超出容量后误判率会快速上升，扩容重建
+            if self._bloom.count > self._bloom.capacity:
+                logger.info(f"URL过滤器已超出容量 ({self._bloom.count}/{self._bloom.capacity})，扩容重建")
+                self._rebuild(capacity=self._bloom.count * 2)
+
+    def _rebuild(self, capacity: int = None):
+        """全量扫描数据库重建过滤器，只在快照缺失或需要扩容时发生"""
+        self._bloom = BloomFilter(max(capacity or 0, URL_FILTER_CAPACITY), URL_FILTER_ERROR_RATE)
+        self._last_id = None
+        self._catch_up()
+        logger.info(f"URL过滤器重建完成，共 {self._bloom.count} 个URL")
+
+    def _catch_up(self):
+        """同步快照之后其他进程写入的URL"""
+        synced = 0
+        try:
+            for url, doc_id in self.db.iter_urls_after(self._last_id):
+                self._bloom.add(url)
+                self._last_id = doc_id
+                synced += 1
+        except Exception as e:
+            logger.error(f"同步URL过滤器失败: {e}")
+        if synced:
+            self._dirty += synced
+            logger.info(f"URL过滤器增量同步 {synced} 个URL")
+            self.save()
+
+    def contains(self, url: str) -> bool:
+        """判断URL是否已入库
+
+        Args:
+            url: 要检查的URL
+
+        Returns:
+            True如果URL已存在，否则False
+        """
+        if not url:
+            return False
+        return bool(self.find_existing([url]))
+
+    def find_existing(self, urls: Iterable[str]) -> Set[str]:
+        """批量判断哪些URL已入库
+
+        布隆过滤器判定为不存在的URL直接视为新URL，其余URL用一次$in查询精确确认。
+
+        Args:
+            urls: 要检查的URL列表
+
+        Returns:
+            已存在的URL集合
+        """
+        urls = [url for url in dict.fromkeys(urls) if url]
+        with self._lock:
+            self.checks += len(urls)
+            candidates = [url for url in urls if url in self._bloom]
+            self.bloom_negatives += len(urls) - len(candidates)
+        if not candidates:
+            return set()
+
+        existing = self.db.find_existing_urls(candidates)
+        with self._lock:
+            self.exact_checks += len(candidates)
+            self.false_positives += len(candidates) - len(existing)
+        return existing
+
+    def filter_new(self, urls: Iterable[str]) -> List[str]:
+        """过滤出尚未入库的URL，保持原有顺序
+
+        Args:
+            urls: 要过滤的URL列表
+
+        Returns:
+            新URL列表
+        """
+        urls = list(urls)
+        existing = self.find_existing(urls)
+        return [url for url in urls if url not in existing]
+
+    def add(self, urls: Iterable[str]):
+        """记录新入库的URL
+
+        Args:
+            urls: 已成功入库的URL列表
+        """
+        with self._lock:
+            for url in urls:
+                if url and self._bloom.add(url):
+                    self._dirty += 1
+            should_save = self._dirty >= AUTOSAVE_EVERY
+        if should_save:
+            self.save()
+
+    def save(self):
+        """将过滤器快照写入磁盘（先写临时文件再原子替换）"""
+        with self._lock:
+            if not self._dirty:
+                return
+            bloom = self._bloom
+            meta = {
+                'capacity': bloom.capacity,
+                'error_rate': bloom.error_rate,
+                'num_bits': bloom.num_bits,
+                'num_hashes': bloom.num_hashes,
+                'count': bloom.count,
+                'last_id': self._last_id,
+            }
+            bits = bytes(bloom.bits)
+            self._dirty = 0
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(SNAPSHOT_MAGIC)
+                f.write(json.dumps(meta).encode('utf-8') + b'\n')
+                f.write(bits)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            logger.error(f"保存URL过滤器快照失败: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        """获取过滤器大小和误判率等指标
+
+        Returns:
+            指标字典
+        """
+        with self._lock:
+            bloom = self._bloom
+            return {
+                'urls': bloom.count,
+                'capacity': bloom.capacity,
+                'size_bytes': bloom.size_bytes,
+                'num_hashes': bloom.num_hashes,
+                'estimated_fpr': round(bloom.estimated_fpr(), 6),
+                'checks': self.checks,
+                'bloom_negatives': self.bloom_negatives,
+                'exact_checks': self.exact_checks,
+                'false_positives': self.false_positives,
+                'observed_fpr': round(self.false_positives / self.exact_checks, 6) if self.exact_checks else 0.0,
+            }
+
+
+# 进程内共享实例
+_service: Optional[UrlDedupService] = None
+_service_lock = threading.Lock()
+_service_pid = None
+
+
+def get_url_filter(db=None) -> UrlDedupService:
+    """获取进程内共享的URL去重服务
+
+    Args:
+        db: 首次创建时使用的数据库实例
+
+    Returns:
+        URL去重服务实例
+    """
+    global _service, _service_pid
+    with _service_lock:
+        if _service is None or _service_pid != os.getpid():
+            _service = UrlDedupService(db)
+            _service_pid = os.getpid()
+            logger.info(f"URL过滤器已就绪: {_service.stats()}")
+        return _service
+
+
+def _save_on_exit():
+    if _service is not None and _service_pid == os.getpid():
+        _service.save()
+
+
+atexit.register(_save_on_exit)
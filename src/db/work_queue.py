@@ -0,0 +1,415 @@
+"""
+爬虫到清洗器的持久化工作队列
+
+基于SQLite（WAL模式）实现，爬虫和清洗器可以在不同进程中并发读写：
+- enqueue: 爬虫写入原始数据，同一source_url在队列中只保留一条
+- dequeue: 清洗器按批领取数据，每条数据带租约，租约过期后可被重新领取
+- ack: 处理完成（入库或确认无需入库）后删除
+- nack: 处理失败时按指数退避重新排队，超过最大次数进入死信
+- checkpoint: 逐条记录已完成的处理结果（按去重键），崩溃或入库失败后重新领取时直接复用，
+  不再重复调用AI接口；条目ack时一并删除
+"""
+
+import os
+import json
+import time
+import uuid
+import sqlite3
+import hashlib
+import threading
+from typing import List, Dict, Any, Optional, Iterable
+
+from src.utils.log_handler import get_logger
+from src.utils.paths import WORK_QUEUE_PATH
+
+# 创建日志记录器
+logger = get_logger("work_queue")
+
+# 队列配置，可通过环境变量调整
+WORK_QUEUE_LEASE_SECONDS = float(os.getenv('WORK_QUEUE_LEASE_SECONDS', '600'))
+WORK_QUEUE_MAX_ATTEMPTS = int(os.getenv('WORK_QUEUE_MAX_ATTEMPTS', '5'))
+WORK_QUEUE_RETRY_DELAY = float(os.getenv('WORK_QUEUE_RETRY_DELAY', '60'))
+WORK_QUEUE_MAX_RETRY_DELAY = float(os.getenv('WORK_QUEUE_MAX_RETRY_DELAY', '3600'))
+
+# 默认队列名
+CLEAN_QUEUE = 'clean'
+
+# 条目状态
+STATUS_READY = 'ready'
+STATUS_LEASED = 'leased'
+STATUS_DEAD = 'dead'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS queue_items (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    queue TEXT NOT NULL,
+    dedup_key TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'ready',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    lease_owner TEXT,
+    lease_until REAL,
+    available_at REAL NOT NULL,
+    last_error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    UNIQUE (queue, dedup_key)
+);
+CREATE INDEX IF NOT EXISTS idx_queue_items_ready ON queue_items (queue, status, available_at, id);
+CREATE TABLE IF NOT EXISTS checkpoints (
+    queue TEXT NOT NULL,
+    dedup_key TEXT NOT NULL,
+    result TEXT,
+    created_at REAL NOT NULL,
+    PRIMARY KEY (queue, dedup_key)
+);
+"""
+
+
+def item_key(item: Dict[str, Any]) -> str:
+    """数据条目的去重键，优先使用URL"""
+    raw = item.get('raw') if isinstance(item.get('raw'), dict) else {}
+    url = item.get('source_url') or item.get('url') or raw.get('url')
+    if url:
+        return url
+    return hashlib.md5(json.dumps(item, sort_keys=True, ensure_ascii=False, default=str).encode('utf-8')).hexdigest()
+
+
+class WorkQueue:
+    """SQLite持久化工作队列"""
+
+    def __init__(self, path: str = WORK_QUEUE_PATH, name: str = CLEAN_QUEUE,
+                 lease_seconds: float = WORK_QUEUE_LEASE_SECONDS, max_attempts: int = WORK_QUEUE_MAX_ATTEMPTS):
+        """初始化工作队列
+
+        Args:
+            path: 数据库文件路径
+            name: 队列名，同一数据库文件可以保存多个队列
+            lease_seconds: 默认租约时长（秒）
+            max_attempts: 最大处理次数，超过后进入死信
+        """
+        self.path = path
+        self.name = name
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max(1, max_attempts)
+        self.owner = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._connection().executescript(SCHEMA)
+
+    def _connection(self) -> sqlite3.Connection:
+        """获取当前线程的连接，不存在时创建"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None and getattr(self._local, 'pid', None) == os.getpid():
+            return conn
+        # 手动管理事务，领取时使用BEGIN IMMEDIATE避免多个进程领取同一批数据
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+        return conn
+
+    def _transaction(self):
+        return _Transaction(self._connection())
+
+    def enqueue(self, items: Iterable[Dict[str, Any]], source: str = None) -> int:
+        """写入数据，队列中已有相同去重键的数据会被忽略
+
+        Args:
+            items: 原始数据列表
+            source: 数据来源，条目中没有source字段时补充
+
+        Returns:
+            实际新增的条目数
+        """
+        now = time.time()
+        rows = []
+        for item in items:
+            if source and 'source' not in item:
+                item = {**item, 'source': source}
+            rows.append((self.name, item_key(item), json.dumps(item, ensure_ascii=False, default=str), now, now, now))
+        if not rows:
+            return 0
+
+        with self._transaction() as conn:
+            before = conn.total_changes
+            conn.executemany(
+                "INSERT OR IGNORE INTO queue_items (queue, dedup_key, payload, available_at, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                rows
+            )
+            added = conn.total_changes - before
+        logger.info(f"队列 {self.name} 新增 {added} 条数据（提交 {len(rows)} 条）")
+        return added
+
+    def dequeue(self, batch_size: int = 10, lease_seconds: float = None) -> List[Dict[str, Any]]:
+        """领取一批数据
+
+        可领取的数据包括已到重试时间的待处理数据，以及租约已过期的数据（处理进程崩溃）；
+        租约过期且已领取达到最大次数的数据（每次都导致进程崩溃）直接进入死信，不再领取。
+
+        Args:
+            batch_size: 最多领取的条目数
+            lease_seconds: 租约时长，为空时使用默认值
+
+        Returns:
+            条目列表，每条包含 id、key、attempts 和 payload
+        """
+        now = time.time()
+        lease_until = now + (lease_seconds or self.lease_seconds)
+        with self._transaction() as conn:
+            dead = conn.execute(
+                "UPDATE queue_items SET status = ?, available_at = ?, lease_owner = NULL, lease_until = NULL, "
+                "last_error = ?, updated_at = ? WHERE queue = ? AND status = ? AND lease_until < ? AND attempts >= ?",
+                (STATUS_DEAD, now, "租约多次过期，处理进程可能在处理该条目时崩溃", now, self.name, STATUS_LEASED, now, self.max_attempts)
+            ).rowcount
+            if dead:
+                logger.warning(f"队列 {self.name} 有 {dead} 条数据租约过期且已领取 {self.max_attempts} 次，进入死信")
+            rows = conn.execute(
+                "SELECT id, dedup_key, attempts, payload FROM queue_items WHERE queue = ? AND "
+                "((status = ? AND available_at <= ?) OR (status = ? AND lease_until < ?)) "
+                "ORDER BY id LIMIT ?",
+                (self.name, STATUS_READY, now, STATUS_LEASED, now, batch_size)
+            ).fetchall()
+            if not rows:
+                return []
+            ids = [row['id'] for row in rows]
+            placeholders = ', '.join('?' * len(ids))
+            conn.execute(
+                f"UPDATE queue_items SET status = ?, attempts = attempts + 1, lease_owner = ?, lease_until = ?, updated_at = ? "
+                f"WHERE id IN ({placeholders})",
+                [STATUS_LEASED, self.owner, lease_until, now, *ids]
+            )
+        return [{'id': row['id'], 'key': row['dedup_key'], 'attempts': row['attempts'] + 1, 'payload': json.loads(row['payload'])}
+                for row in rows]
+
+    def ack(self, ids: Iterable[int]) -> int:
+        """确认数据处理完成并删除，同时删除对应的处理结果检查点
+
+        Args:
+            ids: 条目ID列表
+
+        Returns:
+            删除的条目数
+        """
+        ids = list(ids)
+        if not ids:
+            return 0
+        placeholders = ', '.join('?' * len(ids))
+        with self._transaction() as conn:
+            conn.execute(
+                f"DELETE FROM checkpoints WHERE queue = ? AND dedup_key IN "
+                f"(SELECT dedup_key FROM queue_items WHERE queue = ? AND id IN ({placeholders}))",
+                [self.name, self.name, *ids]
+            )
+            cursor = conn.execute(f"DELETE FROM queue_items WHERE queue = ? AND id IN ({placeholders})", [self.name, *ids])
+            return cursor.rowcount
+
+    def nack(self, item_id: int, error: str = '', retry_delay: float = None) -> str:
+        """处理失败，按指数退避重新排队，超过最大次数进入死信
+
+        Args:
+            item_id: 条目ID
+            error: 失败原因
+            retry_delay: 指定的重试延迟（秒），为空时按次数退避
+
+        Returns:
+            条目的新状态 ready / dead
+        """
+        now = time.time()
+        with self._transaction() as conn:
+            row = conn.execute("SELECT attempts FROM queue_items WHERE queue = ? AND id = ?", (self.name, item_id)).fetchone()
+            if row is None:
+                return ''
+            attempts = row['attempts']
+            if attempts >= self.max_attempts:
+                status, available_at = STATUS_DEAD, now
+                logger.warning(f"队列 {self.name} 条目 {item_id} 已失败 {attempts} 次，进入死信: {error}")
+            else:
+                delay = retry_delay if retry_delay is not None else min(WORK_QUEUE_RETRY_DELAY * (2 ** (attempts - 1)), WORK_QUEUE_MAX_RETRY_DELAY)
+                status, available_at = STATUS_READY, now + delay
+            conn.execute(
+                "UPDATE queue_items SET status = ?, available_at = ?, lease_owner = NULL, lease_until = NULL, "
+                "last_error = ?, updated_at = ? WHERE id = ?",
+                (status, available_at, (error or '')[:1000], now, item_id)
+            )
+        return status
+
+    def checkpoint(self, key: str, result: Optional[Dict[str, Any]]):
+        """记录单条数据的处理结果，result为None表示已确认无需入库
+
+        Args:
+            key: 条目的去重键
+            result: 处理结果
+        """
+        with self._transaction() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO checkpoints (queue, dedup_key, result, created_at) VALUES (?, ?, ?, ?)",
+                (self.name, key, None if result is None else json.dumps(result, ensure_ascii=False, default=str), time.time())
+            )
+
+    def get_checkpoints(self, keys: Iterable[str]) -> Dict[str, Optional[Dict[str, Any]]]:
+        """批量读取已记录的处理结果
+
+        Args:
+            keys: 去重键列表
+
+        Returns:
+            {去重键: 处理结果}，没有检查点的键不会出现在结果中
+        """
+        keys = list(keys)
+        if not keys:
+            return {}
+        placeholders = ', '.join('?' * len(keys))
+        rows = self._connection().execute(
+            f"SELECT dedup_key, result FROM checkpoints WHERE queue = ? AND dedup_key IN ({placeholders})",
+            [self.name, *keys]
+        )
+        return {row['dedup_key']: (json.loads(row['result']) if row['result'] is not None else None) for row in rows}
+
+    def extend_lease(self, ids: Iterable[int], lease_seconds: float = None) -> int:
+        """延长仍在处理中的条目的租约
+
+        Returns:
+            成功续约的条目数
+        """
+        ids = list(ids)
+        if not ids:
+            return 0
+        lease_until = time.time() + (lease_seconds or self.lease_seconds)
+        placeholders = ', '.join('?' * len(ids))
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                f"UPDATE queue_items SET lease_until = ? WHERE queue = ? AND status = ? AND lease_owner = ? AND id IN ({placeholders})",
+                [lease_until, self.name, STATUS_LEASED, self.owner, *ids]
+            )
+            return cursor.rowcount
+
+    def pending_keys(self) -> set:
+        """队列中尚未完成（含死信）的去重键"""
+        rows = self._connection().execute("SELECT dedup_key FROM queue_items WHERE queue = ?", (self.name,))
+        return {row[0] for row in rows}
+
+    def dead_letters(self, limit: int = 100) -> List[Dict[str, Any]]:
+        """查看死信条目"""
+        rows = self._connection().execute(
+            "SELECT id, attempts, last_error, payload, updated_at FROM queue_items WHERE queue = ? AND status = ? ORDER BY id LIMIT ?",
+            (self.name, STATUS_DEAD, limit)
+        ).fetchall()
+        return [{'id': row['id'], 'attempts': row['attempts'], 'last_error': row['last_error'],
+                 'payload': json.loads(row['payload']), 'updated_at': row['updated_at']} for row in rows]
+
+    def requeue_dead(self, ids: Iterable[int] = None) -> int:
+        """将死信重新放回队列，ids为空时全部放回
+
+        Returns:
+            重新排队的条目数
+        """
+        now = time.time()
+        with self._transaction() as conn:
+            params: List[Any] = [STATUS_READY, now, now, self.name, STATUS_DEAD]
+            sql = "UPDATE queue_items SET status = ?, attempts = 0, available_at = ?, updated_at = ? WHERE queue = ? AND status = ?"
+            if ids is not None:
+                ids = list(ids)
+                if not ids:
+                    return 0
+                sql += f" AND id IN ({', '.join('?' * len(ids))})"
+                params.extend(ids)
+            return conn.execute(sql, params).rowcount
+
+    def stats(self) -> Dict[str, Any]:
+        """各状态的条目数
+
+        Returns:
+            统计字典
+        """
+        now = time.time()
+        counts = {STATUS_READY: 0, STATUS_LEASED: 0, STATUS_DEAD: 0}
+        for row in self._connection().execute(
+            "SELECT status, count(*) FROM queue_items WHERE queue = ? GROUP BY status", (self.name,)
+        ):
+            counts[row[0]] = row[1]
+        expired = self._connection().execute(
+            "SELECT count(*) FROM queue_items WHERE queue = ? AND status = ? AND lease_until < ?",
+            (self.name, STATUS_LEASED, now)
+        ).fetchone()[0]
+        checkpoints = self._connection().execute(
+            "SELECT count(*) FROM checkpoints WHERE queue = ?", (self.name,)
+        ).fetchone()[0]
+        return {'queue': self.name, **counts, 'expired_leases': expired, 'checkpoints': checkpoints,
+                'pending': counts[STATUS_READY] + counts[STATUS_LEASED]}
+
+    def pending_count(self) -> int:
+        """待处理和处理中的条目数"""
+        return self.stats()['pending']
+
+
+class _Transaction:
+    """BEGIN IMMEDIATE 事务上下文，异常时回滚"""
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+
+    def __enter__(self) -> sqlite3.Connection:
+        self.conn.execute("BEGIN IMMEDIATE")
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.conn.execute("COMMIT")
+        else:
+            self.conn.execute("ROLLBACK")
+        return False
+
+
+# 进程内共享实例
+_queues: Dict[str, WorkQueue] = {}
+_queues_lock = threading.Lock()
+
+
+def get_work_queue(name: str = CLEAN_QUEUE) -> WorkQueue:
+    """获取进程内共享的工作队列
+
+    Args:
+        name: 队列名
+
+    Returns:
+        工作队列实例
+    """
+    with _queues_lock:
+        queue = _queues.get(name)
+        if queue is None:
+            queue = _queues[name] = WorkQueue(name=name)
+        return queue
+
+
+def import_legacy_temp_files() -> int:
+    """将旧版临时JSON文件中残留的数据按块流式导入队列并清空文件，升级后首次运行时使用
+
+    Returns:
+        导入的条目数
+    """
+    from src.clean.storage import iter_json_items, iter_chunks
+    from src.utils.paths import X_TEMP_DATA_PATH, CRU_TEMP_DATA_PATH
+    queue = get_work_queue()
+    imported = 0
+    for path, source in ((X_TEMP_DATA_PATH, 'x.com'), (CRU_TEMP_DATA_PATH, 'crunchbase.com')):
+        try:
+            if not os.path.exists(path) or os.path.getsize(path) <= 2:
+                continue
+            count = 0
+            for chunk in iter_chunks(iter_json_items(path), 500):
+                imported += queue.enqueue(chunk, source=source)
+                count += len(chunk)
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write('[]')
+            logger.info(f"已将旧版临时文件 {path} 中的 {count} 条数据导入队列")
+        except Exception as e:
+            logger.error(f"导入旧版临时文件失败: {path}, 错误: {e}")
+    return imported
+
+
+if __name__ == "__main__":
+    print(get_work_queue().stats())
@@ -0,0 +1,256 @@
+"""
+后台批量写入缓冲模块（write-behind）
+
+逐条提交的文章先进入内存队列，由后台线程按数量或时间批量upsert到数据库。
+队列满时提交方会被阻塞（背压），等待超时后退化为同步写入，保证不丢数据。
+"""
+
+import os
+import time
+import queue
+import atexit
+import threading
+from concurrent.futures import Future
+from typing import List, Dict, Any, Optional, Tuple
+
+from src.utils.log_handler import get_logger
+# 先注册连接注册表的退出钩子，保证退出时先写完缓冲区再关闭连接
+import src.db.connection  # noqa: F401
+
+# 创建日志记录器
+logger = get_logger("write_buffer")
+
+# 缓冲配置，可通过环境变量调整
+WRITE_BUFFER_MAX_BATCH = int(os.getenv('WRITE_BUFFER_MAX_BATCH', '100'))
+WRITE_BUFFER_FLUSH_INTERVAL = float(os.getenv('WRITE_BUFFER_FLUSH_INTERVAL', '2.0'))
+WRITE_BUFFER_MAX_PENDING = int(os.getenv('WRITE_BUFFER_MAX_PENDING', '1000'))
+WRITE_BUFFER_PUT_TIMEOUT = float(os.getenv('WRITE_BUFFER_PUT_TIMEOUT', '30'))
+
+# 队列控制消息
+_FLUSH = object()
+_STOP = object()
+
+
+class WriteBehindBuffer:
+    """后台批量写入缓冲区"""
+
+    def __init__(self, db=None, max_batch: int = WRITE_BUFFER_MAX_BATCH, flush_interval: float = WRITE_BUFFER_FLUSH_INTERVAL,
+                 max_pending: int = WRITE_BUFFER_MAX_PENDING, put_timeout: float = WRITE_BUFFER_PUT_TIMEOUT):
+        """初始化写入缓冲区
+
+        Args:
+            db: 数据库实例，需提供bulk_upsert_articles方法，为空时使用进程内共享的存储后端
+            max_batch: 单批最大文档数，达到后立即写入
+            flush_interval: 最长缓冲时间（秒），超过后立即写入
+            max_pending: 队列最大长度，超过后提交方阻塞
+            put_timeout: 提交方最长阻塞时间（秒），超时后同步写入
+        """
+        self._db = db
+        self.max_batch = max(1, max_batch)
+        self.flush_interval = flush_interval
+        self.put_timeout = put_timeout
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max_pending)
+        self._metrics_lock = threading.Lock()
+        self._metrics = {
+            'submitted': 0,
+            'batches': 0,
+            'inserted': 0,
+            'matched': 0,
+            'failed': 0,
+            'max_batch_size': 0,
+            'max_queue_depth': 0,
+            'backpressure_waits': 0,
+            'sync_writes': 0,
+            'write_seconds': 0.0,
+            'max_write_seconds': 0.0,
+        }
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="write-behind", daemon=True)
+        self._thread.start()
+
+    @property
+    def db(self):
+        if self._db is None:
+            from src.db.backend import get_database
+            self._db = get_database()
+        return self._db
+
+    def submit(self, article: Dict[str, Any]) -> Future:
+        """提交一篇文章，立即返回
+
+        Args:
+            article: 要写入的文章
+
+        Returns:
+            Future，写入完成后结果为 inserted / matched / failed
+        """
+        future = Future()
+        if self._closed:
+            self._write_sync([(article, future)])
+            return future
+
+        with self._metrics_lock:
+            self._metrics['submitted'] += 1
+        try:
+            self._queue.put_nowait((article, future))
+        except queue.Full:
+            # 背压：数据库写入跟不上时阻塞提交方
+            with self._metrics_lock:
+                self._metrics['backpressure_waits'] += 1
+            try:
+                self._queue.put((article, future), timeout=self.put_timeout)
+            except queue.Full:
+                logger.warning(f"写入缓冲区已满且等待超时，改为同步写入: {article.get('source_url', '')}")
+                self._write_sync([(article, future)])
+                return future
+
+        with self._metrics_lock:
+            depth = self._queue.qsize()
+            if depth > self._metrics['max_queue_depth']:
+                self._metrics['max_queue_depth'] = depth
+        return future
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """等待此前提交的所有文章写入完成
+
+        Args:
+            timeout: 最长等待时间（秒），为空表示一直等待
+
+        Returns:
+            是否在超时前完成
+        """
+        if self._closed or not self._thread.is_alive():
+            return True
+        done = threading.Event()
+        self._queue.put((_FLUSH, done))
+        return done.wait(timeout)
+
+    def close(self, timeout: Optional[float] = 30):
+        """写入剩余数据并停止后台线程"""
+        if self._closed:
+            return
+        self._closed = True
+        if self._thread.is_alive():
+            self._queue.put((_STOP, None))
+            self._thread.join(timeout)
+        logger.info(f"写入缓冲区已关闭: {self.metrics()}")
+
+    def _run(self):
+        """后台线程：按数量或时间凑批写入"""
+        batch: List[Tuple[Dict[str, Any], Future]] = []
+        deadline = None
+        while True:
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                article, payload = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                # 达到最长缓冲时间
+                self._write_batch(batch)
+                batch, deadline = [], None
+                continue
+
+            if article is _FLUSH:
+                self._write_batch(batch)
+                batch, deadline = [], None
+                payload.set()
+            elif article is _STOP:
+                self._drain(batch)
+                return
+            else:
+                batch.append((article, payload))
+                if deadline is None:
+                    deadline = time.monotonic() + self.flush_interval
+                if len(batch) >= self.max_batch:
+                    self._write_batch(batch)
+                    batch, deadline = [], None
+
+    def _drain(self, batch: List[Tuple[Dict[str, Any], Future]]):
+        """停止前写入队列中剩余的数据"""
+        while True:
+            try:
+                article, payload = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if article is _FLUSH:
+                payload.set()
+            elif article is not _STOP:
+                batch.append((article, payload))
+        self._write_batch(batch)
+
+    def _write_batch(self, batch: List[Tuple[Dict[str, Any], Future]]):
+        """将一批文章写入数据库并设置各自的结果"""
+        if not batch:
+            return
+        start_time = time.monotonic()
+        try:
+            statuses = self.db.bulk_upsert_articles([article for article, _ in batch])
+        except Exception as e:
+            logger.error(f"批量写入失败: {e}")
+            statuses = ['failed'] * len(batch)
+        elapsed = time.monotonic() - start_time
+
+        with self._metrics_lock:
+            metrics = self._metrics
+            metrics['batches'] += 1
+            metrics['write_seconds'] += elapsed
+            metrics['max_write_seconds'] = max(metrics['max_write_seconds'], elapsed)
+            metrics['max_batch_size'] = max(metrics['max_batch_size'], len(batch))
+            for status in statuses:
+                metrics[status] = metrics.get(status, 0) + 1
+
+        for (_, future), status in zip(batch, statuses):
+            if not future.done():
+                future.set_result(status)
+        logger.info(f"批量写入 {len(batch)} 篇文章，耗时 {elapsed:.2f} 秒")
+
+    def _write_sync(self, batch: List[Tuple[Dict[str, Any], Future]]):
+        with self._metrics_lock:
+            self._metrics['sync_writes'] += len(batch)
+        self._write_batch(batch)
+
+    def metrics(self) -> Dict[str, Any]:
+        """获取写入缓冲区指标
+
+        Returns:
+            指标字典
+        """
+        with self._metrics_lock:
+            metrics = dict(self._metrics)
+        metrics['queue_depth'] = self._queue.qsize()
+        metrics['avg_batch_size'] = round((metrics['inserted'] + metrics['matched'] + metrics['failed']) / metrics['batches'], 2) if metrics['batches'] else 0
+        metrics['avg_write_seconds'] = round(metrics['write_seconds'] / metrics['batches'], 3) if metrics['batches'] else 0
+        metrics['write_seconds'] = round(metrics['write_seconds'], 3)
+        metrics['max_write_seconds'] = round(metrics['max_write_seconds'], 3)
+        return metrics
+
+
+# 进程内共享实例
+_buffer: Optional[WriteBehindBuffer] = None
+_buffer_lock = threading.Lock()
+_buffer_pid = None
+
+
+def get_write_buffer(db=None) -> WriteBehindBuffer:
+    """获取进程内共享的写入缓冲区
+
+    Args:
+        db: 首次创建时使用的数据库实例
+
+    Returns:
+        写入缓冲区实例
+    """
+    global _buffer, _buffer_pid
+    with _buffer_lock:
+        # fork之后后台线程不会被继承，需要重新创建
+        if _buffer is None or _buffer_pid != os.getpid():
+            _buffer = WriteBehindBuffer(db)
+            _buffer_pid = os.getpid()
+        return _buffer
+
+
+def _close_on_exit():
+    if _buffer is not None and _buffer_pid == os.getpid():
+        _buffer.close()
+
+
+atexit.register(_close_on_exit)
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+本地模拟AI接口 - 用于在没有真实接口的情况下验证路由、限流和对冲请求
+
+实现OpenAI兼容的 POST /v1/chat/completions（包括 stream=True 的SSE输出），
+可配置延迟、延迟抖动、错误率和错误状态码。
+
+直接运行时启动一个快速接口和一个经常出错的慢接口，通过路由器发送请求并打印各接口的统计：
+    python -m src.utils.fake_llm_server --calls 50
+"""
+
+import json
+import time
+import random
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Tuple
+
+
+class FakeLLMServer:
+    """在后台线程运行的模拟接口"""
+
+    def __init__(self, latency: float = 0.1, jitter: float = 0.0, error_rate: float = 0.0,
+                 error_status: int = 500, content: str = None, port: int = 0):
+        """初始化模拟接口
+
+        Args:
+            latency: 每次请求的基础延迟（秒）
+            jitter: 延迟的随机增量上限（秒）
+            error_rate: 返回错误的概率
+            error_status: 错误时返回的HTTP状态码，429时附带Retry-After头
+            content: 固定的返回内容，为空时回显用户输入的前200个字符
+            port: 监听端口，0表示随机
+        """
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.content = content
+        self.requests = 0
+        self.errors = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(('127.0.0.1', port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_address[1]}/v1"
+
+    def start(self) -> 'FakeLLMServer':
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _respond(self, body: dict) -> Tuple[int, str]:
+        """生成一次请求的状态码和返回内容"""
+        with self._lock:
+            self.requests += 1
+            failed = random.random() < self.error_rate
+            if failed:
+                self.errors += 1
+        time.sleep(self.latency + random.uniform(0, self.jitter))
+        if failed:
+            return self.error_status, json.dumps({'error': {'message': 'fake server error', 'code': self.error_status}})
+        messages = body.get('messages') or [{}]
+        return 200, self.content if self.content is not None else f"模拟结果: {str(messages[-1].get('content', ''))[:200]}"
+
+    def _handler_class(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def do_POST(self):
+                if not self.path.rstrip('/').endswith('/chat/completions'):
+                    self.send_error(404)
+                    return
+                length = int(self.headers.get('Content-Length') or 0)
+                body = json.loads(self.rfile.read(length) or b'{}')
+                status, content = fake._respond(body)
+                model = body.get('model', 'fake-model')
+                if status != 200:
+                    self.send_response(status)
+                    self.send_header('Content-Type', 'application/json; charset=utf-8')
+                    if status == 429:
+                        self.send_header('Retry-After', '1')
+                    self.end_headers()
+                    self.wfile.write(content.encode('utf-8'))
+                    return
+                if body.get('stream'):
+                    self._stream(model, content)
+                    return
+                payload = {
+                    'id': 'chatcmpl-fake',
+                    'object': 'chat.completion',
+                    'created': int(time.time()),
+                    'model': model,
+                    'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': content}, 'finish_reason': 'stop'}],
+                    'usage': {'prompt_tokens': length // 4, 'completion_tokens': len(content), 'total_tokens': length // 4 + len(content)},
+                }
+                data = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json; charset=utf-8')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _stream(self, model: str, content: str):
+                """按SSE格式分块输出"""
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/event-stream; charset=utf-8')
+                self.end_headers()
+                try:
+                    for i in range(0, len(content), 8):
+                        chunk = {
+                            'id': 'chatcmpl-fake',
+                            'object': 'chat.completion.chunk',
+                            'created': int(time.time()),
+                            'model': model,
+                            'choices': [{'index': 0, 'delta': {'content': content[i:i + 8]}, 'finish_reason': None}],
+                        }
+                        self.wfile.write(f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode('utf-8'))
+                        self.wfile.flush()
+                    self.wfile.write(b"data: [DONE]\n\n")
+                except (BrokenPipeError, ConnectionResetError):
+                    # 调用方提前终止了接收
+                    pass
+
+        return Handler
+
+
+def main():
+    """启动两个模拟接口，通过路由器发送请求，验证延迟感知选择和故障转移"""
+    parser = argparse.ArgumentParser(description="模拟AI接口与路由器演示")
+    parser.add_argument('--calls', type=int, default=50, help="发送的请求数")
+    parser.add_argument('--serve', action='store_true', help="只启动一个模拟接口并持续运行")
+    parser.add_argument('--port', type=int, default=8999, help="--serve 时的监听端口")
+    args = parser.parse_args()
+
+    if args.serve:
+        server = FakeLLMServer(port=args.port).start()
+        print(f"模拟接口已启动: {server.base_url}")
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            server.stop()
+        return
+
+    from src.utils.llm_router import build_router
+
+    fast = FakeLLMServer(latency=0.05).start()
+    flaky = FakeLLMServer(latency=0.3, error_rate=0.5, error_status=503).start()
+    router = build_router([
+        {'name': 'fast', 'base_url': fast.base_url, 'api_key': 'fake'},
+        {'name': 'flaky', 'base_url': flaky.base_url, 'api_key': 'fake', 'weight': 2},
+    ])
+    started = time.time()
+    failures = 0
+    for i in range(args.calls):
+        try:
+            router.chat.completions.create(model='fake-model', messages=[{'role': 'user', 'content': f"请求 {i}"}])
+        except Exception:
+            failures += 1
+    print(f"{args.calls} 次请求耗时 {time.time() - started:.2f} 秒，最终失败 {failures} 次")
+    print(f"模拟接口请求数: fast={fast.requests}, flaky={flaky.requests}（出错 {flaky.errors}）")
+    print(json.dumps(router.stats(), ensure_ascii=False, indent=2))
+    fast.stop()
+    flaky.stop()
+
+
+if __name__ == "__main__":
+    main()
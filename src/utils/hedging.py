@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+对冲请求模块 - 降低AI调用的长尾延迟
+
+一次调用超过最近调用延迟的 p90（LLM_HEDGE_QUANTILE）仍未返回时，再发出一个相同的请求
+（可发往另一个接口），采用先成功返回的结果，并通知另一个请求停止接收。
+
+对冲请求会额外消耗调用量，因此每次运行设有预算：对冲次数不超过调用次数的
+LLM_HEDGE_BUDGET 比例，且不超过 LLM_HEDGE_MAX_PER_RUN 次。延迟样本不足
+LLM_HEDGE_MIN_SAMPLES 时不对冲。
+
+等待时间和延迟样本都从请求取得限流器名额、真正发出之后开始计算：在限流器中排队的时间
+不计入延迟，限流器暂停或名额已满时也不发出对冲请求（对冲请求同样只能排队）。
+"""
+
+import os
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Any, Callable, Dict, Optional
+
+from src.utils.log_handler import get_logger
+
+# 创建日志记录器
+logger = get_logger("hedging")
+
+# 对冲配置，可通过环境变量调整
+LLM_HEDGE = os.getenv('LLM_HEDGE', '0').lower() in ('1', 'true', 'yes')
+LLM_HEDGE_QUANTILE = float(os.getenv('LLM_HEDGE_QUANTILE', '0.9'))
+LLM_HEDGE_MIN_DELAY = float(os.getenv('LLM_HEDGE_MIN_DELAY', '1'))
+LLM_HEDGE_MIN_SAMPLES = int(os.getenv('LLM_HEDGE_MIN_SAMPLES', '20'))
+LLM_HEDGE_BUDGET = float(os.getenv('LLM_HEDGE_BUDGET', '0.1'))
+LLM_HEDGE_MAX_PER_RUN = int(os.getenv('LLM_HEDGE_MAX_PER_RUN', '100'))
+LLM_HEDGE_SECONDARY = os.getenv('LLM_HEDGE_SECONDARY', '1').lower() not in ('0', 'false', 'no')
+
+# 计算分位数使用的最近延迟样本数
+LATENCY_WINDOW = 200
+
+
+class Hedger:
+    """按滚动分位数延迟触发对冲请求"""
+
+    def __init__(self, enabled: bool = LLM_HEDGE, quantile: float = LLM_HEDGE_QUANTILE,
+                 min_delay: float = LLM_HEDGE_MIN_DELAY, min_samples: int = LLM_HEDGE_MIN_SAMPLES,
+                 budget: float = LLM_HEDGE_BUDGET, max_per_run: int = LLM_HEDGE_MAX_PER_RUN):
+        """初始化
+
+        Args:
+            enabled: 是否启用对冲，关闭时只记录延迟
+            quantile: 触发对冲的延迟分位数
+            min_delay: 触发对冲的最短等待时间（秒）
+            min_samples: 启用对冲所需的最少延迟样本数
+            budget: 每次运行中对冲次数占调用次数的比例上限
+            max_per_run: 每次运行的对冲次数上限
+        """
+        self.enabled = enabled
+        self.quantile = quantile
+        self.min_delay = min_delay
+        self.min_samples = min_samples
+        self.budget = budget
+        self.max_per_run = max_per_run
+        self._latencies = deque(maxlen=LATENCY_WINDOW)
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._metrics = {'calls': 0, 'hedged': 0, 'hedge_wins': 0, 'over_budget': 0, 'limiter_blocked': 0}
+        self._run_calls = 0
+        self._run_hedges = 0
+
+    def reset_budget(self):
+        """开始新的一次运行，重新计算对冲预算"""
+        with self._lock:
+            self._run_calls = 0
+            self._run_hedges = 0
+
+    def hedge_delay(self) -> Optional[float]:
+        """当前的对冲等待时间，样本不足时返回None"""
+        with self._lock:
+            if len(self._latencies) < self.min_samples:
+                return None
+            ordered = sorted(self._latencies)
+        index = min(len(ordered) - 1, int(len(ordered) * self.quantile))
+        return max(self.min_delay, ordered[index])
+
+    def record(self, elapsed: float):
+        """记录一次调用的延迟（从取得限流器名额开始），由调用方在请求完成时调用"""
+        with self._lock:
+            self._latencies.append(elapsed)
+
+    def _take_budget(self) -> bool:
+        """申请一次对冲，超出本次运行的预算时返回False"""
+        with self._lock:
+            if self._run_hedges >= self.max_per_run or self._run_hedges + 1 > max(1.0, self._run_calls * self.budget):
+                self._metrics['over_budget'] += 1
+                return False
+            self._run_hedges += 1
+            self._metrics['hedged'] += 1
+            return True
+
+    def _pool(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=32, thread_name_prefix="hedge")
+            return self._executor
+
+    def run(self, primary: Callable[[threading.Event, threading.Event], Any],
+            hedge: Callable[[threading.Event, threading.Event], Any] = None,
+            blocked: Callable[[], bool] = None) -> Any:
+        """执行一次调用，请求发出后超过对冲等待时间仍未返回时发出对冲请求
+
+        Args:
+            primary: 主请求，参数为 (取消事件, 开始事件)：取消事件被设置时应尽快停止（例如停止接收流式输出），
+                取得限流器名额、真正发出请求时应设置开始事件，对冲等待时间从这时开始计算
+            hedge: 对冲请求，为空时再次调用primary
+            blocked: 返回True时限流器处于暂停中或名额已满，不发出对冲请求
+
+        Returns:
+            先成功完成的请求的返回值
+
+        Raises:
+            所有请求都失败时抛出主请求的异常
+        """
+        with self._lock:
+            self._metrics['calls'] += 1
+            self._run_calls += 1
+        delay = self.hedge_delay() if self.enabled else None
+        if delay is None:
+            return primary(threading.Event(), threading.Event())
+
+        primary_cancel = threading.Event()
+        primary_started = threading.Event()
+        primary_future = self._pool().submit(primary, primary_cancel, primary_started)
+        # 请求结束时也设置开始事件，避免请求没有真正发出就失败时一直等待
+        primary_future.add_done_callback(lambda _: primary_started.set())
+        primary_started.wait()
+        done, _ = wait([primary_future], timeout=delay)
+        if done:
+            return primary_future.result()
+        if blocked is not None and blocked():
+            with self._lock:
+                self._metrics['limiter_blocked'] += 1
+            return primary_future.result()
+        if not self._take_budget():
+            return primary_future.result()
+
+        logger.info(f"请求超过 {delay:.1f} 秒未返回，发出对冲请求")
+        hedge_cancel = threading.Event()
+        hedge_future = self._pool().submit(hedge or primary, hedge_cancel, threading.Event())
+        cancels = {primary_future: primary_cancel, hedge_future: hedge_cancel}
+        pending = {primary_future, hedge_future}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is not None:
+                    continue
+                # 采用先成功返回的结果，通知另一个请求停止
+                for other, cancel in cancels.items():
+                    if other is not future:
+                        cancel.set()
+                if future is hedge_future:
+                    with self._lock:
+                        self._metrics['hedge_wins'] += 1
+                return future.result()
+        return primary_future.result()
+
+    def stats(self) -> Dict[str, Any]:
+        """对冲指标快照"""
+        delay = self.hedge_delay()
+        with self._lock:
+            return {
+                **self._metrics,
+                'enabled': self.enabled,
+                'hedge_delay': round(delay, 2) if delay is not None else None,
+                'run_hedges': self._run_hedges,
+                'run_calls': self._run_calls,
+            }
+
+
+# 进程内共享实例
+_hedger: Optional[Hedger] = None
+_hedger_lock = threading.Lock()
+
+
+def get_hedger() -> Hedger:
+    """获取进程内共享的对冲器"""
+    global _hedger
+    with _hedger_lock:
+        if _hedger is None:
+            _hedger = Hedger()
+        return _hedger
@@ -0,0 +1,323 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+AI响应缓存模块 - 按内容寻址的持久化缓存
+
+缓存键为 (模型, 提示词版本, 系统提示词, 输入) 的sha256，相同输入不论来自哪个URL、
+哪次运行都只调用一次AI接口。缓存保存在SQLite中，支持：
+- TTL：超过 LLM_CACHE_TTL_DAYS 的条目视为过期
+- 按总大小的LRU淘汰：超过 LLM_CACHE_MAX_MB 后淘汰最久未访问的条目
+- 命中率指标
+- LLM_CACHE_BYPASS=1 时跳过读取（仍会写入新结果）
+
+运行 python -m src.utils.llm_cache <数据文件> 可把一天的原始数据重放两遍，对比缓存效果。
+"""
+
+import os
+import sys
+import json
+import time
+import hashlib
+import sqlite3
+import argparse
+import threading
+from types import SimpleNamespace
+from typing import Any, Dict, Optional
+
+from src.utils.log_handler import get_logger
+from src.utils.paths import LLM_CACHE_PATH
+
+# 创建日志记录器
+logger = get_logger("llm_cache")
+
+# 缓存配置，可通过环境变量调整
+LLM_CACHE_TTL_DAYS = float(os.getenv('LLM_CACHE_TTL_DAYS', '30'))
+LLM_CACHE_MAX_MB = float(os.getenv('LLM_CACHE_MAX_MB', '200'))
+LLM_CACHE_BYPASS = os.getenv('LLM_CACHE_BYPASS', '').lower() in ('1', 'true', 'yes')
+
+# 淘汰时降到上限的该比例以下，避免每次写入都触发淘汰
+EVICT_TARGET_RATIO = 0.9
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    model TEXT,
+    response TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    last_access REAL NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_responses_last_access ON responses (last_access);
+"""
+
+
+def make_key(model: str, prompt_version: str, system_message: str, prompt: str) -> str:
+    """缓存键：模型、提示词版本和完整输入的sha256"""
+    payload = json.dumps([model, prompt_version, system_message, prompt], ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class LLMCache:
+    """SQLite持久化的AI响应缓存"""
+
+    def __init__(self, path: str = LLM_CACHE_PATH, ttl_days: float = LLM_CACHE_TTL_DAYS,
+                 max_mb: float = LLM_CACHE_MAX_MB, bypass: bool = LLM_CACHE_BYPASS):
+        """初始化缓存
+
+        Args:
+            path: 数据库文件路径
+            ttl_days: 条目有效期（天），0表示不过期
+            max_mb: 缓存内容总大小上限（MB）
+            bypass: 为True时跳过读取，只写入
+        """
+        self.path = path
+        self.ttl = ttl_days * 86400
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.bypass = bypass
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._metrics = {'hits': 0, 'misses': 0, 'expired': 0, 'puts': 0, 'evictions': 0, 'errors': 0}
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        conn = self._connection()
+        conn.executescript(SCHEMA)
+        self._total_bytes = conn.execute("SELECT coalesce(sum(size), 0) FROM responses").fetchone()[0]
+
+    def _connection(self) -> sqlite3.Connection:
+        """获取当前线程的连接，不存在时创建"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None and getattr(self._local, 'pid', None) == os.getpid():
+            return conn
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+        return conn
+
+    def _count(self, field: str):
+        with self._lock:
+            self._metrics[field] += 1
+
+    def get(self, key: str) -> Optional[str]:
+        """读取缓存的响应
+
+        Args:
+            key: 缓存键
+
+        Returns:
+            响应文本，未命中、已过期或处于bypass模式时返回None
+        """
+        if self.bypass:
+            return None
+        try:
+            conn = self._connection()
+            row = conn.execute("SELECT response, created_at FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self._count('misses')
+                return None
+            now = time.time()
+            if self.ttl and row[1] + self.ttl < now:
+                self._delete(conn, key)
+                self._count('expired')
+                self._count('misses')
+                return None
+            conn.execute("UPDATE responses SET last_access = ?, hits = hits + 1 WHERE key = ?", (now, key))
+            self._count('hits')
+            return row[0]
+        except Exception as e:
+            self._count('errors')
+            logger.error(f"读取AI响应缓存失败: {e}")
+            return None
+
+    def put(self, key: str, response: str, model: str = None):
+        """写入响应，超过大小上限时淘汰最久未访问的条目
+
+        Args:
+            key: 缓存键
+            response: 响应文本，空响应不缓存
+            model: 模型名，仅用于统计
+        """
+        if not response:
+            return
+        try:
+            conn = self._connection()
+            size = len(response.encode('utf-8'))
+            now = time.time()
+            old = conn.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            conn.execute(
+                "INSERT OR REPLACE INTO responses (key, model, response, size, created_at, last_access, hits) VALUES (?, ?, ?, ?, ?, ?, 0)",
+                (key, model, response, size, now, now)
+            )
+            with self._lock:
+                self._metrics['puts'] += 1
+                self._total_bytes += size - (old[0] if old else 0)
+                over_limit = self._total_bytes > self.max_bytes
+            if over_limit:
+                self._evict(conn)
+        except Exception as e:
+            self._count('errors')
+            logger.error(f"写入AI响应缓存失败: {e}")
+
+    def delete(self, key: str):
+        """删除一个条目，例如无法解析的响应"""
+        try:
+            self._delete(self._connection(), key)
+        except Exception as e:
+            self._count('errors')
+            logger.error(f"删除AI响应缓存失败: {e}")
+    
+    def _delete(self, conn: sqlite3.Connection, key: str):
+        row = conn.execute("DELETE FROM responses WHERE key = ? RETURNING size", (key,)).fetchone()
+        if row:
+            with self._lock:
+                self._total_bytes -= row[0]
+
+    def _evict(self, conn: sqlite3.Connection):
+        """按最近访问时间淘汰，直到总大小低于上限的 EVICT_TARGET_RATIO"""
+        target = int(self.max_bytes * EVICT_TARGET_RATIO)
+        removed = 0
+        # 先清理过期条目
+        if self.ttl:
+            rows = conn.execute("DELETE FROM responses WHERE created_at < ? RETURNING size", (time.time() - self.ttl,)).fetchall()
+            removed += len(rows)
+            with self._lock:
+                self._total_bytes -= sum(row[0] for row in rows)
+        while True:
+            with self._lock:
+                excess = self._total_bytes - target
+            if excess <= 0:
+                break
+            rows = conn.execute("SELECT key, size FROM responses ORDER BY last_access LIMIT 100").fetchall()
+            if not rows:
+                break
+            freed = 0
+            keys = []
+            for key, size in rows:
+                keys.append(key)
+                freed += size
+                if freed >= excess:
+                    break
+            conn.execute(f"DELETE FROM responses WHERE key IN ({', '.join('?' * len(keys))})", keys)
+            removed += len(keys)
+            with self._lock:
+                self._total_bytes -= freed
+        with self._lock:
+            self._metrics['evictions'] += removed
+        logger.info(f"AI响应缓存淘汰 {removed} 条，当前大小 {self._total_bytes / 1024 / 1024:.1f} MB")
+
+    def clear(self):
+        """清空缓存"""
+        self._connection().execute("DELETE FROM responses")
+        with self._lock:
+            self._total_bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """缓存指标快照"""
+        entries = self._connection().execute("SELECT count(*) FROM responses").fetchone()[0]
+        with self._lock:
+            lookups = self._metrics['hits'] + self._metrics['misses']
+            return {
+                **self._metrics,
+                'hit_rate': round(self._metrics['hits'] / lookups, 4) if lookups else 0.0,
+                'entries': entries,
+                'size_mb': round(self._total_bytes / 1024 / 1024, 2),
+                'max_mb': round(self.max_bytes / 1024 / 1024, 2),
+                'bypass': self.bypass,
+            }
+
+
+# 进程内共享实例
+_cache: Optional[LLMCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_llm_cache() -> LLMCache:
+    """获取进程内共享的AI响应缓存"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = LLMCache()
+        return _cache
+
+
+class _ReplayClient:
+    """重放基准使用的模拟客户端，固定延迟后返回一条可通过解析校验的JSON记录"""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.calls = 0
+        self._lock = threading.Lock()
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def _create(self, **kwargs):
+        with self._lock:
+            self.calls += 1
+        time.sleep(self.latency)
+        content = json.dumps({"title": "重放测试", "content": kwargs['messages'][-1]['content'][:200]}, ensure_ascii=False)
+        if kwargs.get('stream'):
+            return iter([SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=content))])])
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+
+def main():
+    """把一天的原始数据重放两遍，对比第一遍（冷缓存）和第二遍（热缓存）的AI调用次数和耗时"""
+    parser = argparse.ArgumentParser(description="AI响应缓存重放基准")
+    parser.add_argument('path', help="原始数据文件（JSON数组或JSONL）或爬虫日志目录")
+    parser.add_argument('--cache', default=None, help="基准使用的缓存文件，默认在数据文件旁新建")
+    parser.add_argument('--latency', type=float, default=1.0, help="模拟AI调用的延迟（秒）")
+    parser.add_argument('--real', action='store_true', help="调用真实AI接口而不是模拟客户端")
+    parser.add_argument('--limit', type=int, default=0, help="最多重放的条数，0表示全部")
+    args = parser.parse_args()
+
+    from src.clean.storage import iter_json_items
+    from src.clean.cleaner import CleaningService
+    from src.utils import rate_limiter, llm_cache
+
+    if os.path.isdir(args.path):
+        files = sorted(os.path.join(args.path, name) for name in os.listdir(args.path) if name.endswith('.jsonl'))
+    else:
+        files = [args.path]
+    items = [item for path in files for item in iter_json_items(path)]
+    if args.limit:
+        items = items[:args.limit]
+    if not items:
+        print("没有可重放的数据")
+        return 1
+
+    cache_path = args.cache or os.path.join(os.path.dirname(os.path.abspath(files[0])), 'llm_cache_bench.db')
+    if os.path.exists(cache_path):
+        os.remove(cache_path)
+    # 以 python -m 运行时本模块是 __main__，需替换 src.utils.llm_cache 中的共享实例
+    cache = llm_cache._cache = LLMCache(path=cache_path, bypass=False)
+
+    service = CleaningService()
+    client = None
+    if not args.real:
+        # 模拟客户端不受真实接口的速率限制
+        client = _ReplayClient(args.latency)
+        service.x_processor.client = client
+        service.crunchbase_processor.client = client
+        rate_limiter._limiters['llm'] = rate_limiter.AdaptiveRateLimiter(rate=1000, burst=1000)
+
+    print(f"重放 {len(items)} 条数据，缓存文件: {cache_path}")
+    for round_no in (1, 2):
+        before = cache.stats()
+        calls_before = client.calls if client else 0
+        started = time.time()
+        for item in items:
+            service.clean(dict(item))
+        elapsed = time.time() - started
+        after = cache.stats()
+        hits = after['hits'] - before['hits']
+        misses = after['misses'] - before['misses']
+        calls = (client.calls - calls_before) if client else misses
+        print(f"第 {round_no} 遍: 耗时 {elapsed:.2f} 秒, AI调用 {calls} 次, 缓存命中 {hits}, 未命中 {misses}, "
+              f"命中率 {hits / max(1, hits + misses):.1%}")
+    print(f"缓存状态: {cache.stats()}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,318 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+AI接口路由模块 - 在多个OpenAI兼容接口之间按健康状况选择并自动故障转移
+
+LLM_PROVIDERS 配置接口列表（JSON字符串或JSON文件路径），例如：
+
+    [
+      {"name": "liaobots", "base_url": "https://ai.liaobots.work/v1", "api_key_env": "LIAOBOTS_KEY", "weight": 2},
+      {"name": "backup", "base_url": "https://api.example.com/v1", "api_key": "sk-...",
+       "models": {"deepseek-v3-0324": "deepseek-chat"}, "weight": 1}
+    ]
+
+- models: 调用方使用的模型名到该接口模型名的映射；配置了models时只接收映射中的模型，
+  未配置时按原模型名调用
+- weight: 权重，健康状况相同时按权重分配请求
+- json_mode: 接口是否支持 response_format 参数（JSON模式），默认支持；设为false时调用该接口会去掉这个参数
+
+每个接口记录延迟和错误率的指数滑动平均，请求按 权重 / (延迟 × 错误惩罚) 加权随机选择；
+调用失败时立即切换到下一个接口。请求本身的错误（429以外的4xx，例如参数错误、鉴权失败、输入过长）
+直接抛出，不切换接口，也不计入接口的失败。连续失败 LLM_ROUTER_FAILURE_THRESHOLD 次的接口暂停使用，
+暂停时间按次数翻倍；到期后只放行一个探测请求，探测成功才恢复正常使用，探测失败立即再次暂停。
+所有接口都在暂停中时，按暂停到期时间依次尝试，避免请求全部直接失败。
+未配置 LLM_PROVIDERS 时只使用调用方给出的默认接口。
+
+路由器提供与OpenAI客户端相同的 chat.completions.create 接口，可以直接替换客户端使用。
+"""
+
+import os
+import json
+import time
+import random
+import threading
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional
+
+from openai import OpenAI
+
+from src.utils.log_handler import get_logger
+from src.utils.rate_limiter import status_code
+
+# 创建日志记录器
+logger = get_logger("llm_router")
+
+# 路由配置，可通过环境变量调整
+LLM_PROVIDERS = os.getenv('LLM_PROVIDERS', '')
+LLM_ROUTER_FAILURE_THRESHOLD = int(os.getenv('LLM_ROUTER_FAILURE_THRESHOLD', '3'))
+LLM_ROUTER_COOLDOWN = float(os.getenv('LLM_ROUTER_COOLDOWN', '30'))
+LLM_ROUTER_MAX_COOLDOWN = float(os.getenv('LLM_ROUTER_MAX_COOLDOWN', '300'))
+
+# 指数滑动平均的平滑系数
+EWMA_ALPHA = 0.2
+# 没有延迟记录时假定的延迟（秒）
+DEFAULT_LATENCY = 5.0
+# 错误率对选择权重的惩罚系数
+ERROR_PENALTY = 4.0
+# 默认的客户端超时时间（秒），单次调用可以用timeout参数覆盖
+DEFAULT_TIMEOUT = 60
+
+
+class Provider:
+    """一个OpenAI兼容接口及其健康状况"""
+
+    def __init__(self, name: str, base_url: str, api_key: str, weight: float = 1.0,
+                 models: Dict[str, str] = None, timeout: float = DEFAULT_TIMEOUT, client=None, json_mode: bool = True):
+        self.name = name
+        self.base_url = base_url
+        self.weight = max(0.01, float(weight))
+        self.models = models
+        self.json_mode = json_mode
+        self.client = client
+        if self.client is None:
+            try:
+                self.client = OpenAI(api_key=api_key, base_url=base_url, timeout=timeout, max_retries=0)
+            except Exception as e:
+                logger.error(f"AI接口 {name} 客户端初始化失败: {e}")
+
+        self.latency: Optional[float] = None
+        self.error_rate = 0.0
+        self.calls = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.trips = 0
+        self.open_until = 0.0
+        # 暂停到期后放行的探测请求是否在途
+        self.probing = False
+
+    def serves(self, model: str) -> bool:
+        return self.client is not None and (self.models is None or model in self.models)
+
+    def model_for(self, model: str) -> str:
+        return self.models.get(model, model) if self.models else model
+
+    def request_kwargs(self, kwargs: Dict[str, Any], model: str) -> Dict[str, Any]:
+        """本接口的请求参数：替换模型名，不支持JSON模式时去掉 response_format"""
+        kwargs = dict(kwargs, model=self.model_for(model))
+        if not self.json_mode:
+            kwargs.pop('response_format', None)
+        return kwargs
+    
+    def is_open(self, now: float) -> bool:
+        """是否处于暂停使用状态：暂停期间，以及暂停到期后探测请求在途时"""
+        return self.trips > 0 and (now < self.open_until or self.probing)
+    
+    def admit(self, now: float) -> bool:
+        """本次调用能否发往该接口（需持有路由器的锁），暂停到期后的第一个请求作为探测请求放行"""
+        if self.trips == 0:
+            return True
+        if self.is_open(now):
+            return False
+        self.probing = True
+        return True
+
+    def score(self) -> float:
+        """选择权重：延迟越低、错误率越低、配置权重越高越优先"""
+        latency = self.latency if self.latency is not None else DEFAULT_LATENCY
+        return self.weight / (max(0.05, latency) * (1 + ERROR_PENALTY * self.error_rate) ** 2)
+
+    def record(self, elapsed: float, ok: bool):
+        """记录一次调用结果（需持有路由器的锁）"""
+        probe, self.probing = self.probing, False
+        self.calls += 1
+        self.error_rate = (1 - EWMA_ALPHA) * self.error_rate + EWMA_ALPHA * (0.0 if ok else 1.0)
+        if ok:
+            self.latency = elapsed if self.latency is None else (1 - EWMA_ALPHA) * self.latency + EWMA_ALPHA * elapsed
+            self.consecutive_failures = 0
+            self.trips = 0
+            return
+        self.failures += 1
+        self.consecutive_failures += 1
+        if probe or self.consecutive_failures >= LLM_ROUTER_FAILURE_THRESHOLD:
+            self.trips += 1
+            cooldown = min(LLM_ROUTER_COOLDOWN * (2 ** (self.trips - 1)), LLM_ROUTER_MAX_COOLDOWN)
+            self.open_until = time.monotonic() + cooldown
+            self.consecutive_failures = 0
+            logger.warning(f"AI接口 {self.name} 连续失败，暂停使用 {cooldown:.0f} 秒")
+
+    def snapshot(self, now: float) -> Dict[str, Any]:
+        return {
+            'base_url': self.base_url,
+            'weight': self.weight,
+            'available': self.client is not None,
+            'open_for': round(max(0.0, self.open_until - now), 1),
+            'latency': round(self.latency, 3) if self.latency is not None else None,
+            'error_rate': round(self.error_rate, 3),
+            'calls': self.calls,
+            'failures': self.failures,
+        }
+
+
+class LLMRouter:
+    """按健康状况在多个接口间路由的 chat.completions 客户端"""
+
+    def __init__(self, providers: List[Provider]):
+        if not providers:
+            raise ValueError("至少需要配置一个AI接口")
+        self.providers = providers
+        self._lock = threading.Lock()
+        self.failovers = 0
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def rank(self, model: str) -> List[Provider]:
+        """本次调用依次尝试的接口：首选按得分加权随机，其余按得分排序，暂停中的接口排在最后"""
+        now = time.monotonic()
+        with self._lock:
+            candidates = [provider for provider in self.providers if provider.serves(model)]
+            healthy = [provider for provider in candidates if not provider.is_open(now)]
+            paused = sorted((provider for provider in candidates if provider.is_open(now)), key=lambda p: p.open_until)
+            if not healthy:
+                return paused
+            scores = [provider.score() for provider in healthy]
+            first = random.choices(healthy, weights=scores)[0]
+            rest = sorted((provider for provider in healthy if provider is not first), key=lambda p: p.score(), reverse=True)
+            return [first] + rest + paused
+
+    def create(self, **kwargs):
+        """与 client.chat.completions.create 相同的参数，失败时切换到下一个接口，429以外的4xx错误直接抛出
+
+        流式调用（stream=True）记录的是收到响应头的耗时。
+        额外参数 provider_offset=n 表示跳过排序中的前n个接口，从下一个开始尝试
+        （对冲请求用它把重复请求发往另一个接口），跳过的接口排到最后。
+
+        Raises:
+            最后一个接口的异常
+        """
+        offset = kwargs.pop('provider_offset', 0)
+        model = kwargs.get('model')
+        candidates = self.rank(model)
+        if not candidates:
+            raise RuntimeError(f"没有可以调用模型 {model} 的AI接口")
+        offset %= len(candidates)
+        candidates = candidates[offset:] + candidates[:offset]
+
+        # 暂停中的接口（包括探测请求在途的）跳过；所有接口都在暂停中时才按暂停到期时间依次尝试
+        last_error = None
+        tried = 0
+        paused = []
+        for provider in candidates:
+            with self._lock:
+                admitted = provider.admit(time.monotonic())
+            if not admitted:
+                paused.append(provider)
+                continue
+            result, last_error = self._attempt(provider, kwargs, model, tried)
+            tried += 1
+            if last_error is None:
+                return result
+        if not tried:
+            logger.warning(f"模型 {model} 的AI接口都在暂停中，按暂停到期时间依次尝试")
+            for provider in sorted(paused, key=lambda p: p.open_until):
+                result, last_error = self._attempt(provider, kwargs, model, tried)
+                tried += 1
+                if last_error is None:
+                    return result
+        raise last_error
+
+    def _attempt(self, provider: Provider, kwargs: Dict[str, Any], model: str, attempt: int):
+        """调用一个接口并记录结果
+        
+        Returns:
+            (响应, None)，调用失败时返回 (None, 异常)
+        
+        Raises:
+            429以外的4xx错误：请求本身的错误，换接口也不会成功，不计入接口的失败
+        """
+        if attempt:
+            with self._lock:
+                self.failovers += 1
+            logger.warning(f"切换到AI接口 {provider.name}")
+        started = time.monotonic()
+        try:
+            result = provider.client.chat.completions.create(**provider.request_kwargs(kwargs, model))
+        except Exception as e:
+            status = status_code(e)
+            if status is not None and 400 <= status < 500 and status != 429:
+                with self._lock:
+                    provider.probing = False
+                raise
+            with self._lock:
+                provider.record(time.monotonic() - started, ok=False)
+            logger.warning(f"AI接口 {provider.name} 调用失败: {e}")
+            return None, e
+        with self._lock:
+            provider.record(time.monotonic() - started, ok=True)
+        return result, None
+    
+    def stats(self) -> Dict[str, Any]:
+        """各接口的健康状况和故障转移次数"""
+        now = time.monotonic()
+        with self._lock:
+            return {
+                'failovers': self.failovers,
+                'providers': {provider.name: provider.snapshot(now) for provider in self.providers},
+            }
+
+
+def load_provider_configs(value: str = LLM_PROVIDERS) -> List[Dict[str, Any]]:
+    """解析 LLM_PROVIDERS：JSON字符串或JSON文件路径"""
+    if not value or not value.strip():
+        return []
+    value = value.strip()
+    if not value.startswith('['):
+        with open(value, 'r', encoding='utf-8') as f:
+            value = f.read()
+    configs = json.loads(value)
+    if not isinstance(configs, list):
+        raise ValueError("LLM_PROVIDERS 必须是接口配置列表")
+    return configs
+
+
+def build_router(configs: List[Dict[str, Any]], default_base_url: str = None, default_api_key: str = None,
+                 timeout: float = DEFAULT_TIMEOUT) -> LLMRouter:
+    """根据配置创建路由器，配置为空时只使用默认接口"""
+    providers = []
+    for index, config in enumerate(configs):
+        api_key = config.get('api_key') or os.getenv(config.get('api_key_env', ''), '') or default_api_key
+        providers.append(Provider(
+            name=config.get('name') or f"provider{index + 1}",
+            base_url=config['base_url'],
+            api_key=api_key,
+            weight=config.get('weight', 1.0),
+            models=config.get('models'),
+            timeout=config.get('timeout', timeout),
+            json_mode=config.get('json_mode', True),
+        ))
+    if not providers:
+        providers.append(Provider('default', default_base_url, default_api_key, timeout=timeout))
+    return LLMRouter(providers)
+
+
+# 进程内共享实例，清洗器和HotNews爬虫共用同一份接口健康状况
+_router: Optional[LLMRouter] = None
+_router_lock = threading.Lock()
+
+
+def get_llm_router(default_base_url: str = None, default_api_key: str = None, timeout: float = DEFAULT_TIMEOUT) -> LLMRouter:
+    """获取进程内共享的路由器
+
+    Args:
+        default_base_url: 未配置 LLM_PROVIDERS 时使用的接口地址
+        default_api_key: 未配置 LLM_PROVIDERS 时使用的密钥，也是接口配置中没有密钥时的默认值
+        timeout: 客户端默认超时时间（秒）
+
+    Returns:
+        路由器实例，首次调用时创建
+    """
+    global _router
+    with _router_lock:
+        if _router is None:
+            try:
+                configs = load_provider_configs()
+            except Exception as e:
+                logger.error(f"解析 LLM_PROVIDERS 失败，只使用默认接口: {e}")
+                configs = []
+            _router = build_router(configs, default_base_url, default_api_key, timeout)
+            logger.info(f"AI接口路由器已创建: {[provider.name for provider in _router.providers]}")
+        return _router
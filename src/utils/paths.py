@@ -31,6 +31,30 @@ X_URLS_PATH = os.path.join(DATA_DIR, 'x_urls.json')
 CRU_URLS_PATH = os.path.join(DATA_DIR, 'crunchbase', 'cru_urls.json')
 CRU_URLS_DEBUG_PATH = os.path.join(DATA_DIR, 'crunchbase', 'cru_urls_debug.json')
 
+# 已入库URL的布隆过滤器快照
+URL_FILTER_PATH = os.path.join(DATA_DIR, 'url_filter.bin')
+
+# SQLite存储后端数据库文件
+SQLITE_DB_PATH = os.path.join(DATA_DIR, 'articles.db')
+
+# 爬虫到清洗器的持久化工作队列
+WORK_QUEUE_PATH = os.path.join(DATA_DIR, 'work_queue.db')
+
+# AI响应缓存数据库文件
+LLM_CACHE_PATH = os.path.join(DATA_DIR, 'llm_cache.db')
+
+# 推文相关性预过滤的历史判定样本
+RELEVANCE_DB_PATH = os.path.join(DATA_DIR, 'relevance.db')
+
+# 推文近似重复检测的 MinHash LSH 索引
+NEAR_DUP_DB_PATH = os.path.join(DATA_DIR, 'near_duplicates.db')
+
+# 爬虫输出的分段追加日志目录
+CRAWL_LOG_DIR = os.path.join(DATA_DIR, 'crawl_log')
+
+# 分析用Parquet数据集目录
+ANALYTICS_DIR = os.path.join(DATA_DIR, 'analytics')
+
 # 确保目录存在
 os.makedirs(DATA_DIR, exist_ok=True)
 os.makedirs(LOGS_DIR, exist_ok=True)
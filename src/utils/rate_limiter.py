@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+自适应限流模块 - 所有AI接口调用共用的令牌桶 + AIMD并发控制
+
+- 令牌桶限制请求速率（LLM_RATE_PER_SEC，允许 LLM_BURST 的突发）
+- 并发上限按AIMD调整：调用成功时加性增长，遇到限流(429)或超时时减半
+- 接口返回 Retry-After 时，所有调用方暂停到指定时间之后
+- call() 是唯一的重试循环，替代各处的sleep和嵌套重试
+"""
+
+import os
+import time
+import random
+import threading
+from email.utils import parsedate_to_datetime
+from typing import Any, Callable, Dict, Optional
+
+from src.utils.log_handler import get_logger
+
+# 创建日志记录器
+logger = get_logger("rate_limiter")
+
+# 限流配置，可通过环境变量调整
+LLM_RATE_PER_SEC = float(os.getenv('LLM_RATE_PER_SEC', '2'))
+LLM_BURST = float(os.getenv('LLM_BURST', '4'))
+LLM_MIN_CONCURRENCY = int(os.getenv('LLM_MIN_CONCURRENCY', '1'))
+LLM_MAX_CONCURRENCY = int(os.getenv('LLM_MAX_CONCURRENCY', '8'))
+LLM_INITIAL_CONCURRENCY = int(os.getenv('LLM_INITIAL_CONCURRENCY', '2'))
+LLM_MAX_ATTEMPTS = int(os.getenv('LLM_MAX_ATTEMPTS', '5'))
+LLM_RETRY_BASE_DELAY = float(os.getenv('LLM_RETRY_BASE_DELAY', '3'))
+LLM_RETRY_MAX_DELAY = float(os.getenv('LLM_RETRY_MAX_DELAY', '30'))
+
+# 限流时并发上限的乘性减小系数
+BACKOFF_FACTOR = 0.5
+
+# 调用结果分类
+OUTCOME_SUCCESS = 'success'
+OUTCOME_THROTTLED = 'throttled'   # 429 / 超时：减小并发并全局暂停
+OUTCOME_TRANSIENT = 'transient'   # 连接错误 / 5xx：只对本次调用退避重试
+OUTCOME_FATAL = 'fatal'           # 其他错误（参数错误、鉴权失败、程序错误等）：不重试
+
+# 可重试的传输层异常类名（openai / httpx / requests / urllib3），按异常的继承链匹配
+TRANSPORT_ERROR_NAMES = frozenset((
+    'APIConnectionError', 'TransportError', 'NetworkError', 'ProtocolError', 'RemoteProtocolError',
+    'ConnectionError', 'ChunkedEncodingError', 'IncompleteRead',
+))
+
+
+def status_code(exc: Exception) -> Optional[int]:
+    """从openai / requests等库的异常中取HTTP状态码"""
+    status = getattr(exc, 'status_code', None)
+    if status is None:
+        status = getattr(getattr(exc, 'response', None), 'status_code', None)
+    try:
+        return int(status) if status is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def classify_error(exc: Exception) -> str:
+    """判断异常属于限流、临时错误还是不可重试的错误
+    
+    只有HTTP状态码和已知的传输层异常会重试，其他异常（KeyError等程序错误、
+    路由器找不到可用接口的RuntimeError等）重试也不会成功，直接按不可重试处理。
+    """
+    status = status_code(exc)
+    names = {cls.__name__ for cls in type(exc).__mro__}
+    if status == 429 or 'RateLimitError' in names:
+        return OUTCOME_THROTTLED
+    if isinstance(exc, TimeoutError) or any('timeout' in name.lower() for name in names):
+        return OUTCOME_THROTTLED
+    if status is not None:
+        return OUTCOME_TRANSIENT if status >= 500 else OUTCOME_FATAL
+    if isinstance(exc, ConnectionError) or names & TRANSPORT_ERROR_NAMES:
+        return OUTCOME_TRANSIENT
+    return OUTCOME_FATAL
+
+
+def retry_after_seconds(exc: Exception) -> Optional[float]:
+    """解析异常响应中的 Retry-After / retry-after-ms 头
+
+    Returns:
+        需要等待的秒数，没有该头时返回None
+    """
+    headers = getattr(getattr(exc, 'response', None), 'headers', None)
+    if not headers:
+        return None
+    try:
+        value = headers.get('retry-after-ms')
+        if value:
+            return max(0.0, float(value) / 1000)
+        value = headers.get('retry-after')
+        if not value:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            # HTTP日期格式
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except Exception:
+        return None
+
+
+class AdaptiveRateLimiter:
+    """令牌桶限速 + AIMD并发上限 + Retry-After全局暂停"""
+
+    def __init__(self, name: str = 'llm', rate: float = LLM_RATE_PER_SEC, burst: float = LLM_BURST,
+                 min_concurrency: int = LLM_MIN_CONCURRENCY, max_concurrency: int = LLM_MAX_CONCURRENCY,
+                 initial_concurrency: int = LLM_INITIAL_CONCURRENCY, max_attempts: int = LLM_MAX_ATTEMPTS,
+                 base_delay: float = LLM_RETRY_BASE_DELAY, max_delay: float = LLM_RETRY_MAX_DELAY):
+        """初始化限流器
+
+        Args:
+            name: 名称，用于日志
+            rate: 每秒允许的请求数
+            burst: 令牌桶容量（允许的突发请求数）
+            min_concurrency: 并发上限的下限
+            max_concurrency: 并发上限的上限
+            initial_concurrency: 初始并发上限
+            max_attempts: call() 的最大尝试次数
+            base_delay: 退避的初始等待时间（秒）
+            max_delay: 退避的最长等待时间（秒）
+        """
+        self.name = name
+        self.rate = max(0.001, rate)
+        self.burst = max(1.0, burst)
+        self.min_concurrency = max(1, min_concurrency)
+        self.max_concurrency = max(self.min_concurrency, max_concurrency)
+        self.limit = float(min(self.max_concurrency, max(self.min_concurrency, initial_concurrency)))
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+        self._cond = threading.Condition()
+        self._tokens = self.burst
+        self._last_refill = time.monotonic()
+        self._blocked_until = 0.0
+        self._consecutive_throttles = 0
+        self.in_flight = 0
+
+        self._metrics = {
+            'calls': 0,
+            'successes': 0,
+            'throttled': 0,
+            'transient_errors': 0,
+            'fatal_errors': 0,
+            'retries': 0,
+            'gave_up': 0,
+            'wait_seconds': 0.0,
+        }
+
+    def _refill(self, now: float):
+        self._tokens = min(self.burst, self._tokens + (now - self._last_refill) * self.rate)
+        self._last_refill = now
+
+    def acquire(self):
+        """等待令牌和并发名额"""
+        started = time.monotonic()
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                self._refill(now)
+                if now < self._blocked_until:
+                    timeout = self._blocked_until - now
+                elif self.in_flight >= int(self.limit):
+                    timeout = None
+                elif self._tokens < 1:
+                    timeout = (1 - self._tokens) / self.rate
+                else:
+                    self._tokens -= 1
+                    self.in_flight += 1
+                    self._metrics['calls'] += 1
+                    self._metrics['wait_seconds'] += now - started
+                    return
+                self._cond.wait(timeout)
+
+    def release(self, outcome: str = OUTCOME_SUCCESS, retry_after: float = None):
+        """归还并发名额并按调用结果调整并发上限
+
+        Args:
+            outcome: 调用结果分类
+            retry_after: 服务端要求的等待秒数
+        """
+        with self._cond:
+            self.in_flight = max(0, self.in_flight - 1)
+            if outcome == OUTCOME_SUCCESS:
+                self._metrics['successes'] += 1
+                self._consecutive_throttles = 0
+                # 加性增长：大约每完成"当前上限"个请求，上限加1
+                self.limit = min(self.max_concurrency, self.limit + 1 / self.limit)
+            elif outcome == OUTCOME_THROTTLED:
+                self._metrics['throttled'] += 1
+                self._consecutive_throttles += 1
+                old_limit = self.limit
+                self.limit = max(self.min_concurrency, self.limit * BACKOFF_FACTOR)
+                # 所有调用方一起暂停：优先使用服务端的Retry-After，否则按连续限流次数指数退避
+                pause = retry_after if retry_after is not None else min(
+                    self.base_delay * (2 ** (self._consecutive_throttles - 1)), self.max_delay)
+                self._blocked_until = max(self._blocked_until, time.monotonic() + pause)
+                logger.warning(f"[{self.name}] 触发限流，并发上限 {old_limit:.1f} -> {self.limit:.1f}，暂停 {pause:.1f} 秒")
+            elif outcome == OUTCOME_TRANSIENT:
+                self._metrics['transient_errors'] += 1
+            else:
+                self._metrics['fatal_errors'] += 1
+            self._cond.notify_all()
+
+    def call(self, func: Callable[..., Any], *args, **kwargs) -> Any:
+        """在限流下调用func，限流、超时和临时错误自动重试
+
+        Args:
+            func: 要调用的函数，例如 client.chat.completions.create
+            *args, **kwargs: 传给func的参数
+
+        Returns:
+            func的返回值
+
+        Raises:
+            最后一次尝试的异常，或不可重试的异常
+        """
+        for attempt in range(1, self.max_attempts + 1):
+            self.acquire()
+            try:
+                result = func(*args, **kwargs)
+            except Exception as e:
+                outcome = classify_error(e)
+                self.release(outcome, retry_after_seconds(e))
+                if outcome == OUTCOME_FATAL or attempt == self.max_attempts:
+                    if outcome != OUTCOME_FATAL:
+                        self._metrics['gave_up'] += 1
+                    raise
+                self._metrics['retries'] += 1
+                logger.warning(f"[{self.name}] 调用失败 (尝试 {attempt}/{self.max_attempts}, {outcome}): {e}")
+                if outcome == OUTCOME_TRANSIENT:
+                    # 临时错误只对本次调用退避，加随机抖动避免同时重试
+                    delay = min(self.base_delay * (2 ** (attempt - 1)), self.max_delay)
+                    time.sleep(delay * random.uniform(0.5, 1.0))
+                continue
+            self.release(OUTCOME_SUCCESS)
+            return result
+
+    def saturated(self) -> bool:
+        """是否处于全局暂停中或并发名额已满，此时新的调用需要排队"""
+        with self._cond:
+            return time.monotonic() < self._blocked_until or self.in_flight >= int(self.limit)
+    
+    def stats(self) -> Dict[str, Any]:
+        """限流器指标快照"""
+        with self._cond:
+            return {
+                'name': self.name,
+                'concurrency_limit': round(self.limit, 2),
+                'in_flight': self.in_flight,
+                'rate_per_sec': self.rate,
+                'blocked_for': round(max(0.0, self._blocked_until - time.monotonic()), 2),
+                **self._metrics,
+                'wait_seconds': round(self._metrics['wait_seconds'], 2),
+            }
+
+
+# 进程内共享实例，同一个AI服务的所有调用方共用一个限流器
+_limiters: Dict[str, AdaptiveRateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(name: str = 'llm') -> AdaptiveRateLimiter:
+    """获取进程内共享的限流器
+
+    Args:
+        name: 限流器名称
+
+    Returns:
+        限流器实例
+    """
+    with _limiters_lock:
+        limiter = _limiters.get(name)
+        if limiter is None:
+            limiter = _limiters[name] = AdaptiveRateLimiter(name=name)
+        return limiter
@@ -88,6 +88,28 @@ def run_logs_cleaner():
     """运行日志清理"""
     return run_task("日志清理", "logs.clean_logs", "start_logs_cleaner")
 
+# 归档在分界时间前移后要等待 TIER_CUTOFF_TTL 秒（其他进程的分界时间缓存过期）才开始移动文档，
+# 因此在独立线程中运行，不阻塞调度线程中的爬虫和清洗任务
+_archiver_thread = None
+_archiver_lock = threading.Lock()
+
+def run_archiver():
+    """在独立线程中运行冷热数据归档，上一次归档尚未结束时跳过"""
+    global _archiver_thread
+    with _archiver_lock:
+        if _archiver_thread is not None and _archiver_thread.is_alive():
+            logger.info("上一次数据归档尚未结束，跳过本次")
+            return False
+        _archiver_thread = threading.Thread(
+            target=run_task, args=("数据归档", "src.db.tiering", "start_archiver"), name="archiver", daemon=True
+        )
+        _archiver_thread.start()
+        return True
+
+def run_analytics_exporter():
+    """运行分析数据增量导出"""
+    return run_task("分析数据导出", "src.analytics.exporter", "start_exporter")
+
 def schedule_job(name, task_func, interval_str):
     """安排定时任务，使用间隔时间"""
     # 解析间隔时间字符串
@@ -147,6 +169,18 @@ def setup_schedule(config):
         # 首次运行
         run_logs_cleaner()
     
+    # 设置冷热数据归档调度（首次运行随调度周期执行，避免启动时阻塞）
+    archiver_config = config.get("archiver", {})
+    if archiver_config.get("enabled", False):
+        interval = archiver_config.get("interval", "24h")
+        schedule_job("archiver", run_archiver, interval)
+    
+    # 设置分析数据导出调度
+    exporter_config = config.get("analytics_exporter", {})
+    if exporter_config.get("enabled", False):
+        interval = exporter_config.get("interval", "1h")
+        schedule_job("analytics_exporter", run_analytics_exporter, interval)
+    
     logger.info("调度任务设置完成")
 
 def run_pending_jobs():